@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""DEB包保存器性能基准
+
+生成 1k/10k/100k 规模的合成 HTML 目录页和 Packages 索引，通过本地 HTTP 服务提供，
+测量包列表获取、文件名解析、过滤、搜索和表格刷新的耗时，结果写入 JSON 报告。
+指定 --compare 时与旧报告比较，耗时增加超过阈值的项目视为性能回退。
+
+    python3 deb-saver-benchmark.py -o report.json
+    python3 deb-saver-benchmark.py --sizes 1000,10000 --compare old.json
+"""
+
+import argparse
+import hashlib
+import http.server
+import importlib.util
+import json
+import lzma
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEB_SAVER_PATH = os.path.join(SCRIPT_DIR, 'deb-saver.py')
+
+# 合成数据使用的架构，与界面中的架构选项一致
+BENCH_ARCHS = ('amd64', 'arm64', 'loong64', 'sw_64', 'all')
+
+
+def load_deb_saver(path=DEB_SAVER_PATH):
+    """按文件路径导入 deb-saver.py（文件名带连字符，不能直接 import）"""
+    spec = importlib.util.spec_from_file_location('deb_saver', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_packages(count):
+    """生成 count 个包的 (包名, 版本, 架构) 列表，约五分之一是符号包"""
+    packages = []
+    for i in range(count):
+        arch = BENCH_ARCHS[i % len(BENCH_ARCHS)]
+        base = f"lib{['dtk', 'qt', 'dde', 'deepin', 'gio'][i % 5]}-component{i // 10}"
+        name = base + '-dbgsym' if i % 5 == 4 else base
+        version = f"{1 + i % 3}.{i % 7}.{i % 11}-1deepin{i % 4}"
+        packages.append((name, version, arch))
+    return packages
+
+
+def generate_repository(directory, count):
+    """在 directory 中生成 HTML 目录页和 Packages / Packages.xz 索引"""
+    os.makedirs(directory, exist_ok=True)
+    packages = synthetic_packages(count)
+    
+    links = []
+    paragraphs = []
+    for name, version, arch in packages:
+        filename = f"{name}_{version}_{arch}.deb"
+        links.append(f'<a href="{filename}">{filename}</a>                 19-Oct-2026 10:00    {1024 + len(name)}\n')
+        depends = f"Depends: libc6 (>= 2.28), {name.replace('-dbgsym', '')}-common | {name}-data\n"
+        paragraphs.append(
+            f"Package: {name}\nVersion: {version}\nArchitecture: {arch}\n{depends}"
+            f"Filename: pool/main/{filename}\nSize: {1024 + len(name)}\n"
+            f"SHA256: {hashlib.sha256(filename.encode()).hexdigest()}\n")
+    
+    with open(os.path.join(directory, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('<html><head><title>Index of /</title></head><body><h1>Index of /</h1><pre>'
+                '<a href="../">../</a>\n')
+        f.writelines(links)
+        f.write('</pre></body></html>\n')
+    
+    index_text = '\n'.join(paragraphs).encode('utf-8')
+    with open(os.path.join(directory, 'Packages'), 'wb') as f:
+        f.write(index_text)
+    with open(os.path.join(directory, 'Packages.xz'), 'wb') as f:
+        f.write(lzma.compress(index_text))
+    return [f"{name}_{version}_{arch}.deb" for name, version, arch in packages]
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """不输出访问日志的静态文件服务"""
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory):
+    """在后台线程中提供 directory 的 HTTP 服务，返回 (服务对象, 根 URL)"""
+    handler = lambda *args, **kwargs: QuietHandler(*args, directory=directory, **kwargs)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def time_call(func, repeat):
+    """重复执行 func，返回耗时统计（秒）和最后一次的返回值"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'max': max(timings),
+    }, result
+
+
+def benchmark_scale(module, directory, count, repeat):
+    """测量一种规模下的引擎热点路径"""
+    repo_dir = os.path.join(directory, f'repo-{count}')
+    filenames = generate_repository(repo_dir, count)
+    server, url = serve_directory(repo_dir)
+    engine = module.PackageEngine(allow_mock=False)
+    results = {}
+    
+    try:
+        results['get_network_packages'], packages = time_call(
+            lambda: engine.get_network_packages(url), repeat)
+        if len(packages) != count:
+            raise RuntimeError(f"获取到 {len(packages)} 个包，预期 {count} 个")
+        
+        results['parse_deb_filename'], _ = time_call(
+            lambda: [engine.parse_deb_filename(filename) for filename in filenames], repeat)
+        
+        results['load_repository_index'], index = time_call(
+            lambda: module.load_repository_index(url), repeat)
+        results['apply_repository_index'], _ = time_call(
+            lambda: module.apply_repository_index(packages, index), repeat)
+        
+        results['filter_packages'], filtered = time_call(
+            lambda: engine.filter_packages(packages, ['arm64', 'loong64', 'all'], False), repeat)
+        results['search_packages'], _ = time_call(
+            lambda: engine.search_packages(filtered, 'dtk'), repeat)
+        results['latest_packages'], _ = time_call(
+            lambda: module.latest_packages(packages), repeat)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(repo_dir, ignore_errors=True)
+    
+    return results, packages
+
+
+def start_virtual_display():
+    """没有 DISPLAY 时尝试启动 Xvfb，返回 (进程, 不可用原因)"""
+    if os.environ.get('DISPLAY'):
+        return None, None
+    if not shutil.which('Xvfb'):
+        return None, '没有 DISPLAY 且未安装 Xvfb'
+    
+    for number in range(99, 120):
+        if os.path.exists(f'/tmp/.X11-unix/X{number}'):
+            continue
+        process = subprocess.Popen(['Xvfb', f':{number}', '-screen', '0', '1280x1024x24', '-nolisten', 'tcp'],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f'/tmp/.X11-unix/X{number}'):
+                os.environ['DISPLAY'] = f':{number}'
+                return process, None
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+        process.kill()
+    return None, 'Xvfb 启动失败'
+
+
+def benchmark_table(module, packages_by_scale, repeat):
+    """在（虚拟）显示下测量 refresh_table_data，返回 {规模: 统计} 和跳过原因"""
+    display_process, reason = start_virtual_display()
+    if reason:
+        return {}, reason
+    
+    try:
+        try:
+            module.import_tkinter()
+            root = module.tk.Tk()
+        except Exception as e:
+            return {}, f"无法初始化 tkinter: {str(e)}"
+        
+        root.withdraw()
+        app = module.DebPackageSaver(root)
+        results = {}
+        for count, packages in packages_by_scale.items():
+            app.package_data = packages
+            app.filtered_package_data = packages
+            
+            def refresh():
+                app.refresh_table_data()
+                root.update_idletasks()
+            
+            results[count], _ = time_call(refresh, repeat)
+        
+        app.stop_file_logging()
+        root.destroy()
+        return results, None
+    finally:
+        if display_process:
+            display_process.terminate()
+            display_process.wait()
+
+
+def read_package_version():
+    """读取 debian/changelog 中的版本号，用于区分不同版本的报告"""
+    try:
+        with open(os.path.join(SCRIPT_DIR, '..', 'debian', 'changelog'), 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+        return first_line.split('(', 1)[1].split(')', 1)[0]
+    except (OSError, IndexError):
+        return ''
+
+
+def compare_reports(old_report, new_report, threshold):
+    """比较两份报告的中位耗时，返回回退项目列表 [(规模, 项目, 旧耗时, 新耗时)]"""
+    regressions = []
+    for count, new_results in new_report['results'].items():
+        old_results = old_report.get('results', {}).get(count, {})
+        for name, new_stats in new_results.items():
+            old_stats = old_results.get(name)
+            if not old_stats:
+                continue
+            old_time, new_time = old_stats['median'], new_stats['median']
+            # 极短的项目容易受抖动影响，低于 1ms 的不计入回退
+            if new_time > old_time * (1 + threshold) and new_time - old_time > 0.001:
+                regressions.append((count, name, old_time, new_time))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='DEB包保存器性能基准')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='包数量规模，逗号分隔（默认 1000,10000,100000）')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='每项重复次数，取中位数（默认 3）')
+    parser.add_argument('-o', '--output', default='', help='JSON 报告路径，默认按时间生成文件名')
+    parser.add_argument('--label', default='', help='报告标签，默认使用 debian/changelog 中的版本号')
+    parser.add_argument('--no-table', action='store_true', help='跳过需要显示环境的表格刷新测试')
+    parser.add_argument('--compare', default='', help='与旧报告比较并列出性能回退')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定回退的耗时增幅（默认 0.2，即 20%%）')
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    
+    work_dir = tempfile.mkdtemp(prefix='deb-saver-bench-')
+    # 使用独立的 HOME，避免读写用户的配置和本地包目录
+    os.environ['HOME'] = work_dir
+    module = load_deb_saver()
+    
+    with open(DEB_SAVER_PATH, 'rb') as f:
+        script_hash = hashlib.sha256(f.read()).hexdigest()
+    report = {
+        'label': args.label or read_package_version(),
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'deb_saver_sha256': script_hash,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': {},
+    }
+    
+    try:
+        packages_by_scale = {}
+        for count in sizes:
+            print(f"[基准] 规模 {count} ...", file=sys.stderr)
+            results, packages = benchmark_scale(module, work_dir, count, args.repeat)
+            report['results'][str(count)] = results
+            packages_by_scale[str(count)] = packages
+        
+        if args.no_table:
+            report['table_skipped'] = '--no-table'
+        else:
+            table_results, reason = benchmark_table(module, packages_by_scale, args.repeat)
+            if reason:
+                report['table_skipped'] = reason
+                print(f"[基准] 跳过表格刷新测试: {reason}", file=sys.stderr)
+            for count, stats in table_results.items():
+                report['results'][count]['refresh_table_data'] = stats
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    for count, results in report['results'].items():
+        print(f"规模 {count}:")
+        for name, stats in results.items():
+            print(f"  {name:<24} 中位 {stats['median'] * 1000:10.2f} ms   最小 {stats['min'] * 1000:10.2f} ms")
+    
+    output = args.output or f"deb-saver-benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已保存: {output}")
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old_report = json.load(f)
+        regressions = compare_reports(old_report, report, args.threshold)
+        for count, name, old_time, new_time in regressions:
+            print(f"[回退] 规模 {count} {name}: {old_time * 1000:.2f} ms -> {new_time * 1000:.2f} ms")
+        if regressions:
+            return 1
+        print(f"与 {old_report.get('label') or args.compare} 相比没有性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -29,6 +29,13 @@ send_notification() {
 
 echo "[启动] 启动 DEB包保存器..."
 
+# 记录启动时间，应用内统计冷启动耗时时一并计入
+export DEB_SAVER_LAUNCH_NS=$(date +%s%N)
+
+# 缓存目录：依赖检查结果和 Python 字节码
+CACHE_DIR="${XDG_CACHE_HOME:-$HOME/.cache}/deb-saver"
+DEPS_STAMP="$CACHE_DIR/deps-ok"
+
 # 检测系统发行版
 detect_distro() {
     if [ -f /etc/os-release ]; then
@@ -72,16 +79,27 @@ install_dependencies() {
     esac
 }
 
+# 依赖检查缓存的键：python3 路径及修改时间，加上 dpkg 状态文件的修改时间（安装或卸载包后失效）
+deps_cache_key() {
+    local python_path
+    python_path=$(command -v python3) || return 1
+    echo "$python_path $(stat -Lc %Y "$python_path" 2>/dev/null) $(stat -c %Y /var/lib/dpkg/status 2>/dev/null)"
+}
+
+# 上次检查通过且环境没有变化时跳过依赖检查
+if [ -f "$DEPS_STAMP" ] && [ "$(cat "$DEPS_STAMP" 2>/dev/null)" = "$(deps_cache_key)" ]; then
+    DEPS_CACHED=1
+fi
+
 # 检查并安装Python3
-if ! command -v python3 &> /dev/null; then
+if [ -z "$DEPS_CACHED" ] && ! command -v python3 &> /dev/null; then
     echo "[警告] Python3 未安装，尝试自动安装..."
     distro=$(detect_distro)
     install_dependencies $distro
 fi
 
 # 检查tkinter是否可用
-python3 -c "import tkinter" 2>/dev/null
-if [ $? -ne 0 ]; then
+if [ -z "$DEPS_CACHED" ] && ! python3 -c "import tkinter" 2>/dev/null; then
     echo "[警告] tkinter 不可用，尝试自动安装..."
     distro=$(detect_distro)
     install_dependencies $distro
@@ -97,14 +115,32 @@ if [ $? -ne 0 ]; then
     fi
 fi
 
+if [ -z "$DEPS_CACHED" ]; then
+    mkdir -p "$CACHE_DIR" && deps_cache_key > "$DEPS_STAMP"
+fi
+
 echo "[成功] 环境检查完成"
 
-# 运行Python应用
+# 以模块方式加载脚本，字节码缓存到用户缓存目录，避免每次启动都重新编译整个脚本
+run_app() {
+    PYTHONPYCACHEPREFIX="$CACHE_DIR/pycache" python3 -c '
+import importlib.util
+import sys
+path = sys.argv[1]
+sys.argv = sys.argv[1:]
+spec = importlib.util.spec_from_file_location("deb_saver", path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+module.main()
+' "$@"
+}
+
+# 运行Python应用（菜单项传入的当前目录不转发，命令行模式请直接运行 deb-saver.py）
 # 检查是否在安装路径下运行
 if [ -f /usr/share/dfm-tools-plugins/deb-saver.py ]; then
-    python3 /usr/share/dfm-tools-plugins/deb-saver.py
+    run_app /usr/share/dfm-tools-plugins/deb-saver.py
 else
-    python3 deb-saver.py
+    run_app deb-saver.py
 fi
 
 echo "[完成] 应用已退出"
\ No newline at end of file
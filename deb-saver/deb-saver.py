@@ -1,897 +1,3165 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
+import time
+
+# 脚本开始执行的时间，用于统计冷启动耗时
+START_TIME = time.perf_counter()
+
+# 只在启动时导入必需的模块；urllib、zipfile、tarfile、压缩和日志文件相关的模块
+# 都在用到的函数中导入，减少从文件管理器右键菜单启动时的等待
 import subprocess
 import threading
 import os
 import sys
-from pathlib import Path
 import queue
-import time
 import concurrent.futures
 import json
 import shutil
-import glob
-import urllib.request
-import urllib.parse
-import zipfile
 import tempfile
+import re
+import io
+import argparse
+import logging
+import collections
+import contextlib
+import functools
+import hashlib
+import sqlite3
 from datetime import datetime
 
-class DebPackageSaver:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("DEB包保存器")
-        self.root.geometry("1200x900")
-        self.root.minsize(1000, 800)
+# tkinter 在启动图形界面时才导入，命令行模式可在无显示环境下运行
+tk = ttk = filedialog = messagebox = scrolledtext = simpledialog = None
+
+
+# 日志标签对应的级别，未列出的标签按信息级别处理
+LOG_LEVEL_TAGS = {
+    '[调试]': logging.DEBUG,
+    '[警告]': logging.WARNING,
+    '[错误]': logging.ERROR,
+    '[失败]': logging.ERROR,
+}
+
+# 日志级别选项（界面显示名称 -> 级别）
+LOG_LEVEL_CHOICES = {
+    '调试': logging.DEBUG,
+    '信息': logging.INFO,
+    '警告': logging.WARNING,
+    '错误': logging.ERROR,
+}
+
+# 冷启动目标耗时（秒），超出时在日志中提示
+COLD_START_BUDGET = 0.3
+
+# 同步时在保存目录中记录本地文件校验和的缓存文件
+SYNC_STATE_FILE = '.deb_saver_sync.json'
+
+# 本地包目录数据库，保存各源的包列表和下载历史，启动时先显示上次的结果
+CATALOG_FILE = os.path.join(os.path.expanduser("~"), ".deb_saver_catalog.db")
+
+# 调试符号仓库，按 build-id 存放 .debug 文件，可直接作为 gdb 的 debug-file-directory
+DEBUG_STORE_DIR = os.path.join(os.path.expanduser("~"), ".deb_saver_debug")
+
+# 本地仓库：保存目录中缓存每个包控制信息的文件，以及内置 HTTP 服务的默认端口
+REPO_STATE_FILE = '.deb_saver_repo.json'
+REPO_SERVER_PORT = 8890
+
+# 下载前检查磁盘空间时额外保留的空间
+DISK_SPACE_RESERVE = 100 * 1024 * 1024
+
+# 网络传输的重试与熔断参数：每个主机默认重试次数、退避基数与上限（秒），
+# 连续失败多少次后暂停请求该主机，以及暂停多久后重新探测
+TRANSFER_RETRIES = 3
+TRANSFER_BACKOFF = 0.5
+TRANSFER_MAX_BACKOFF = 15.0
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30.0
+
+# 递归抓取网络目录时的并发数，以及每个主机同时进行的请求数上限
+CRAWL_WORKERS = 8
+CRAWL_HOST_LIMIT = 4
+
+# 仓库索引文件名，按优先顺序尝试
+PACKAGES_INDEX_NAMES = ('Packages.xz', 'Packages.gz', 'Packages')
+
+
+def format_size(num_bytes):
+    """将字节数格式化为易读的大小"""
+    size = float(num_bytes or 0)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def split_sources(text):
+    """拆分以分号或换行分隔的多个下载源，顺序即优先级（靠前的优先）"""
+    return [source.strip() for source in re.split(r'[;\n]', text) if source.strip()]
+
+
+def _version_char_order(c):
+    """dpkg 版本比较中非数字字符的排序权重"""
+    if c == '~':
+        return -1
+    if 'a' <= c <= 'z' or 'A' <= c <= 'Z':
+        return ord(c)
+    return ord(c) + 256
+
+
+def _version_part_key(part):
+    """将上游版本或修订号转换为可直接比较的元组，排序结果与 dpkg 的 verrevcmp 一致
+    
+    版本被拆成交替的 (非数字段, 数字段)：非数字段按字符权重比较，
+    末尾补 0 使 "~" 排在字符串结束之前；数字段按数值比较。
+    最后追加一个表示结束的段，使较短的版本能与 "~" 等后缀正确比较。
+    """
+    segments = []
+    i = 0
+    length = len(part)
+    # 空串与 "0" 等价，保证两个键的第一段总是对齐
+    if not length:
+        segments.append(((0,), 0))
+    while i < length:
+        start = i
+        while i < length and not part[i].isdigit():
+            i += 1
+        non_digits = tuple(_version_char_order(c) for c in part[start:i]) + (0,)
+        start = i
+        while i < length and part[i].isdigit():
+            i += 1
+        segments.append((non_digits, int(part[start:i] or 0)))
+    segments.append(((0,), 0))
+    return tuple(segments)
+
+
+def split_deb_version(version):
+    """将版本号拆分为 (纪元, 上游版本, 修订号)"""
+    epoch = 0
+    if ':' in version:
+        epoch_text, version = version.split(':', 1)
+        epoch = int(epoch_text) if epoch_text.isdigit() else 0
+    upstream, sep, revision = version.rpartition('-')
+    if not sep:
+        upstream, revision = version, ''
+    return epoch, upstream, revision
+
+
+@functools.lru_cache(maxsize=65536)
+def deb_version_key(version):
+    """获取版本号的排序键（带缓存），可直接用于 sorted/max"""
+    epoch, upstream, revision = split_deb_version(version)
+    return epoch, _version_part_key(upstream), _version_part_key(revision)
+
+
+def compare_deb_versions(a, b):
+    """按 dpkg 规则比较两个版本号，返回 -1、0 或 1"""
+    key_a = deb_version_key(a)
+    key_b = deb_version_key(b)
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def latest_packages(packages):
+    """在一次分组遍历中为每个包名+架构选出最高版本，保持原有顺序"""
+    best = {}
+    for i, pkg in enumerate(packages):
+        key = (pkg['name'], pkg.get('arch', ''))
+        current = best.get(key)
+        if current is None or deb_version_key(pkg.get('version', '')) > deb_version_key(packages[current].get('version', '')):
+            best[key] = i
+    return [packages[i] for i in sorted(best.values())]
+
+
+# 分组显示时去掉的包名后缀，如 foo-dbgsym 归到 foo，libfoo-dev 归到 libfoo
+PACKAGE_GROUP_SUFFIX = re.compile(r'-(dbgsym|dbg|dev|doc|docs|common|data|bin|tools|utils|examples|plugins?)$')
+
+
+def package_group_name(pkg):
+    """分组显示时包所属的基础包名
+    
+    仓库索引中有 Source 字段时按源码包分组，否则去掉常见后缀；lib 开头的库包再去掉末尾的
+    so 版本号，libfoo1、libfoo-dev 都归到 libfoo。lib 前缀本身保留，libreoffice-writer、
+    libc6 这类包名不会被截成 reoffice-writer、c。
+    """
+    if pkg.get('source_package'):
+        return pkg['source_package']
+    name = pkg['name']
+    while True:
+        stripped = PACKAGE_GROUP_SUFFIX.sub('', name)
+        if stripped == name or not stripped:
+            break
+        name = stripped
+    if name.startswith('lib') and name[-1:].isdigit():
+        stripped = name.rstrip('0123456789.-+')
+        if len(stripped) > 3:
+            name = stripped
+    return name
+
+
+def group_packages(packages):
+    """按基础包名分组，返回 {基础包名: [(序号, 包)]}，组和组内的包都保持原有顺序"""
+    groups = {}
+    for i, pkg in enumerate(packages):
+        groups.setdefault(package_group_name(pkg), []).append((i, pkg))
+    return groups
+
+
+# 源比较结果中各类变化的显示名称
+DIFF_CHANGE_LABELS = {'added': '新增', 'removed': '删除', 'changed': '版本变化'}
+
+
+def diff_package_lists(old_packages, new_packages):
+    """比较两个源的包列表，按 (包名, 架构) 找出新增、删除和版本变化的包
+    
+    两边各建一个 (包名, 架构) -> 版本集合 的字典，用集合运算求出差异，
+    只有版本集合不同的包才比较版本号，10 万级的列表也能很快完成。
+    同一个包在源中有多个版本时，只有最高版本不同才算版本变化。
+    返回按架构、包名排序的 [{'change', 'name', 'arch', 'old_version', 'new_version'}]。
+    """
+    def versions_by_key(packages):
+        result = {}
+        for pkg in packages:
+            result.setdefault((pkg['name'], pkg.get('arch', '')), set()).add(pkg.get('version', ''))
+        return result
+    
+    def highest(versions):
+        return next(iter(versions)) if len(versions) == 1 else max(versions, key=deb_version_key)
+    
+    old = versions_by_key(old_packages)
+    new = versions_by_key(new_packages)
+    entries = []
+    for key in new.keys() - old.keys():
+        entries.append({'change': 'added', 'name': key[0], 'arch': key[1],
+                        'old_version': '', 'new_version': highest(new[key])})
+    for key in old.keys() - new.keys():
+        entries.append({'change': 'removed', 'name': key[0], 'arch': key[1],
+                        'old_version': highest(old[key]), 'new_version': ''})
+    for key in old.keys() & new.keys():
+        if old[key] != new[key]:
+            old_version, new_version = highest(old[key]), highest(new[key])
+            if old_version != new_version:
+                entries.append({'change': 'changed', 'name': key[0], 'arch': key[1],
+                                'old_version': old_version, 'new_version': new_version})
+    entries.sort(key=lambda entry: (entry['arch'], entry['name']))
+    return entries
+
+
+def summarize_diff(entries):
+    """按架构统计各类变化的数量，返回 {架构: {变化类型: 数量}}"""
+    summary = {}
+    for entry in entries:
+        counts = summary.setdefault(entry['arch'], {'added': 0, 'removed': 0, 'changed': 0})
+        counts[entry['change']] += 1
+    return dict(sorted(summary.items()))
+
+
+def merge_package_lists(package_lists):
+    """合并多个源的包列表
+    
+    package_lists 按源优先级从高到低排列；包名、版本、架构都相同的包只保留优先级高的源。
+    不同版本全部保留，由“仅最新版本”视图选出每个包的最高版本。
+    """
+    merged = {}
+    for packages in package_lists:
+        for pkg in packages:
+            key = (pkg['name'], pkg.get('version', ''), pkg.get('arch', ''))
+            if key not in merged:
+                merged[key] = pkg
+    return list(merged.values())
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """计算文件的 SHA256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_control_paragraphs(text):
+    """解析 Debian 控制文件格式的文本（Packages 索引或 control 文件），返回字段字典列表"""
+    paragraphs = []
+    fields = {}
+    last_key = None
+    for line in text.splitlines():
+        if not line.strip():
+            if fields:
+                paragraphs.append(fields)
+                fields = {}
+            last_key = None
+            continue
+        if line[0] in ' \t':
+            # 续行只对多行字段有意义，依赖计算用不到，直接拼接
+            if last_key:
+                fields[last_key] += '\n' + line.strip()
+            continue
+        key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        last_key = key.strip()
+        fields[last_key] = value.strip()
+    if fields:
+        paragraphs.append(fields)
+    return paragraphs
+
+
+def parse_depends_field(value):
+    """解析 Depends/Pre-Depends 字段，返回可选项分组: ((包名, 架构限定), ...) 的元组"""
+    groups = []
+    for group in value.split(','):
+        alternatives = []
+        for alt in group.split('|'):
+            alt = alt.strip()
+            if not alt:
+                continue
+            # 去掉版本约束 "(>= 1.0)"、架构列表 "[amd64]" 和构建配置 "<!nocheck>"
+            name = re.split(r'[\s(\[<]', alt, 1)[0]
+            name, _, qualifier = name.partition(':')
+            alternatives.append((name, qualifier))
+        if alternatives:
+            groups.append(tuple(alternatives))
+    return tuple(groups)
+
+
+def seek_ar_member(f, wanted_prefix):
+    """在打开的 ar 归档中定位第一个名称以 wanted_prefix 开头的成员
+    
+    返回 (成员名, 大小)，文件位置停在成员数据开头；找不到时返回 (None, 0)。
+    """
+    if f.read(8) != b'!<arch>\n':
+        return None, 0
+    while True:
+        header = f.read(60)
+        if len(header) < 60:
+            return None, 0
+        name = header[:16].decode('ascii', 'replace').strip().rstrip('/')
+        size = int(header[48:58].decode('ascii').strip())
+        if name.startswith(wanted_prefix):
+            return name, size
+        # 成员数据按偶数字节对齐
+        f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def read_ar_member(path, wanted_prefix):
+    """从 ar 归档（.deb 文件）中读取第一个名称以 wanted_prefix 开头的成员，返回 (成员名, 数据)"""
+    with open(path, 'rb') as f:
+        name, size = seek_ar_member(f, wanted_prefix)
+        if name is None:
+            return None, None
+        return name, f.read(size)
+
+
+# .deb 中压缩成员的魔数，按成员名后缀检查
+DEB_MEMBER_MAGIC = {
+    '.gz': b'\x1f\x8b',
+    '.xz': b'\xfd7zXZ\x00',
+    '.zst': b'\x28\xb5\x2f\xfd',
+    '.bz2': b'BZh',
+    '.lzma': b'\x5d\x00\x00',
+}
+
+
+def verify_deb_file(path, expected_size=None):
+    """检查 .deb 文件的完整性，返回 (是否完好, 原因)
+    
+    通过 mmap 读取：检查 ar 魔数和每个成员头，成员大小不能超出文件，必须依次包含
+    debian-binary、control.tar* 和 data.tar*，压缩成员的魔数与后缀一致；
+    expected_size 来自仓库索引，已知时同时比较文件大小。
+    """
+    import mmap
+    
+    try:
+        size = os.path.getsize(path)
+        if expected_size is not None and size != expected_size:
+            return False, f"大小 {size} 与索引中的 {expected_size} 不一致"
+        if size < 8:
+            return False, "文件过短"
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:8] != b'!<arch>\n':
+                return False, "不是 ar 归档"
+            members = []
+            offset = 8
+            while offset < size:
+                header = data[offset:offset + 60]
+                if len(header) < 60:
+                    return False, f"成员头在偏移 {offset} 处被截断"
+                if header[58:60] != b'`\n':
+                    return False, f"偏移 {offset} 处的成员头无效"
+                try:
+                    member_size = int(header[48:58].decode('ascii').strip())
+                except ValueError:
+                    return False, f"偏移 {offset} 处的成员大小无效"
+                name = header[:16].decode('ascii', 'replace').strip().rstrip('/')
+                start = offset + 60
+                if start + member_size > size:
+                    return False, f"成员 {name} 被截断（缺少 {start + member_size - size} 字节）"
+                for suffix, magic in DEB_MEMBER_MAGIC.items():
+                    if name.endswith(suffix) and data[start:start + len(magic)] != magic:
+                        return False, f"成员 {name} 的压缩格式与内容不符"
+                members.append(name)
+                # 成员数据按偶数字节对齐
+                offset = start + member_size + (member_size & 1)
+        if (len(members) < 3 or members[0] != 'debian-binary' or not members[1].startswith('control.tar')
+                or not any(name.startswith('data.tar') for name in members[2:])):
+            return False, f"成员不完整: {', '.join(members) or '无'}"
+        return True, ''
+    except (OSError, ValueError) as e:
+        return False, str(e)
+
+
+class ArMemberReader:
+    """只读取 ar 成员数据范围的文件包装，供 tarfile 以流方式读取"""
+    
+    def __init__(self, f, size):
+        self.f = f
+        self.remaining = size
+    
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def read_deb_control(path):
+    """读取 .deb 文件的 control 字段"""
+    import lzma
+    import tarfile
+    
+    name, data = read_ar_member(path, 'control.tar')
+    if data is not None and not name.endswith('.zst'):
+        try:
+            with tarfile.open(fileobj=io.BytesIO(data), mode='r:*') as tar:
+                for member in tar:
+                    if member.name in ('./control', 'control'):
+                        text = tar.extractfile(member).read().decode('utf-8', 'replace')
+                        paragraphs = parse_control_paragraphs(text)
+                        return paragraphs[0] if paragraphs else {}
+        except (tarfile.TarError, EOFError, lzma.LZMAError, OSError):
+            pass
+    # zstd 压缩或解析失败时交给 dpkg-deb 处理
+    result = subprocess.run(['dpkg-deb', '--field', path], capture_output=True, text=True)
+    if result.returncode != 0:
+        return {}
+    paragraphs = parse_control_paragraphs(result.stdout)
+    return paragraphs[0] if paragraphs else {}
+
+
+def decode_index_data(name, data):
+    """按索引文件名解压 Packages 索引内容"""
+    if name.endswith('.xz'):
+        import lzma
+        data = lzma.decompress(data)
+    elif name.endswith('.gz'):
+        import gzip
+        data = gzip.decompress(data)
+    return data.decode('utf-8', 'replace')
+
+
+def load_repository_index(source, log=None):
+    """加载源对应的仓库索引，返回 {文件名: 控制字段}
+    
+    网络源和带 Packages 文件的本地目录直接读取索引；
+    没有索引的本地目录则并发读取每个 .deb 的 control 信息。
+    """
+    import urllib.request
+    
+    log = log or (lambda message: None)
+    index = {}
+    is_network = source.startswith(('http://', 'https://', 'ftp://')) or not os.path.exists(source)
+    
+    for index_name in PACKAGES_INDEX_NAMES:
+        try:
+            if is_network:
+                index_url = source.rstrip('/') + '/' + index_name
+                with urllib.request.urlopen(index_url, timeout=10) as response:
+                    data = response.read()
+            else:
+                index_path = os.path.join(source, index_name)
+                if not os.path.isfile(index_path):
+                    continue
+                with open(index_path, 'rb') as f:
+                    data = f.read()
+            text = decode_index_data(index_name, data)
+        except Exception:
+            continue
+        for fields in parse_control_paragraphs(text):
+            filename = os.path.basename(fields.get('Filename', ''))
+            if filename:
+                index[filename] = fields
+        log(f"[依赖] 已加载仓库索引 {index_name}，共 {len(index)} 条记录")
+        return index
+    
+    if is_network:
+        log("[依赖] 网络源没有可用的 Packages 索引，无法计算依赖")
+        return index
+    
+    # 本地目录没有索引时，直接读取 .deb 的 control 信息
+    deb_files = [name for name in os.listdir(source) if name.endswith('.deb')]
+    
+    def read_one(filename):
+        full_path = os.path.join(source, filename)
+        fields = read_deb_control(full_path)
+        if fields:
+            fields.setdefault('Size', str(os.path.getsize(full_path)))
+        return filename, fields
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        for filename, fields in executor.map(read_one, deb_files):
+            if fields:
+                index[filename] = fields
+    log(f"[依赖] 已读取 {len(index)} 个本地DEB包的控制信息")
+    return index
+
+
+def apply_repository_index(packages, index):
+    """将仓库索引中的大小、校验和依赖信息合并到包数据中"""
+    for pkg in packages:
+        fields = index.get(pkg.get('full_filename', ''))
+        if not fields:
+            continue
+        if fields.get('Size', '').isdigit():
+            pkg['size'] = int(fields['Size'])
+        if 'SHA256' in fields:
+            pkg['sha256'] = fields['SHA256']
+        depends = ', '.join(fields[key] for key in ('Pre-Depends', 'Depends') if fields.get(key))
+        pkg['depends'] = parse_depends_field(depends)
+        pkg['provides'] = tuple(name for group in parse_depends_field(fields.get('Provides', ''))
+                                for name, _ in group)
+        if fields.get('Build-Ids'):
+            pkg['build_ids'] = tuple(fields['Build-Ids'].split())
+        if fields.get('Source'):
+            # Source 字段可能带版本号，如 "foo (1.0-1)"
+            pkg['source_package'] = fields['Source'].split()[0]
+
+
+def apply_source_indexes(packages, sources, log=None):
+    """为每个源分别加载仓库索引，并合并到来自该源的包数据中"""
+    for source in sources:
+        index = load_repository_index(source, log=log)
+        apply_repository_index([pkg for pkg in packages if pkg.get('source', source) == source], index)
+
+
+class DependencyGraph:
+    """源内依赖关系图，用于计算选中包的依赖闭包"""
+    
+    def __init__(self, packages):
+        self.packages = packages
+        # (包名, 架构) -> [包序号]，虚包通过 Provides 同样登记到这里
+        self.by_name_arch = {}
+        for i, pkg in enumerate(packages):
+            arch = pkg.get('arch', '')
+            self.by_name_arch.setdefault((pkg['name'], arch), []).append(i)
+            for virtual in pkg.get('provides', ()):
+                self.by_name_arch.setdefault((virtual, arch), []).append(i)
+        # 同一个包有多个版本时，依赖只选择最高版本
+        for candidates in self.by_name_arch.values():
+            candidates.sort(key=lambda i: deb_version_key(packages[i].get('version', '')), reverse=True)
+        # 相同的依赖分组在大量包之间重复出现（如 libc6），缓存解析结果
+        self._resolve_cache = {}
+    
+    def _resolve_group(self, group, arches):
+        """在源内为一个依赖分组选择第一个可满足的候选，返回包序号列表"""
+        cache_key = (group, arches)
+        if cache_key in self._resolve_cache:
+            return self._resolve_cache[cache_key]
+        result = ()
+        for name, _qualifier in group:
+            for arch in arches:
+                candidates = self.by_name_arch.get((name, arch))
+                if candidates:
+                    result = (candidates[0],)
+                    break
+            if result:
+                break
+        self._resolve_cache[cache_key] = result
+        return result
+    
+    def closure(self, roots, selected_archs):
+        """计算 roots（包序号）在源内的依赖闭包，返回包含 roots 的包序号集合"""
+        selected_archs = tuple(arch for arch in selected_archs if arch != 'all')
+        seen = set(roots)
+        stack = list(roots)
+        while stack:
+            pkg = self.packages[stack.pop()]
+            arch = pkg.get('arch', '')
+            if arch == 'all':
+                # 架构无关的包，其依赖可由任意选中架构满足
+                arches = selected_archs + ('all',)
+            else:
+                arches = (arch, 'all')
+            for group in pkg.get('depends', ()):
+                for candidate in self._resolve_group(group, arches):
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        stack.append(candidate)
+        return seen
+    
+    def dependencies(self, index, selected_archs):
+        """返回某个包在源内的直接依赖（包序号集合）"""
+        selected_archs = tuple(arch for arch in selected_archs if arch != 'all')
+        pkg = self.packages[index]
+        arch = pkg.get('arch', '')
+        arches = selected_archs + ('all',) if arch == 'all' else (arch, 'all')
+        return {candidate for group in pkg.get('depends', ())
+                for candidate in self._resolve_group(group, arches)} - {index}
+
+
+class PackageSelection:
+    """包勾选状态模型
+    
+    勾选状态保存在以唯一标识符为键的集合中，不再为每一行创建 tk.BooleanVar；
+    同时维护表格项与行序号的索引，范围选择不需要线性查找表格项。
+    """
+    
+    def __init__(self):
+        self.checked = set()
+        self.reset_rows()
+    
+    def reset_rows(self):
+        """清空行索引（表格重建时调用）"""
+        self.items = []          # 行序号 -> 表格项
+        self.keys = []           # 行序号 -> 唯一标识符
+        self.row_of_item = {}    # 表格项 -> 行序号
+        self.items_of_key = {}   # 唯一标识符 -> [表格项]
+    
+    def add_row(self, item, key):
+        """登记表格中新插入的一行"""
+        self.row_of_item[item] = len(self.items)
+        self.items.append(item)
+        self.keys.append(key)
+        self.items_of_key.setdefault(key, []).append(item)
+    
+    def is_checked(self, key):
+        """检查唯一标识符是否已勾选"""
+        return key in self.checked
+    
+    def key_of_item(self, item):
+        """获取表格项对应的唯一标识符"""
+        row = self.row_of_item.get(item)
+        return self.keys[row] if row is not None else None
+    
+    def set_checked(self, keys, value):
+        """批量设置勾选状态"""
+        if value:
+            self.checked.update(keys)
+        else:
+            self.checked.difference_update(keys)
+    
+    def toggle(self, keys):
+        """批量切换勾选状态"""
+        self.checked.symmetric_difference_update(set(keys))
+    
+    def check_all_rows(self):
+        """勾选表格中显示的所有行"""
+        self.checked.update(self.keys)
+    
+    def clear(self):
+        """取消所有勾选"""
+        self.checked.clear()
+    
+    def items_for_keys(self, keys):
+        """获取唯一标识符对应的表格项"""
+        return [item for key in keys for item in self.items_of_key.get(key, ())]
+    
+    def items_between(self, start_item, end_item):
+        """获取两个表格项之间（含两端）的所有表格项，任一项不存在时返回 None"""
+        start_row = self.row_of_item.get(start_item)
+        end_row = self.row_of_item.get(end_item)
+        if start_row is None or end_row is None:
+            return None
+        if start_row > end_row:
+            start_row, end_row = end_row, start_row
+        return self.items[start_row:end_row + 1]
+
+
+class PackageCatalog:
+    """基于 SQLite 的本地包目录
+    
+    按源保存包列表（名称、架构、版本建有索引）和下载历史。每次操作单独打开连接，
+    可在工作线程中直接调用。
+    """
+    
+    # 会话内的状态，不写入目录
+    TRANSIENT_FIELDS = ('selected', 'status', 'download_time', 'depends', 'provides', 'source_priority')
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sources (
+            source TEXT PRIMARY KEY,
+            updated_at TEXT NOT NULL,
+            package_count INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS packages (
+            source TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            version TEXT NOT NULL,
+            arch TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (source, filename)
+        );
+        CREATE INDEX IF NOT EXISTS idx_packages_name ON packages (source, name, arch, version);
+        CREATE INDEX IF NOT EXISTS idx_packages_arch ON packages (source, arch, name);
+        CREATE TABLE IF NOT EXISTS downloads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            name TEXT NOT NULL,
+            version TEXT NOT NULL,
+            arch TEXT NOT NULL,
+            save_path TEXT NOT NULL,
+            success INTEGER NOT NULL,
+            downloaded_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_downloads_file ON downloads (source, filename);
+    """
+    
+    def __init__(self, path=CATALOG_FILE):
+        self.path = path
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+    
+    def connect(self):
+        """打开数据库连接，写操作在 with 块内自动提交"""
+        return sqlite3.connect(self.path, timeout=10)
+    
+    @staticmethod
+    def package_filename(pkg):
+        return pkg.get('full_filename') or f"{pkg['name']}_{pkg.get('version', '')}_{pkg.get('arch', '')}.deb"
+    
+    def save_listing(self, source, packages, start=0, replace=True):
+        """用最新获取的结果替换某个源的包列表
         
-        # 设置主题样式
-        self.setup_styles()
+        replace 为 False 时追加到已有列表之后，序号从 start 开始，用于递归抓取时逐页写入。
+        """
+        rows = []
+        for position, pkg in enumerate(packages, start):
+            data = {key: value for key, value in pkg.items() if key not in self.TRANSIENT_FIELDS}
+            rows.append((source, self.package_filename(pkg), position, pkg['name'],
+                         pkg.get('version', ''), pkg.get('arch', ''), json.dumps(data, ensure_ascii=False)))
         
-        # 配置文件路径
-        self.config_file = os.path.join(os.path.expanduser("~"), ".deb_saver_config.json")
+        with self.connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM packages WHERE source = ?", (source,))
+            conn.executemany("INSERT OR REPLACE INTO packages VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                         (source, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), start + len(rows)))
+    
+    def source_info(self, source):
+        """返回 (上次更新时间, 包数量)，没有记录时返回 None"""
+        with self.connect() as conn:
+            return conn.execute("SELECT updated_at, package_count FROM sources WHERE source = ?",
+                                (source,)).fetchone()
+    
+    def load_sources(self, sources, keyword=''):
+        """读取多个源的包列表并按源优先级合并，附带下载历史中的状态"""
+        package_lists = [self.search(source, keyword) for source in sources]
+        for priority, packages in enumerate(package_lists):
+            for pkg in packages:
+                pkg['source_priority'] = priority
+        if len(sources) == 1:
+            return package_lists[0] if package_lists else []
+        return merge_package_lists(package_lists)
+    
+    def search(self, source, keyword='', archs=None):
+        """在某个源的目录中查询包，关键字规则与界面搜索（search_packages）一致
         
-        # 消息队列用于线程间通信
-        self.message_queue = queue.Queue()
+        架构条件走 (source, arch, name) 索引。关键字以 * 结尾时只查包名以其开头的包，
+        使用 (source, name) 索引做范围查询；否则按子串匹配包名、架构或版本，子串条件
+        用不上索引，需要逐行比较该源的所有包。
+        """
+        query = "SELECT data FROM packages WHERE source = ?"
+        params = [source]
+        if archs:
+            query += f" AND arch IN ({', '.join('?' * len(archs))})"
+            params.extend(archs)
+        keyword = keyword.strip().lower()
+        if keyword.endswith('*'):
+            keyword = keyword.rstrip('*')
+            query += " AND name >= ? AND name < ?"
+            params.extend([keyword, keyword + '\uffff'])
+        elif keyword:
+            query += " AND (instr(lower(name), ?) OR instr(lower(arch), ?) OR instr(lower(version), ?))"
+            params.extend([keyword] * 3)
+        query += " ORDER BY position"
         
-        # 下载源变量
-        self.source_url = tk.StringVar(value="http://10.0.32.60:5001/tasks/580959/unstable-arm64/")
+        with self.connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+            history = self.download_history(conn, source)
         
-        # 架构选择变量
-        self.arch_vars = {
-            'arm64': tk.BooleanVar(value=False),
-            'amd64': tk.BooleanVar(value=False),
-            'i386': tk.BooleanVar(value=False),
-            'loongarch64': tk.BooleanVar(value=False),
-            'mips64el': tk.BooleanVar(value=False),
-            'sw_64': tk.BooleanVar(value=False),
-            'all': tk.BooleanVar(value=False)  # 'all' 是一种特殊的架构类型，不是全选功能
-        }
+        packages = []
+        for (data,) in rows:
+            pkg = json.loads(data)
+            pkg['source'] = source
+            record = history.get(self.package_filename(pkg))
+            if record and os.path.exists(os.path.join(record[0], self.package_filename(pkg))):
+                pkg['status'] = '已下载'
+                pkg['download_time'] = record[1]
+            packages.append(pkg)
+        return packages
+    
+    def download_history(self, conn, source):
+        """返回某个源中每个文件最近一次成功下载的 {文件名: (保存目录, 时间)}"""
+        rows = conn.execute(
+            "SELECT filename, save_path, downloaded_at FROM downloads "
+            "WHERE source = ? AND success = 1 ORDER BY id", (source,)).fetchall()
+        return {filename: (save_path, downloaded_at) for filename, save_path, downloaded_at in rows}
+    
+    def record_downloads(self, results, save_path, source=''):
+        """记录一批下载结果，results 为 [(包, 是否成功), ...]"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(pkg.get('source', source), self.package_filename(pkg), pkg['name'], pkg.get('version', ''),
+                 pkg.get('arch', ''), os.path.abspath(save_path), int(bool(success)), now)
+                for pkg, success in results]
+        with self.connect() as conn:
+            conn.executemany(
+                "INSERT INTO downloads (source, filename, name, version, arch, save_path, success, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='wb', **kwargs):
+    """写入目标目录中唯一命名的临时文件，完成后原子替换目标文件
+    
+    多个线程或进程同时写同一个目标时各用各的临时文件，不会互相覆盖；出错时删除临时文件。
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.part',
+                                     dir=os.path.dirname(path) or '.')
+    try:
+        # mkstemp 创建的文件只有属主可读，改为普通文件的权限
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DebugStore:
+    """按 build-id 组织的调试符号仓库
+    
+    目录结构与 /usr/lib/debug 相同（.build-id/xx/yyyy.debug），gdb 中
+    set debug-file-directory 指向该目录即可使用；index.json 记录每个
+    build-id 来自哪个包和版本。
+    """
+    
+    INDEX_FILE = 'index.json'
+    DEBUG_PREFIX = 'usr/lib/debug/'
+    
+    def __init__(self, root=DEBUG_STORE_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+    
+    def load_index(self):
+        try:
+            with open(os.path.join(self.root, self.INDEX_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        index_path = os.path.join(self.root, self.INDEX_FILE)
+        with atomic_write(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1, sort_keys=True)
+    
+    def lookup(self, build_id):
+        """查询 build-id，返回索引记录（包含包名、版本、架构和 .debug 文件路径），没有时返回 None"""
+        return self.load_index().get(build_id.lower())
+    
+    @contextlib.contextmanager
+    def open_data_tar(self, deb_path):
+        """以流方式打开 .deb 中的 data.tar.*，不解压到临时文件"""
+        import tarfile
         
-        # 全选架构变量
-        self.select_all_archs = tk.BooleanVar(value=False)
+        with open(deb_path, 'rb') as f:
+            name, size = seek_ar_member(f, 'data.tar')
+            if name is None:
+                raise ValueError(f"不是有效的 .deb 文件: {deb_path}")
+            if not name.endswith('.zst'):
+                with tarfile.open(fileobj=ArMemberReader(f, size), mode='r|*') as tar:
+                    yield tar
+                return
         
-        # 符号包选择变量
-        self.include_dbgsym = tk.BooleanVar(value=False)
+        # tarfile 不支持 zstd，交给 dpkg-deb 解压后通过管道读取
+        process = subprocess.Popen(['dpkg-deb', '--fsys-tarfile', deb_path], stdout=subprocess.PIPE)
+        try:
+            with tarfile.open(fileobj=process.stdout, mode='r|') as tar:
+                yield tar
+        finally:
+            process.stdout.close()
+            process.wait()
+    
+    def extract_package(self, deb_path, pkg):
+        """提取一个 dbgsym 包中的调试文件，返回 {build-id: 索引记录}"""
+        entries = {}
+        with self.open_data_tar(deb_path) as tar:
+            for member in tar:
+                path = member.name.lstrip('./')
+                if not member.isfile() or not path.startswith(self.DEBUG_PREFIX):
+                    continue
+                relative = path[len(self.DEBUG_PREFIX):]
+                # 只保留 build-id 文件和 dwz 公共调试文件
+                if not relative.startswith(('.build-id/', '.dwz/')) or '..' in relative.split('/'):
+                    continue
+                
+                target_path = os.path.join(self.root, relative)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                # 不同的包可能带有相同的 .dwz 文件，并发提取时不能共用临时文件
+                with tar.extractfile(member) as src, atomic_write(target_path) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                
+                parts = relative.split('/')
+                if parts[0] == '.build-id' and len(parts) == 3 and parts[2].endswith('.debug'):
+                    build_id = (parts[1] + parts[2][:-len('.debug')]).lower()
+                    entries[build_id] = {
+                        'package': pkg['name'],
+                        'version': pkg.get('version', ''),
+                        'arch': pkg.get('arch', ''),
+                        'path': target_path,
+                    }
+        return entries
+    
+    def extract_packages(self, items, max_workers=4, log=None):
+        """并发提取多个 dbgsym 包，items 为 [(.deb 路径, 包数据), ...]，返回 (成功数, 失败数, build-id 数)"""
+        log = log or (lambda message: None)
+        success_count, error_count = 0, 0
+        new_entries = {}
         
-        # 显示日志选择变量
-        self.show_log = tk.BooleanVar(value=False)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.extract_package, deb_path, pkg): pkg for deb_path, pkg in items}
+            for future in concurrent.futures.as_completed(futures):
+                pkg = futures[future]
+                try:
+                    entries = future.result()
+                except Exception as e:
+                    error_count += 1
+                    log(f"[错误] 提取调试符号失败: {pkg['name']}, 错误: {str(e)}")
+                    continue
+                success_count += 1
+                new_entries.update(entries)
+                log(f"[符号] {pkg['name']} 提取 {len(entries)} 个调试文件")
         
-        # 本地保存位置变量
-        self.save_path = tk.StringVar(value="")
+        if new_entries:
+            with self.lock:
+                index = self.load_index()
+                index.update(new_entries)
+                self.save_index(index)
+        return success_count, error_count, len(new_entries)
+
+
+def find_build_id_packages(packages, build_id):
+    """在带仓库索引信息（Build-Ids 字段）的包列表中查找提供该 build-id 的包"""
+    build_id = build_id.lower()
+    return [pkg for pkg in packages if build_id in pkg.get('build_ids', ())]
+
+
+class LocalRepository:
+    """把一个保存目录维护成平铺结构的 apt 仓库（Packages、Packages.gz、Release）
+    
+    每个 .deb 的控制信息和校验和按 (大小, 修改时间) 缓存在 REPO_STATE_FILE 中，
+    更新索引时只读取新增或变化的文件，删除的文件直接从缓存中去掉。
+    其他机器可使用: deb [trusted=yes] http://主机:端口/ ./
+    """
+    
+    def __init__(self, path):
+        self.path = path
+    
+    def load_state(self):
+        try:
+            with open(os.path.join(self.path, REPO_STATE_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def write_file(self, name, data):
+        """先写临时文件再替换，apt 读取时不会看到写了一半的索引"""
+        with atomic_write(os.path.join(self.path, name)) as f:
+            f.write(data)
+    
+    @staticmethod
+    def read_entry(file_path, stat):
+        """读取一个 .deb 的控制信息和校验和"""
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                md5.update(chunk)
+                sha256.update(chunk)
+        return {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'md5': md5.hexdigest(),
+            'sha256': sha256.hexdigest(),
+            'control': read_deb_control(file_path),
+        }
+    
+    def update(self, max_workers=4, log=None):
+        """增量更新仓库索引，返回 (新增或变化数, 删除数, 总数)"""
+        import gzip
+        from email.utils import formatdate
         
-        # 搜索关键字变量
-        self.search_keyword = tk.StringVar(value="")
+        log = log or (lambda message: None)
+        state = self.load_state()
+        current = {}
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.deb') and entry.is_file():
+                current[entry.name] = entry.stat()
         
-        # 包列表数据
-        self.package_data = []
-        self.filtered_package_data = []  # 过滤后的包数据
-        self.package_vars = {}  # 存储每个包的选择状态
+        removed = [name for name in state if name not in current]
+        for name in removed:
+            del state[name]
+        changed = [name for name, stat in current.items()
+                   if name not in state or state[name]['size'] != stat.st_size or
+                   state[name]['mtime_ns'] != stat.st_mtime_ns]
         
-        # 创建临时目录
-        self.create_temp_directory()
+        # 只有新增或变化的文件需要读取，并发计算
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.read_entry, os.path.join(self.path, name), current[name]): name
+                       for name in changed}
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    state[name] = future.result()
+                except Exception as e:
+                    log(f"[警告] 读取包信息失败，未加入索引: {name}, 错误: {str(e)}")
         
-        # 创建界面
-        self.create_widgets()
+        if not changed and not removed and os.path.exists(os.path.join(self.path, 'Release')):
+            return 0, 0, len(state)
         
-        # 加载配置
-        self.load_config()
+        paragraphs = []
+        architectures = set()
+        for name in sorted(state):
+            entry = state[name]
+            control = {key: value for key, value in entry['control'].items()
+                       if key not in ('Filename', 'Size', 'MD5sum', 'SHA256')}
+            if not control.get('Package'):
+                continue
+            architectures.add(control.get('Architecture', ''))
+            lines = [f"{key}: {value.replace(chr(10), chr(10) + ' ')}" for key, value in control.items()]
+            lines += [f"Filename: ./{name}", f"Size: {entry['size']}",
+                      f"MD5sum: {entry['md5']}", f"SHA256: {entry['sha256']}"]
+            paragraphs.append('\n'.join(lines) + '\n')
         
-        # 启动消息队列处理
-        self.process_queue()
+        packages_data = '\n'.join(paragraphs).encode('utf-8')
+        index_files = {'Packages': packages_data, 'Packages.gz': gzip.compress(packages_data, mtime=0)}
+        release = [
+            "Origin: deb-saver",
+            "Label: deb-saver",
+            f"Date: {formatdate(usegmt=True)}",
+            f"Architectures: {' '.join(sorted(arch for arch in architectures if arch))}",
+        ]
+        for field, algorithm in (('MD5Sum', hashlib.md5), ('SHA256', hashlib.sha256)):
+            release.append(f"{field}:")
+            for name, data in index_files.items():
+                release.append(f" {algorithm(data).hexdigest()} {len(data)} {name}")
         
-        # 绑定滚动事件
-        self.root.after(100, self._bind_all_scroll_events)
+        for name, data in index_files.items():
+            self.write_file(name, data)
+        self.write_file('Release', ('\n'.join(release) + '\n').encode('utf-8'))
+        self.write_file(REPO_STATE_FILE, json.dumps(state, ensure_ascii=False).encode('utf-8'))
         
-        # 绑定全局鼠标点击事件，用于关闭右键菜单
-        self.root.bind("<Button-1>", self._on_global_click)
+        log(f"[仓库] 索引已更新: 新增或变化 {len(changed)} 个，删除 {len(removed)} 个，共 {len(state)} 个包")
+        return len(changed), len(removed), len(state)
+
+
+class RepositoryServer:
+    """在后台线程中通过 HTTP 提供本地仓库目录"""
     
-    def setup_styles(self):
-        """设置界面样式"""
-        style = ttk.Style()
-        style.theme_use('clam')
-        
-        # 配置样式
-        style.configure('Title.TLabel', font=('Arial', 14, 'bold'), foreground='#2c3e50')
-        style.configure('Header.TLabel', font=('Arial', 11, 'bold'), foreground='#34495e')
-        style.configure('Info.TLabel', font=('Arial', 10), foreground='#7f8c8d')
-        style.configure('Status.TLabel', font=('Arial', 10), foreground='orange')
-        
-        # 按钮样式
-        style.configure('Primary.TButton', font=('Arial', 10, 'bold'))
-        style.configure('Success.TButton', font=('Arial', 10, 'bold'))
-        style.configure('Warning.TButton', font=('Arial', 10, 'bold'))
-        style.configure('Danger.TButton', font=('Arial', 10, 'bold'))
-        
-        # 框架样式
-        style.configure('Card.TFrame', relief='solid', borderwidth=1)
-        style.configure('Section.TFrame', relief='groove', borderwidth=2)
+    def __init__(self, path, port=REPO_SERVER_PORT, host='0.0.0.0'):
+        self.path = path
+        self.port = port
+        self.host = host
+        self.server = None
+    
+    def start(self):
+        import http.server
         
-        # 标签框架样式
-        style.configure('Title.TLabelframe', font=('Arial', 11, 'bold'), foreground='#2c3e50')
-        style.configure('Title.TLabelframe.Label', font=('Arial', 11, 'bold'), foreground='#2c3e50')
+        class QuietHandler(http.server.SimpleHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
         
-        # 进度条样式
-        style.configure('Custom.Horizontal.TProgressbar', 
-                       background='#4a90e2', 
-                       troughcolor='#ecf0f1',
-                       borderwidth=0,
-                       lightcolor='#4a90e2',
-                       darkcolor='#357abd')
-        
-        # 树形视图样式
-        style.configure('Treeview', font=('Arial', 9), rowheight=25)
-        style.configure('Treeview.Heading', font=('Arial', 10, 'bold'), foreground='#2c3e50')
-        
-        # 输入框样式
-        style.configure('TEntry', font=('Arial', 10))
-        style.configure('TCombobox', font=('Arial', 10))
-        
-        # 复选框样式
-        style.configure('TCheckbutton', font=('Arial', 10))
-        
-        # 滚动条样式
-        style.configure('TScrollbar', background='#bdc3c7', troughcolor='#ecf0f1', width=12)
+        handler = functools.partial(QuietHandler, directory=self.path)
+        self.server = http.server.ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.url()
     
-    def create_temp_directory(self):
-        """创建临时目录"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.temp_dir = f"/tmp/deb_saver_{timestamp}"
-        os.makedirs(self.temp_dir, exist_ok=True)
-        self.save_path.set(self.temp_dir)
-        self.log_message(f"[初始化] 创建临时目录: {self.temp_dir}")
+    def url(self):
+        import socket
+        # 监听所有地址时使用本机主机名，方便其他机器访问
+        host = socket.gethostname() if self.host in ('0.0.0.0', '') else self.host
+        return f"http://{host}:{self.server.server_address[1]}/"
     
-    def create_widgets(self):
-        """创建界面组件"""
-        # 主框架
-        main_frame = ttk.Frame(self.root, padding="15")
-        main_frame.grid(row=0, column=0, sticky="nsew")
-        
-        # 配置网格权重
-        self.root.columnconfigure(0, weight=1)
-        self.root.rowconfigure(0, weight=1)
-        main_frame.columnconfigure(0, weight=1)
-        # 配置主框架中各行的权重，让包表格区域占据主要空间
-        main_frame.rowconfigure(0, weight=0)  # 配置区域固定高度
-        main_frame.rowconfigure(1, weight=0)  # 搜索区域固定高度
-        main_frame.rowconfigure(2, weight=1)  # 包表格区域占据剩余空间
-        main_frame.rowconfigure(3, weight=0)  # 按钮区域固定高度
-        main_frame.rowconfigure(4, weight=0)  # 日志区域固定高度
-        main_frame.rowconfigure(5, weight=0)  # 进度条固定高度
-        main_frame.rowconfigure(6, weight=0)  # 状态栏固定高度
-        
-        # 配置区域
-        config_frame = ttk.LabelFrame(main_frame, text="配置选项", padding="10", style='Title.TLabelframe')
-        config_frame.grid(row=0, column=0, sticky="ew")
-        config_frame.columnconfigure(1, weight=1)
-        
-        # 下载源配置
-        ttk.Label(config_frame, text="下载源:", style='Header.TLabel').grid(row=0, column=0, sticky="w")
-        
-        source_frame = ttk.Frame(config_frame)
-        source_frame.grid(row=0, column=1, sticky="ew")
-        source_frame.columnconfigure(0, weight=1)
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class PackageInstaller:
+    """通过 pkexec 启动的特权安装进程
+    
+    进程只启动一次，整个批次只需认证一次。每批 .deb 路径以制表符分隔写成一行，
+    进程对其执行 dpkg -i 并回写 OK 或 FAIL；dpkg 的输出直接写到标准错误。
+    """
+    
+    HELPER_SCRIPT = (
+        'set -f; tab=$(printf "\\t"); '
+        'while IFS= read -r line; do '
+        'IFS=$tab; set -- $line; IFS=" "; '
+        'if dpkg -i "$@" 1>&2; then echo OK; else echo FAIL; fi; '
+        'done')
+    
+    def __init__(self, command=None):
+        self.command = command or ['pkexec', 'env', 'DEBIAN_FRONTEND=noninteractive',
+                                   'sh', '-c', self.HELPER_SCRIPT]
+        self.process = None
+    
+    def install(self, paths):
+        """安装一批 .deb 文件，返回 dpkg 是否成功；安装进程不可用时抛出 RuntimeError"""
+        if self.process is None:
+            self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            text=True, bufsize=1)
+        try:
+            self.process.stdin.write('\t'.join(os.path.abspath(path) for path in paths) + '\n')
+            self.process.stdin.flush()
+            reply = self.process.stdout.readline().strip()
+        except OSError:
+            reply = ''
+        if not reply:
+            # 认证被取消或进程异常退出
+            self.close()
+            raise RuntimeError("安装进程已退出（可能取消了授权）")
+        return reply == 'OK'
+    
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.process = None
+    
+    @staticmethod
+    def is_installed(pkg):
+        """查询系统中是否已安装该包的这个版本"""
+        name = pkg['name'] if pkg.get('arch') in ('', 'all') else f"{pkg['name']}:{pkg['arch']}"
+        result = subprocess.run(['dpkg-query', '-W', '-f=${Version}\t${db:Status-Status}', name],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return False
+        import urllib.parse
+        version, _, status = result.stdout.partition('\t')
+        # 文件名中的纪元可能被编码为 %3a，且 dpkg 对 0 纪元不显示前缀，按排序键比较
+        expected = urllib.parse.unquote(pkg.get('version', ''))
+        return status == 'installed' and deb_version_key(version) == deb_version_key(expected)
+
+
+class HostUnavailableError(OSError):
+    """主机的熔断器处于打开状态，暂不发送请求"""
+
+
+class TransferPolicy:
+    """按主机的网络重试与熔断策略
+    
+    临时错误（连接失败、超时、5xx、429）按带随机抖动的指数退避重试；
+    同一主机连续失败达到阈值后熔断，在暂停期内直接拒绝请求，到期后只放行一个探测请求，
+    探测成功即恢复，失败则再次暂停。404 等客户端错误说明主机正常，不重试也不计入失败。
+    """
+    
+    def __init__(self, retries=TRANSFER_RETRIES, backoff=TRANSFER_BACKOFF, max_backoff=TRANSFER_MAX_BACKOFF,
+                 failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT,
+                 host_policies=None, log=None):
+        self.defaults = {
+            'retries': retries,
+            'backoff': backoff,
+            'max_backoff': max_backoff,
+            'failure_threshold': failure_threshold,
+            'reset_timeout': reset_timeout,
+        }
+        # 主机 -> 覆盖默认值的参数，如 {'mirror.example.com': {'retries': 5}}
+        self.host_policies = dict(host_policies or {})
+        self.log = log or (lambda message: None)
+        self.lock = threading.Lock()
+        # 主机 -> {'failures': 连续失败次数, 'open_until': 熔断到期时间, 'probing': 是否有探测请求在进行}
+        self.hosts = {}
+    
+    @staticmethod
+    def host_of(url):
+        import urllib.parse
+        return urllib.parse.urlsplit(url).netloc
+    
+    def policy(self, host):
+        return {**self.defaults, **self.host_policies.get(host, {})}
+    
+    def acquire(self, host):
+        """检查是否允许向主机发送请求，熔断到期时只允许一个探测请求通过"""
+        with self.lock:
+            state = self.hosts.get(host)
+            if state is None or state['open_until'] is None:
+                return True
+            if time.monotonic() < state['open_until'] or state['probing']:
+                return False
+            state['probing'] = True
+            return True
+    
+    def record_success(self, host):
+        with self.lock:
+            state = self.hosts.pop(host, None)
+        if state and state['open_until'] is not None:
+            self.log(f"[网络] 主机 {host} 已恢复")
+    
+    def release(self, host):
+        """请求因本地原因失败时结束探测，不计入主机的成败"""
+        with self.lock:
+            state = self.hosts.get(host)
+            if state:
+                state['probing'] = False
+    
+    def record_failure(self, host):
+        policy = self.policy(host)
+        with self.lock:
+            state = self.hosts.setdefault(host, {'failures': 0, 'open_until': None, 'probing': False})
+            state['failures'] += 1
+            probing = state['probing']
+            state['probing'] = False
+            if not probing and state['failures'] < policy['failure_threshold']:
+                return
+            state['open_until'] = time.monotonic() + policy['reset_timeout']
+            failures = state['failures']
+        self.log(f"[警告] 主机 {host} 连续失败 {failures} 次，暂停请求 {policy['reset_timeout']:.0f} 秒")
+    
+    def is_available(self, host):
+        with self.lock:
+            state = self.hosts.get(host)
+            return state is None or state['open_until'] is None or time.monotonic() >= state['open_until']
+    
+    @staticmethod
+    def is_retryable(error):
+        """只有网络和服务器端的临时错误值得重试；写临时文件等本地错误不重试"""
+        import urllib.error
+        import http.client
+        import socket
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code >= 500 or error.code in (408, 429)
+        return isinstance(error, (urllib.error.URLError, socket.timeout, ConnectionError,
+                                  http.client.HTTPException))
+    
+    def backoff_delay(self, host, attempt, error=None):
+        """第 attempt 次重试前的等待时间：全抖动的指数退避，服务器给出 Retry-After 时优先使用"""
+        import random
+        policy = self.policy(host)
+        retry_after = getattr(error, 'headers', None) and error.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), policy['max_backoff'])
+        return random.uniform(0, min(policy['max_backoff'], policy['backoff'] * (2 ** attempt)))
+    
+    def call(self, url, func):
+        """按主机策略执行 func()，临时错误时退避重试；主机熔断时抛出 HostUnavailableError"""
+        host = self.host_of(url)
+        retries = self.policy(host)['retries']
+        attempt = 0
+        while True:
+            if not self.acquire(host):
+                raise HostUnavailableError(f"主机 {host} 暂时不可用，已跳过")
+            try:
+                result = func()
+            except Exception as e:
+                if not self.is_retryable(e):
+                    import urllib.error
+                    if isinstance(e, urllib.error.HTTPError):
+                        # 客户端错误说明主机可以访问
+                        self.record_success(host)
+                    else:
+                        # 权限不足、磁盘已满等本地错误与主机无关
+                        self.release(host)
+                    raise
+                self.record_failure(host)
+                if attempt >= retries or not self.is_available(host):
+                    raise
+                delay = self.backoff_delay(host, attempt, e)
+                attempt += 1
+                self.log(f"[重试] {os.path.basename(url) or url} 第 {attempt} 次重试（{delay:.1f} 秒后）: {str(e)}")
+                time.sleep(delay)
+                continue
+            self.record_success(host)
+            return result
+
+
+class PackageEngine:
+    """包列表获取、过滤与下载引擎
+    
+    不依赖 tkinter，图形界面和命令行模式共用同一套逻辑。
+    """
+    
+    def __init__(self, log=None, status=None, debug=None, allow_mock=True, catalog=None):
+        self.log = log or (lambda message: None)
+        self.status = status or (lambda message: None)
+        # 调试日志回调，为 None 时不生成调试信息
+        self.debug = debug
+        # 网络获取失败时是否回退到模拟数据，命令行模式下关闭
+        self.allow_mock = allow_mock
+        # 本地包目录，为 None 时不记录包列表和下载历史
+        self.catalog = catalog
+        # 下载前是否按包大小预分配文件空间
+        self.preallocate = False
+        # 每个线程各自保存 HEAD 请求的持久连接
+        self.thread_local = threading.local()
+        # 按主机的重试与熔断策略，所有下载线程共享
+        self.transfer_policy = TransferPolicy(log=self.log)
+        # 主机 -> 限制同时请求数的信号量，同时抓取的多个源共享
+        self.host_slots = {}
+        self.host_slots_lock = threading.Lock()
+        # 网络源递归抓取子目录的层数，0 表示只读取源地址这一页
+        self.crawl_depth = 0
+    
+    def list_packages(self, source, save_path='', on_page=None, failed_pages=None):
+        """根据源类型自动选择网络获取或本地扫描
         
-        # 源路径输入
-        self.source_entry = ttk.Entry(source_frame, textvariable=self.source_url, font=('Arial', 10))
-        self.source_entry.grid(row=0, column=0, sticky="ew", padx=(0, 5), pady=5)
+        设置了递归层数时网络源按目录递归抓取，每抓到一页包就调用 on_page(该页的包)，
+        获取失败的目录页追加到 failed_pages 中。
+        """
+        if not source.startswith(('http://', 'https://', 'ftp://')) and os.path.exists(source):
+            return self.get_local_packages(source, save_path)
+        if self.crawl_depth > 0 and source.startswith(('http://', 'https://')):
+            return (self.crawl_network_packages(source, self.crawl_depth, on_page=on_page, failed_pages=failed_pages)
+                    or self._get_mock_packages(source))
+        return self.get_network_packages(source)
+    
+    def list_sources(self, sources, save_path='', max_workers=4, failed=None):
+        """并发获取多个源的包列表并合并，每个包记录所属的源
         
-        # 添加源类型显示标签
-        self.source_type_label = ttk.Label(source_frame, text="", style='Info.TLabel')
-        self.source_type_label.grid(row=0, column=1, sticky="e", padx=(0, 5), pady=5)
+        给出 failed 列表时，获取失败（没有包、只有模拟数据或有目录页获取失败）的源会追加到其中。
+        """
+        def list_one(priority, source):
+            # 递归抓取时每抓到一页就合并进本地包目录，不必等全部目录页完成；
+            # 抓取全部成功后才用完整的列表替换，目录页失败时保留原有记录
+            streamed = [0]
+            failed_pages = []
+            
+            def on_page(page_packages):
+                if not self.catalog:
+                    return
+                for pkg in page_packages:
+                    pkg['source'] = source
+                try:
+                    self.catalog.save_listing(source, page_packages, start=streamed[0], replace=False)
+                    streamed[0] += len(page_packages)
+                except sqlite3.Error as e:
+                    self.log(f"[警告] 更新本地包目录失败: {str(e)}")
+            
+            packages = self.list_packages(source, save_path, on_page=on_page, failed_pages=failed_pages)
+            if failed_pages:
+                self.log(f"[警告] {source}: {len(failed_pages)} 个目录页获取失败，包列表不完整")
+            if failed is not None and (not packages or failed_pages or any(pkg.get('mock') for pkg in packages)):
+                failed.append(source)
+            if len(sources) > 1 and any(pkg.get('mock') for pkg in packages):
+                # 多源合并时不能混入模拟数据
+                self.log(f"[警告] 源获取失败，已忽略: {source}")
+                return []
+            for pkg in packages:
+                pkg['source'] = source
+                pkg['source_priority'] = priority
+            if (self.catalog and packages and not failed_pages
+                    and not any(pkg.get('mock') for pkg in packages)):
+                try:
+                    self.catalog.save_listing(source, packages)
+                except sqlite3.Error as e:
+                    self.log(f"[警告] 更新本地包目录失败: {str(e)}")
+            return packages
         
-        ttk.Button(source_frame, text="选择本地", command=self.select_local_source,
-                  style='Primary.TButton').grid(row=0, column=2, sticky="e", padx=(0, 5), pady=5)
+        if len(sources) == 1:
+            return list_one(0, sources[0])
         
-        ttk.Button(source_frame, text="刷新", command=self.refresh_package_list,
-                  style='Success.TButton').grid(row=0, column=3, sticky="e", pady=5)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            package_lists = list(executor.map(list_one, range(len(sources)), sources))
         
-        # 绑定路径输入变化事件
-        self.source_url.trace('w', self.on_source_path_changed)
+        merged = merge_package_lists(package_lists)
+        total = sum(len(packages) for packages in package_lists)
+        self.log(f"[合并] {len(sources)} 个源共 {total} 个包，合并重复后 {len(merged)} 个")
+        return merged
+    
+    def get_network_packages(self, url):
+        """从网络获取包列表"""
+        try:
+            self.log(f"[网络] 从URL获取包列表: {url}")
+            
+            # 尝试从网络URL获取包列表
+            packages = []
+            
+            # 首先尝试解析HTML页面获取包列表
+            try:
+                import requests
+                from bs4 import BeautifulSoup
+                
+                response = requests.get(url, timeout=10)
+                response.raise_for_status()
+                
+                soup = BeautifulSoup(response.text, 'html.parser')
+                
+                # 查找所有.deb文件的链接
+                for link in soup.find_all('a', href=True):
+                    href = link['href']
+                    if href.endswith('.deb'):
+                        # 构造完整的URL
+                        if href.startswith('http'):
+                            full_url = href
+                        elif href.startswith('/'):
+                            from urllib.parse import urljoin
+                            full_url = urljoin(url, href)
+                        else:
+                            full_url = url.rstrip('/') + '/' + href
+                        
+                        # 解析包信息
+                        pkg_info = self.parse_deb_filename(os.path.basename(href))
+                        if pkg_info:
+                            # 保存完整文件名作为显示名称
+                            full_filename = os.path.basename(href)
+                            packages.append({
+                                'name': pkg_info['name'],
+                                'arch': pkg_info['arch'],
+                                'version': pkg_info['version'],
+                                'full_filename': full_filename,  # 添加完整文件名
+                                'status': '未下载',
+                                'download_time': '',
+                                'selected': False,
+                                'url': full_url
+                            })
+                
+                self.log(f"[网络] 从HTML页面获取到 {len(packages)} 个包")
+            
+            except ImportError:
+                self.log("[警告] 未安装requests和beautifulsoup4，使用备用方法")
+                # 使用urllib备用方法
+                try:
+                    import urllib.request
+                    from html.parser import HTMLParser
+                    
+                    class LinkParser(HTMLParser):
+                        def __init__(self):
+                            super().__init__()
+                            self.links = []
+                        
+                        def handle_starttag(self, tag, attrs):
+                            if tag == 'a':
+                                for attr, value in attrs:
+                                    if attr == 'href' and value.endswith('.deb'):
+                                        self.links.append(value)
+                    
+                    parser = LinkParser()
+                    
+                    def fetch_listing():
+                        with urllib.request.urlopen(url, timeout=10) as response:
+                            return response.read()
+                    
+                    html_content = self.transfer_policy.call(url, fetch_listing).decode('utf-8')
+                    parser.feed(html_content)
+                    
+                    for href in parser.links:
+                        if href.startswith('http'):
+                            full_url = href
+                        elif href.startswith('/'):
+                            from urllib.parse import urljoin
+                            full_url = urljoin(url, href)
+                        else:
+                            full_url = url.rstrip('/') + '/' + href
+                        
+                        pkg_info = self.parse_deb_filename(os.path.basename(href))
+                        if pkg_info:
+                            # 保存完整文件名作为显示名称
+                            full_filename = os.path.basename(href)
+                            packages.append({
+                                'name': pkg_info['name'],
+                                'arch': pkg_info['arch'],
+                                'version': pkg_info['version'],
+                                'full_filename': full_filename,  # 添加完整文件名
+                                'status': '未下载',
+                                'download_time': '',
+                                'selected': False,
+                                'url': full_url
+                            })
+                    
+                    self.log(f"[网络] 使用urllib获取到 {len(packages)} 个包")
+                
+                except Exception as e:
+                    self.log(f"[错误] 备用方法也失败: {str(e)}")
+                    # 最后使用模拟数据
+                    return self._get_mock_packages(url)
+            
+            # 如果没有获取到包，使用模拟数据
+            if not packages:
+                self.log("[信息] 未获取到网络包，使用模拟数据")
+                return self._get_mock_packages(url)
+            
+            return packages
         
-        # 本地保存位置
-        ttk.Label(config_frame, text="本地保存位置:", style='Header.TLabel').grid(row=1, column=0, sticky="w")
+        except Exception as e:
+            self.log(f"[错误] 网络获取包列表失败: {str(e)}")
+            return self._get_mock_packages(url)
+    
+    def host_slot(self, host):
+        """获取主机的请求信号量，所有抓取共享，每个主机同时最多 CRAWL_HOST_LIMIT 个请求"""
+        with self.host_slots_lock:
+            return self.host_slots.setdefault(host, threading.BoundedSemaphore(CRAWL_HOST_LIMIT))
+    
+    def crawl_network_packages(self, url, max_depth, on_page=None, failed_pages=None,
+                               max_workers=CRAWL_WORKERS):
+        """递归抓取目录索引页（如按架构或按任务分的子目录），最多深入 max_depth 层
         
-        save_frame = ttk.Frame(config_frame)
-        save_frame.grid(row=1, column=1, sticky="ew")
-        save_frame.columnconfigure(0, weight=1)
+        目录页在线程池中并发获取，每个主机同时进行的请求数由 host_slot 限制；
+        只跟随源地址之下的子目录链接，访问过的页面和同名的包都只处理一次。
+        获取失败的目录页追加到 failed_pages 中，此时返回的列表不完整。
+        """
+        import urllib.parse
+        import urllib.request
+        from html.parser import HTMLParser
         
-        ttk.Entry(save_frame, textvariable=self.save_path, font=('Arial', 10)).grid(row=0, column=0, sticky="ew", padx=(0, 5))
-        ttk.Button(save_frame, text="选择路径", command=self.select_save_path,
-                  style='Primary.TButton').grid(row=0, column=1, sticky="e", padx=(0, 5))
-        ttk.Button(save_frame, text="打开保存目录", command=self.open_save_dir,
-                  style='Success.TButton').grid(row=0, column=2, sticky="e")
+        class LinkCollector(HTMLParser):
+            def __init__(self):
+                super().__init__()
+                self.links = []
+            
+            def handle_starttag(self, tag, attrs):
+                if tag == 'a':
+                    self.links.extend(value for attr, value in attrs if attr == 'href' and value)
         
-        # 显示日志选择 - 放在本地保存位置下一行
-        ttk.Label(config_frame, text="显示日志:", style='Header.TLabel').grid(row=2, column=0, sticky="w")
-        ttk.Checkbutton(config_frame, text="操作日志", variable=self.show_log,
-                      command=self.on_log_visibility_changed).grid(row=2, column=1, sticky="w")
+        root = url if url.endswith('/') else url + '/'
         
-        # 搜索选项区域
-        search_frame = ttk.LabelFrame(main_frame, text="搜索选项", padding="10", style='Title.TLabelframe')
-        search_frame.grid(row=1, column=0, sticky="ew", pady=(5, 0))
-        search_frame.columnconfigure(1, weight=1)
+        def fetch_page(page_url):
+            slot = self.host_slot(urllib.parse.urlsplit(page_url).netloc)
+            
+            def fetch():
+                with urllib.request.urlopen(page_url, timeout=10) as response:
+                    return response.geturl(), response.read()
+            
+            with slot:
+                base_url, data = self.transfer_policy.call(page_url, fetch)
+            parser = LinkCollector()
+            parser.feed(data.decode('utf-8', 'replace'))
+            return base_url, parser.links
         
-        # 搜索输入框和按钮 - 第一行
-        ttk.Label(search_frame, text="关键字:", style='Header.TLabel').grid(row=0, column=0, sticky="w")
+        self.log(f"[网络] 递归抓取包列表: {root}（最多 {max_depth} 层子目录）")
+        visited = {root}
+        seen_files = set()
+        packages = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(fetch_page, root): (root, 0)}
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    page_url, depth = pending.pop(future)
+                    try:
+                        base_url, links = future.result()
+                    except Exception as e:
+                        self.log(f"[警告] 获取目录页失败: {page_url}: {str(e)}")
+                        if failed_pages is not None:
+                            failed_pages.append(page_url)
+                        continue
+                    
+                    page_packages = []
+                    for href in links:
+                        link = urllib.parse.urldefrag(urllib.parse.urljoin(base_url, href))[0]
+                        parts = urllib.parse.urlsplit(link)
+                        if parts.path.endswith('.deb'):
+                            full_filename = os.path.basename(urllib.parse.unquote(parts.path))
+                            pkg_info = self.parse_deb_filename(full_filename)
+                            if not pkg_info or full_filename in seen_files:
+                                continue
+                            seen_files.add(full_filename)
+                            page_packages.append({
+                                'name': pkg_info['name'],
+                                'arch': pkg_info['arch'],
+                                'version': pkg_info['version'],
+                                'full_filename': full_filename,
+                                'status': '未下载',
+                                'download_time': '',
+                                'selected': False,
+                                'url': link
+                            })
+                        elif (parts.path.endswith('/') and not parts.query and depth < max_depth
+                              and link.startswith(root) and link not in visited):
+                            # 排序链接（?C=N;O=D）和上级目录都不跟随
+                            visited.add(link)
+                            pending[executor.submit(fetch_page, link)] = (link, depth + 1)
+                    
+                    if page_packages:
+                        packages.extend(page_packages)
+                        self.status(f"[网络] {page_url}: {len(page_packages)} 个包")
+                        if on_page:
+                            on_page(page_packages)
         
-        search_input_frame = ttk.Frame(search_frame)
-        search_input_frame.grid(row=0, column=1, sticky="ew", pady=(0, 5))
-        search_input_frame.columnconfigure(0, weight=1)
+        self.log(f"[网络] 抓取了 {len(visited)} 个目录页，获取到 {len(packages)} 个包")
+        return packages
+    
+    def get_local_packages(self, path, save_path=''):
+        """从本地路径获取包列表（只扫描当前目录）"""
+        try:
+            self.log(f"[本地] 从路径获取包列表: {path}")
+            
+            packages = []
+            if not os.path.exists(path):
+                self.log(f"[警告] 本地路径不存在: {path}")
+                return packages
+            
+            # 只扫描当前目录，不递归
+            self.status("正在扫描本地DEB文件...")
+            
+            try:
+                files = os.listdir(path)
+            except PermissionError:
+                self.log(f"[错误] 没有权限访问目录: {path}")
+                return packages
+            
+            # 过滤出.deb文件
+            deb_files = [file for file in files if file.endswith('.deb')]
+            total_files = len(deb_files)
+            
+            if total_files == 0:
+                self.log(f"[信息] 当前目录没有找到DEB文件")
+                return packages
+            
+            self.log(f"[信息] 发现 {total_files} 个DEB文件，开始解析...")
+            
+            # 扫描并解析包信息
+            for i, file in enumerate(deb_files):
+                full_path = os.path.join(path, file)
+                
+                # 每扫描50个文件更新一次进度
+                if (i + 1) % 50 == 0:
+                    progress = ((i + 1) / total_files) * 100
+                    self.status(f"扫描进度: {i+1}/{total_files} ({progress:.1f}%)")
+                
+                # 解析包名和架构
+                pkg_info = self.parse_deb_filename(file)
+                if pkg_info:
+                    # 检查是否已下载到保存目录
+                    target_path = os.path.join(save_path, file)
+                    status = '已下载' if save_path and os.path.exists(target_path) else '未下载'
+                    
+                    # 保存完整文件名作为显示名称
+                    full_filename = file
+                    packages.append({
+                        'name': pkg_info['name'],
+                        'arch': pkg_info['arch'],
+                        'version': pkg_info['version'],
+                        'full_filename': full_filename,  # 添加完整文件名
+                        'status': status,
+                        'download_time': '',
+                        'selected': False,
+                        'source_path': full_path
+                    })
+                else:
+                    self.log(f"[警告] 无法解析文件名: {file}")
+            
+            self.log(f"[完成] 成功解析 {len(packages)} 个DEB包")
+            return packages
         
-        # 搜索输入框
-        self.search_entry = ttk.Entry(search_input_frame, textvariable=self.search_keyword, font=('Arial', 10))
-        self.search_entry.grid(row=0, column=0, sticky="ew", padx=(0, 5))
+        except Exception as e:
+            self.log(f"[错误] 本地获取包列表失败: {str(e)}")
+            return []
+    
+    def parse_deb_filename(self, filename):
+        """解析.deb文件名，提取包名和架构"""
+        try:
+            # 移除.deb后缀
+            if not filename.endswith('.deb'):
+                return None
+            
+            name_part = filename[:-4]
+            
+            # 定义有效的架构列表，包括带下划线的架构
+            valid_archs = ['amd64', 'i386', 'arm64', 'armhf', 'armel', 'mips', 'mipsel', 'mips64el', 'ppc64el', 's390x', 'all', 'loongarch64', 'loong64', 'sw_64']
+            
+            # 首先尝试从后往前匹配已知的架构
+            for arch in sorted(valid_archs, key=len, reverse=True):  # 从最长的开始匹配
+                if name_part.endswith('_' + arch):
+                    # 找到架构，分割包名和版本
+                    arch_index = len(name_part) - len('_' + arch)
+                    package_and_version = name_part[:arch_index]
+                    
+                    # 查找版本号的开始位置（最后一个下划线）
+                    last_underscore = package_and_version.rfind('_')
+                    if last_underscore > 0:
+                        package_name = package_and_version[:last_underscore]
+                        version = package_and_version[last_underscore + 1:]
+                        
+                        return {
+                            'name': package_name,
+                            'version': version,
+                            'arch': arch
+                        }
+            
+            # 如果标准解析失败，尝试使用split方法
+            parts = name_part.split('_')
+            if len(parts) >= 3:
+                # 最后一个是架构
+                arch = parts[-1]
+                # 倒数第二个是版本
+                version = parts[-2]
+                # 剩下的都是包名
+                package_name = '_'.join(parts[:-2])
+                
+                # 验证架构是否有效
+                if arch in valid_archs:
+                    return {
+                        'name': package_name,
+                        'version': version,
+                        'arch': arch
+                    }
+            
+            # 如果都失败了，尝试使用文件名作为包名，架构设为unknown
+            self.log(f"[警告] 无法解析文件名架构: {filename}, 使用默认值")
+            return {
+                'name': name_part,
+                'version': 'unknown',
+                'arch': 'unknown'
+            }
         
-        # 绑定回车键搜索
-        self.search_entry.bind('<Return>', lambda e: self.search_packages())
+        except Exception as e:
+            self.log(f"[警告] 解析文件名失败: {filename}, 错误: {str(e)}")
+            return None
+    
+    def _get_mock_packages(self, url):
+        """获取模拟包数据"""
+        packages = []
+        if not self.allow_mock:
+            return packages
+        all_archs = ['arm64', 'amd64', 'i386', 'loongarch64', 'mips64el', 'sw_64', 'all']
         
-        # 搜索按钮
-        search_button = ttk.Button(search_input_frame, text="搜索", command=self.search_packages,
-                              style='Success.TButton')
-        search_button.grid(row=0, column=1, sticky="e")
+        # 模拟包名
+        base_packages = [
+            'package1', 'package2', 'package3', 'package4', 'package5',
+            'libtest1', 'libtest2', 'app-example', 'tool-utils', 'service-daemon',
+            'deepin-terminal', 'deepin-file-manager', 'deepin-system-monitor',
+            'deepin-calculator', 'deepin-music', 'deepin-camera'
+        ]
         
-        # 架构选择 - 第二行
-        ttk.Label(search_frame, text="架构:", style='Header.TLabel').grid(row=1, column=0, sticky="w")
+        for pkg_name in base_packages:
+            for arch in all_archs:
+                # 构造完整文件名
+                full_filename = f"{pkg_name}_{arch}.deb"
+                packages.append({
+                    'name': pkg_name,
+                    'arch': arch,
+                    'version': '1.0.0',
+                    'full_filename': full_filename,  # 添加完整文件名
+                    'status': '未下载',
+                    'download_time': '',
+                    'selected': False,
+                    'url': f"{url}/{full_filename}",
+                    'mock': True
+                })
+                
+                # 总是包含符号包，过滤操作在 should_include_package() 中进行
+                # 构造完整文件名
+                full_filename = f"{pkg_name}-dbgsym_{arch}.deb"
+                packages.append({
+                    'name': f"{pkg_name}-dbgsym",
+                    'arch': arch,
+                    'version': '1.0.0',
+                    'full_filename': full_filename,  # 添加完整文件名
+                    'status': '未下载',
+                    'download_time': '',
+                    'selected': False,
+                    'url': f"{url}/{full_filename}",
+                    'mock': True
+                })
         
-        arch_frame = ttk.Frame(search_frame)
-        arch_frame.grid(row=1, column=1, sticky="ew", pady=(0, 5))
+        return packages
+    
+    def should_include_package(self, pkg_info, selected_archs, include_dbgsym):
+        """检查包是否应该包含在列表中"""
+        # 检查架构
+        pkg_name = pkg_info.get('name', '').lower()
+        pkg_arch = pkg_info.get('arch', '').lower()
         
-        # 架构选择
-        arch_list = ['arm64', 'amd64', 'i386', 'loongarch64', 'mips64el', 'sw_64', 'all']
-        for arch in arch_list:
-            ttk.Checkbutton(arch_frame, text=arch, variable=self.arch_vars[arch],
-                          command=self.on_arch_changed).pack(side=tk.LEFT, padx=(0, 10))
+        # 调试日志，未开启时跳过格式化
+        debug = self.debug
+        if debug:
+            debug(f"[调试] 检查包: {pkg_info.get('full_filename', pkg_info.get('name', 'unknown'))}, 架构: {pkg_arch}")
+            debug(f"[调试] 选中的架构: {selected_archs}")
         
-        # 添加全选架构选项
-        ttk.Checkbutton(arch_frame, text="全选", variable=self.select_all_archs,
-                      command=self.on_select_all_archs_changed).pack(side=tk.LEFT, padx=(20, 0))
+        # 如果没有选择任何架构，则不显示任何包
+        if not selected_archs:
+            if debug:
+                debug(f"[调试] 没有选择任何架构，包被过滤掉")
+            return False
         
-        # 符号包选择 - 第三行
-        ttk.Label(search_frame, text="符号包:", style='Header.TLabel').grid(row=2, column=0, sticky="w")
+        # 架构筛选条件
+        arch_condition_met = False
         
-        dbgsym_frame = ttk.Frame(search_frame)
-        dbgsym_frame.grid(row=2, column=1, sticky="ew", pady=(0, 5))
+        # 'all' 是一种特殊的架构类型，不是全选功能
+        # 只有当选择了 'all' 架构或者包的架构在选中的架构列表中时，架构条件才满足
+        # 检查包的架构是否在选中的架构列表中
+        # 优先使用解析出的架构信息，如果没有则从包名中匹配
+        for arch in selected_archs:
+                arch_lower = arch.lower()
+                # 检查解析出的架构
+                if pkg_arch == arch_lower:
+                    arch_condition_met = True
+                    if debug:
+                        debug(f"[调试] 架构匹配: {pkg_arch} == {arch_lower}")
+                    break
+                # 检查包名中是否包含架构关键字
+                elif arch_lower in pkg_name:
+                    arch_condition_met = True
+                    if debug:
+                        debug(f"[调试] 包名中包含架构关键字: {arch_lower} in {pkg_name}")
+                    break
         
-        ttk.Checkbutton(dbgsym_frame, text="dbgsym", variable=self.include_dbgsym,
-                      command=self.on_dbgsym_changed).pack(side=tk.LEFT)
+        if not arch_condition_met:
+            if debug:
+                debug(f"[调试] 架构不匹配，包被过滤掉")
         
-        # 包表格区域
-        table_frame = ttk.LabelFrame(main_frame, text="包列表", padding="10", style='Title.TLabelframe')
-        table_frame.grid(row=2, column=0, sticky="nsew", pady=(5, 0))
-        table_frame.columnconfigure(0, weight=1)
-        table_frame.rowconfigure(0, weight=1)
+        # 符号包筛选条件
+        dbgsym_condition_met = True
+        if not include_dbgsym and 'dbgsym' in pkg_info['name']:
+            dbgsym_condition_met = False
+            if debug:
+                debug(f"[调试] 符号包被过滤掉: {pkg_info['name']}")
+        else:
+            if debug:
+                debug(f"[调试] 符号包条件满足: include_dbgsym={include_dbgsym}, is_dbgsym={'dbgsym' in pkg_info['name']}")
         
-        # 创建包表格
-        self.create_package_table(table_frame)
+        result = arch_condition_met and dbgsym_condition_met
+        if debug:
+            debug(f"[调试] 最终结果: {result} (架构条件={arch_condition_met}, 符号包条件={dbgsym_condition_met})")
         
-        # 操作按钮区域 - 移除了大部分按钮，只保留必要的
-        button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=3, column=0, sticky="ew", pady=(5, 0))
+        # 返回架构和符号包条件的"且"关系
+        return result
+    
+    def filter_packages(self, packages, selected_archs, include_dbgsym):
+        """根据架构和符号包设置过滤包列表"""
+        filtered = []
+        for pkg in packages:
+            if self.should_include_package(pkg, selected_archs, include_dbgsym):
+                filtered.append(pkg)
+        return filtered
+    
+    def search_packages(self, packages, keyword):
+        """按关键字匹配包名、架构或版本，关键字以 * 结尾时只按包名前缀匹配"""
+        keyword = keyword.strip().lower()
+        if keyword.endswith('*'):
+            prefix = keyword.rstrip('*')
+            return [pkg for pkg in packages if pkg['name'].lower().startswith(prefix)]
+        if not keyword:
+            return list(packages)
+        return [pkg for pkg in packages
+                if keyword in pkg['name'].lower() or
+                keyword in pkg.get('arch', '').lower() or
+                keyword in pkg.get('version', '').lower()]
+    
+    def download_package(self, pkg, save_path, source=''):
+        """下载单个包：本地源直接复制，网络源下载；索引中有校验和时校验下载结果"""
+        if pkg.get('source_path'):
+            success = self.copy_local_package(pkg, save_path)
+        else:
+            success = self.download_network_package(pkg, save_path, pkg.get('source', source))
+        if success and pkg.get('sha256'):
+            target_path = os.path.join(save_path, self.get_target_filename(pkg))
+            if os.path.exists(target_path) and file_sha256(target_path) != pkg['sha256']:
+                self.log(f"[错误] 校验和不匹配，已删除: {os.path.basename(target_path)}")
+                os.remove(target_path)
+                return False
+        return success
+    
+    def local_package_path(self, pkg, save_path=''):
+        """返回包在本地的 .deb 文件路径（本地源文件或保存目录中已下载的文件），没有时返回 None"""
+        if pkg.get('source_path') and os.path.isfile(pkg['source_path']):
+            return pkg['source_path']
+        if save_path:
+            path = os.path.join(save_path, self.get_target_filename(pkg))
+            if os.path.isfile(path):
+                return path
+        return None
+    
+    def get_target_filename(self, pkg):
+        """获取包保存到本地时使用的文件名"""
+        if pkg.get('source_path'):
+            return os.path.basename(pkg['source_path'])
+        return pkg.get('full_filename') or f"{pkg['name']}_{pkg.get('version', '1.0')}_{pkg['arch']}.deb"
+    
+    def load_hash_cache(self, save_path):
+        """读取保存目录中的校验和缓存 {文件名: [大小, 修改时间, sha256]}"""
+        try:
+            with open(os.path.join(save_path, SYNC_STATE_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_hash_cache(self, save_path, cache):
+        """写入保存目录中的校验和缓存"""
+        try:
+            with open(os.path.join(save_path, SYNC_STATE_FILE), 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            self.log(f"[警告] 写入校验和缓存失败: {str(e)}")
+    
+    def plan_sync(self, packages, save_path, prune=False, max_workers=4, listing=None, covers=None):
+        """比较包列表与保存目录，返回同步计划
         
-        # 可以在这里添加其他必要的按钮，目前为空
+        按文件名、大小和 SHA256 判断新增、变化和未变化的包；本地文件的校验和按
+        (大小, 修改时间) 缓存，只有变化过的文件才需要重新计算。
+        prune 为 True 时，保存目录中不在 listing（未经过滤的远程列表，默认为 packages）
+        里的 .deb 文件记入 removed；给出 covers(包信息) 时只删除当前过滤条件覆盖的文件，
+        其他架构或关键字之外的文件保持不动。
+        """
+        plan = {'new': [], 'changed': [], 'unchanged': [], 'removed': []}
+        local_files = {}
+        if os.path.isdir(save_path):
+            for entry in os.scandir(save_path):
+                if entry.name.endswith('.deb') and entry.is_file():
+                    local_files[entry.name] = entry.stat()
         
-        # 日志区域
-        self.log_frame = ttk.LabelFrame(main_frame, text="操作日志", padding="10", style='Title.TLabelframe')
-        self.log_frame.grid(row=4, column=0, sticky="ew", pady=(5, 0))
-        self.log_frame.columnconfigure(0, weight=1)
+        cache = self.load_hash_cache(save_path)
+        need_hash = []
+        remote_names = set()
+        for pkg in packages:
+            filename = self.get_target_filename(pkg)
+            remote_names.add(filename)
+            stat = local_files.get(filename)
+            if stat is None:
+                plan['new'].append(pkg)
+            elif pkg.get('size') is not None and pkg['size'] != stat.st_size:
+                plan['changed'].append(pkg)
+            elif pkg.get('sha256'):
+                need_hash.append((pkg, filename, stat))
+            else:
+                plan['unchanged'].append(pkg)
         
-        # 日志内容框架
-        self.log_content_frame = ttk.Frame(self.log_frame)
-        self.log_content_frame.grid(row=0, column=0, sticky="ew")
-        self.log_content_frame.columnconfigure(0, weight=1)
+        def local_hash(item):
+            pkg, filename, stat = item
+            entry = cache.get(filename)
+            if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                return entry[2]
+            return file_sha256(os.path.join(save_path, filename))
         
-        self.log_text = scrolledtext.ScrolledText(self.log_content_frame, height=8, state=tk.NORMAL,
-                                               font=('Consolas', 9),
-                                               background='#f8f9fa',
-                                               foreground='#2c3e50',
-                                               insertbackground='#4a90e2')
-        self.log_text.grid(row=0, column=0, sticky="ew")
+        # 只有大小相同且索引提供了校验和的包才需要比较哈希，并发计算
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for (pkg, filename, stat), digest in zip(need_hash, executor.map(local_hash, need_hash)):
+                cache[filename] = [stat.st_size, stat.st_mtime_ns, digest]
+                if digest == pkg['sha256']:
+                    plan['unchanged'].append(pkg)
+                else:
+                    plan['changed'].append(pkg)
         
-        # 初始化日志可见性
-        self.update_log_visibility()
-        
-        # 进度条
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate', style='Custom.Horizontal.TProgressbar')
-        self.progress.grid(row=5, column=0, sticky="ew", padx=15, pady=(0, 5))
-        
-        # 状态栏
-        self.status_var = tk.StringVar(value="就绪")
-        status_label = ttk.Label(main_frame, textvariable=self.status_var, style='Status.TLabel')
-        status_label.grid(row=6, column=0, sticky="ew", padx=15, pady=(0, 15))
+        if prune:
+            if listing is not None:
+                remote_names.update(self.get_target_filename(pkg) for pkg in listing)
+            removed = []
+            for filename in set(local_files) - remote_names:
+                if covers is not None:
+                    info = self.parse_deb_filename(filename)
+                    if not info or not covers(info):
+                        continue
+                removed.append(filename)
+            plan['removed'] = sorted(removed)
+        # 缓存只保留仍存在的文件
+        if os.path.isdir(save_path):
+            self.save_hash_cache(save_path, {name: value for name, value in cache.items()
+                                             if name in local_files})
+        return plan
     
-    def create_package_table(self, parent_frame):
-        """创建包表格"""
-        # 清除现有内容
-        for widget in parent_frame.winfo_children():
-            widget.destroy()
-        
-        # 创建Treeview表格，支持多选，移除固定高度以允许动态调整
-        columns = ('index', 'selected', 'name', 'arch', 'status', 'download_time')
-        self.package_tree = ttk.Treeview(parent_frame, columns=columns, show='headings', selectmode='extended')
-        
-        # 设置列标题
-        self.package_tree.heading('index', text='序号')
-        self.package_tree.heading('selected', text='勾选状态')
-        self.package_tree.heading('name', text='包名')
-        self.package_tree.heading('arch', text='架构名')
-        self.package_tree.heading('status', text='下载状态')
-        self.package_tree.heading('download_time', text='下载时间')
-        
-        # 设置列宽，使用最小宽度以允许动态调整
-        self.package_tree.column('index', width=50, minwidth=50, anchor='center')
-        self.package_tree.column('selected', width=80, minwidth=80, anchor='center')
-        self.package_tree.column('name', width=200, minwidth=150, anchor='w')
-        self.package_tree.column('arch', width=100, minwidth=80, anchor='center')
-        self.package_tree.column('status', width=100, minwidth=80, anchor='center')
-        self.package_tree.column('download_time', width=150, minwidth=120, anchor='center')
-        
-        # 添加滚动条
-        v_scrollbar = ttk.Scrollbar(parent_frame, orient="vertical", command=self.package_tree.yview)
-        h_scrollbar = ttk.Scrollbar(parent_frame, orient="horizontal", command=self.package_tree.xview)
-        self.package_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-        
-        # 布局 - 确保表格能够填充整个可用空间
-        self.package_tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
+    def apply_sync(self, plan, save_path, source='', max_workers=5, on_result=None):
+        """执行同步计划：下载新增和变化的包，删除 removed 中的文件，返回 (成功数, 失败数, 删除数)"""
+        to_fetch = plan['new'] + plan['changed']
+        success_count, error_count = 0, 0
+        if to_fetch:
+            success_count, error_count = self.download_packages(
+                to_fetch, save_path, source, max_workers=max_workers, on_result=on_result)
         
-        # 配置父框架的网格权重，确保表格能够扩展
-        parent_frame.rowconfigure(0, weight=1)
-        parent_frame.columnconfigure(0, weight=1)
+        removed_count = 0
+        for filename in plan['removed']:
+            try:
+                os.remove(os.path.join(save_path, filename))
+                removed_count += 1
+                self.log(f"[同步] 已删除: {filename}")
+            except OSError as e:
+                self.log(f"[错误] 删除失败: {filename}, 错误: {str(e)}")
         
-        # 绑定右键菜单
-        self.package_tree.bind('<Button-3>', self.show_context_menu)
-        self.package_tree.bind('<Double-1>', self.on_item_double_click)
+        for pkg in plan['unchanged']:
+            pkg['status'] = '已下载'
+        return success_count, error_count, removed_count
+    
+    def download_packages(self, packages, save_path, source='', max_workers=5, on_result=None):
+        """并发下载多个包，每完成一个调用 on_result(pkg, success, error)，返回 (成功数, 失败数)"""
+        os.makedirs(save_path, exist_ok=True)
+        success_count = 0
+        error_count = 0
+        results = []
         
-        # 绑定鼠标拖拽选择事件
-        self.package_tree.bind('<Button-1>', self.on_item_single_click)
-        self.package_tree.bind('<B1-Motion>', self.on_item_motion)
-        self.package_tree.bind('<ButtonRelease-1>', self.on_item_release)
-        self.package_tree.bind('<Control-Button-1>', self.on_ctrl_click)
-        self.package_tree.bind('<Shift-Button-1>', self.on_shift_click)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.download_package, pkg, save_path, source): pkg
+                       for pkg in packages}
+            
+            for future in concurrent.futures.as_completed(futures):
+                pkg = futures[future]
+                error = None
+                try:
+                    success = future.result()
+                except Exception as e:
+                    success = False
+                    error = e
+                if success:
+                    success_count += 1
+                    pkg['status'] = '已下载'
+                    pkg['download_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                else:
+                    error_count += 1
+                results.append((pkg, success))
+                if on_result:
+                    on_result(pkg, success, error)
         
-        # 初始化拖拽选择变量
-        self.drag_start_item = None
-        self.drag_start_selection = set()
-        self.drag_mode = None  # 'normal', 'ctrl', 'shift'
+        if self.catalog and results:
+            try:
+                self.catalog.record_downloads(results, save_path, source)
+            except sqlite3.Error as e:
+                self.log(f"[警告] 记录下载历史失败: {str(e)}")
+        return success_count, error_count
+    
+    def head_content_length(self, url, redirects=3):
+        """用当前线程的持久连接发送 HEAD 请求，返回 Content-Length，失败时返回 None"""
+        import http.client
+        import urllib.parse
         
-        # 初始化包数据字典
-        self.package_item_data = {}
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not self.transfer_policy.is_available(parts.netloc):
+            return None
+        connections = getattr(self.thread_local, 'connections', None)
+        if connections is None:
+            connections = self.thread_local.connections = {}
         
-        # 填充表格数据
-        self.refresh_table_data()
+        key = (parts.scheme, parts.netloc)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+        # 复用的连接可能已被服务器关闭，失败时用新连接重试一次
+        for attempt in range(2):
+            conn = connections.get(key)
+            if conn is None:
+                connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+                conn = connections[key] = connection_class(parts.netloc, timeout=10)
+            try:
+                conn.request('HEAD', path)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                connections.pop(key, None)
+                if attempt:
+                    self.transfer_policy.record_failure(parts.netloc)
+                continue
+            if response.status in (301, 302, 303, 307, 308) and redirects and response.getheader('Location'):
+                return self.head_content_length(urllib.parse.urljoin(url, response.getheader('Location')),
+                                                redirects - 1)
+            length = response.getheader('Content-Length')
+            if response.status == 200 and length and length.isdigit():
+                return int(length)
+            return None
+        return None
     
-    def refresh_table_data(self):
-        """刷新表格数据"""
-        # 清除现有数据
-        for item in self.package_tree.get_children():
-            self.package_tree.delete(item)
+    def estimate_sizes(self, packages, max_workers=8):
+        """补全包大小：已知大小（仓库索引、本地文件）直接使用，其余并发发送 HEAD 请求
         
-        # 重新初始化包数据字典
-        self.package_item_data = {}
-        self.package_vars.clear()
+        返回 (总大小, 仍不知道大小的包数)。
+        """
+        unknown = []
+        for pkg in packages:
+            if pkg.get('size') is not None:
+                continue
+            if pkg.get('source_path') and os.path.isfile(pkg['source_path']):
+                pkg['size'] = os.path.getsize(pkg['source_path'])
+            elif pkg.get('url'):
+                unknown.append(pkg)
         
-        # 使用过滤后的包数据，如果没有过滤数据则使用全部数据
-        data_to_display = self.filtered_package_data if hasattr(self, 'filtered_package_data') and self.filtered_package_data else self.package_data
+        if unknown:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for pkg, size in zip(unknown, executor.map(lambda p: self.head_content_length(p['url']), unknown)):
+                    if size is not None:
+                        pkg['size'] = size
         
-        # 包数据行
-        for i, package in enumerate(data_to_display):
-            # 使用包名+架构作为唯一标识符，避免同名包冲突
-            unique_key = f"{package['name']}_{package.get('arch', '')}"
-            
-            # 勾选状态
-            var = tk.BooleanVar(value=package.get('selected', False))
-            self.package_vars[unique_key] = var
-            
-            # 插入数据
-            selected_text = "☑" if var.get() else "☐"
-            status_text = package.get('status', '未下载')
-            
-            # 优先使用完整文件名，如果没有则使用解析后的包名
-            display_name = package.get('full_filename', package['name'])
-            item_id = self.package_tree.insert('', 'end', values=(
-                i + 1,  # 序号，从1开始
-                selected_text,
-                display_name,  # 显示完整文件名，包含架构和后缀
-                package.get('arch', ''),
-                status_text,
-                package.get('download_time', '')
-            ))
-            
-            # 存储包数据到字典中，使用唯一标识符
-            self.package_item_data[item_id] = {
-                'package': package,
-                'unique_key': unique_key
-            }
+        total = sum(pkg.get('size') or 0 for pkg in packages)
+        return total, sum(1 for pkg in packages if pkg.get('size') is None)
     
-    def on_source_path_changed(self, *args):
-        """源路径改变时的处理，自动判断路径类型"""
-        path = self.source_url.get().strip()
-        
-        if not path:
-            self.source_type_label.config(text="")
+    @staticmethod
+    def free_disk_space(path):
+        """返回 path（不存在时取最近的已存在上级目录）所在文件系统的可用空间"""
+        path = os.path.abspath(path or '.')
+        while not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        return shutil.disk_usage(path).free
+    
+    def preallocate_file(self, f, size):
+        """按包大小预分配文件空间，减少机械硬盘上的碎片；系统或文件系统不支持时忽略"""
+        if not self.preallocate or not hasattr(os, 'posix_fallocate'):
             return
+        try:
+            size = int(size or 0)
+            if size > 0:
+                os.posix_fallocate(f.fileno(), 0, size)
+        except (OSError, ValueError):
+            pass
+    
+    def verify_save_path(self, save_path, packages=(), max_workers=8):
+        """并发校验保存目录中的所有 .deb 文件，返回 (校验的文件数, {文件名: 损坏原因})
         
-        # 判断是网络路径还是本地路径
-        if path.startswith(('http://', 'https://', 'ftp://')):
-            source_type = "网络源"
-        elif os.path.exists(path):
-            source_type = "本地源"
-        else:
-            source_type = "未知路径（将尝试作为网络源处理）"
+        packages 中带有大小（来自仓库索引）的包会同时比较文件大小。
+        """
+        expected_sizes = {self.get_target_filename(pkg): pkg['size'] for pkg in packages
+                          if pkg.get('size') is not None}
+        filenames = [entry.name for entry in os.scandir(save_path)
+                     if entry.name.endswith('.deb') and entry.is_file()] if os.path.isdir(save_path) else []
         
-        self.source_type_label.config(text=f"检测到: {source_type}")
-    
-    def on_arch_changed(self):
-        """架构选择改变时的处理"""
-        self.search_packages()
-    
-    def on_select_all_archs_changed(self):
-        """全选架构选项改变时的处理"""
-        if self.select_all_archs.get():
-            # 如果选择了全选，则选中所有架构
-            for arch in self.arch_vars:
-                self.arch_vars[arch].set(True)
-        else:
-            # 如果取消了全选，则取消所有架构的选择
-            for arch in self.arch_vars:
-                self.arch_vars[arch].set(False)
+        def verify_one(filename):
+            return verify_deb_file(os.path.join(save_path, filename), expected_sizes.get(filename))
         
-        self.search_packages()
-    
-    def on_dbgsym_changed(self):
-        """符号包选择改变时的处理"""
-        self.search_packages()
+        corrupt = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for filename, (ok, reason) in zip(filenames, executor.map(verify_one, filenames)):
+                if not ok:
+                    corrupt[filename] = reason
+        return len(filenames), corrupt
     
-    def on_log_visibility_changed(self):
-        """日志显示选择改变时的处理"""
-        self.update_log_visibility()
-    
-    def search_packages(self):
-        """根据关键字和架构选项搜索包"""
-        keyword = self.search_keyword.get().strip().lower()
-        selected_archs = [arch for arch, var in self.arch_vars.items() if var.get()]
-        arch_text = ", ".join(selected_archs) if selected_archs else "无"
+    def download_and_install(self, packages, save_path, source='', max_workers=5,
+                             installer=None, on_result=None, on_install=None):
+        """边下载边安装：某个包和它在本批中的依赖都下载完成后，立即交给安装进程
         
-        self.log_message(f"[搜索] 开始搜索，关键字: '{keyword}', 选中架构: {arch_text}, 包含符号包: {self.include_dbgsym.get()}")
-        self.log_message(f"[搜索] 总包数: {len(self.package_data)}")
+        包的依赖信息来自仓库索引（先调用 apply_source_indexes），没有时视为无依赖。
+        安装状态变化时调用 on_install(pkg, 状态)。
+        返回 (下载成功数, 下载失败数, 安装成功数, 安装失败数)。
+        """
+        installer = installer or PackageInstaller()
+        graph = DependencyGraph(packages)
+        archs = sorted({pkg.get('arch', '') for pkg in packages})
+        deps = [graph.dependencies(i, archs) for i in range(len(packages))]
+        positions = {id(pkg): i for i, pkg in enumerate(packages)}
+        arrivals = queue.Queue()
         
-        # 首先根据架构和符号包设置过滤包
-        base_packages = self.filter_packages(self.package_data)
+        def set_install_status(indices, status):
+            for i in indices:
+                # 只在状态变化时通知，避免每轮循环重复刷新界面
+                if packages[i].get('install_status') == status:
+                    continue
+                packages[i]['install_status'] = status
+                if on_install:
+                    on_install(packages[i], status)
         
-        if not keyword:
-            # 如果关键字为空，显示过滤后的所有包
-            self.filtered_package_data = base_packages.copy()
-            self.log_message(f"[搜索] 显示架构 {arch_text} 的所有包，共 {len(self.filtered_package_data)} 个")
-        else:
-            # 根据关键字过滤包
-            self.filtered_package_data = []
-            for pkg in base_packages:
-                if (keyword in pkg['name'].lower() or
-                    keyword in pkg.get('arch', '').lower() or
-                    keyword in pkg.get('version', '').lower()):
-                    self.filtered_package_data.append(pkg)
-            
-            self.log_message(f"[搜索] 关键字 '{keyword}' 在架构 {arch_text} 中找到 {len(self.filtered_package_data)} 个包")
+        def on_download(pkg, success, error):
+            if on_result:
+                on_result(pkg, success, error)
+            arrivals.put((positions[id(pkg)], success))
         
-        # 更新表格显示
-        self.refresh_table_data()
-    
-    def update_log_visibility(self):
-        """更新日志可见性"""
-        if self.show_log.get():
-            # 显示日志区域
-            self.log_frame.grid(row=4, column=0, sticky="ew", pady=(5, 0))
-            self.log_message("[界面] 操作日志已显示")
-        else:
-            # 隐藏日志区域
-            self.log_frame.grid_remove()
-            self.log_message("[界面] 操作日志已隐藏")
-    
-    def select_local_source(self):
-        """选择本地源路径"""
-        selected_path = filedialog.askdirectory(title="选择本地源路径")
-        if selected_path:
-            self.source_url.set(selected_path)
-    
-    def select_save_path(self):
-        """选择保存路径"""
-        selected_path = filedialog.askdirectory(title="选择保存路径", initialdir=self.save_path.get())
-        if selected_path:
-            self.save_path.set(selected_path)
-    
-    def refresh_package_list(self):
-        """刷新包列表"""
-        def refresh_task():
+        download_result = {}
+        
+        def run_downloads():
             try:
-                self.message_queue.put(("progress", "start"))
-                self.message_queue.put(("status", "正在获取包列表..."))
-                self.message_queue.put(("log", "[开始] 开始获取包列表"))
-                
-                source = self.source_url.get().strip()
+                download_result['counts'] = self.download_packages(
+                    packages, save_path, source, max_workers=max_workers, on_result=on_download)
+            except Exception as e:
+                self.log(f"[错误] 下载过程出错: {str(e)}")
+            finally:
+                # 结束标记：下载线程异常退出时，让安装循环不再等待未到达的结果
+                arrivals.put(None)
+        
+        download_thread = threading.Thread(target=run_downloads, daemon=True)
+        download_thread.start()
+        
+        pending = set(range(len(packages)))
+        arrived, installed = set(), set()
+        waiting_downloads = len(packages)
+        installer_ok = True
+        install_ok, install_failed = 0, 0
+        try:
+            while pending:
+                # 等待至少一个下载结果，再取出已经到达的其余结果
+                if waiting_downloads:
+                    results = [arrivals.get()]
+                    while True:
+                        try:
+                            results.append(arrivals.get_nowait())
+                        except queue.Empty:
+                            break
+                    for result in results:
+                        if result is None:
+                            # 未报告结果的包按下载失败处理
+                            pending &= arrived
+                            waiting_downloads = 0
+                            break
+                        i, success = result
+                        waiting_downloads -= 1
+                        if success:
+                            arrived.add(i)
+                        else:
+                            pending.discard(i)
                 
-                if not source:
-                    self.message_queue.put(("log", "[错误] 请输入下载源路径"))
-                    return
+                # 找出依赖都已安装或同批就绪的包，dpkg 在同一次调用中处理它们之间的顺序
+                ready = arrived & pending
+                changed = True
+                while changed:
+                    blocked = {i for i in ready if deps[i] - installed - ready}
+                    changed = bool(blocked)
+                    ready -= blocked
+                set_install_status((arrived & pending) - ready, '等待依赖')
                 
-                # 自动判断路径类型
-                if source.startswith(('http://', 'https://', 'ftp://')):
-                    self.message_queue.put(("log", f"[信息] 检测到网络源，使用网络获取方式"))
-                    packages = self.get_network_packages(source)
-                elif os.path.exists(source):
-                    self.message_queue.put(("log", f"[信息] 检测到本地源，使用本地扫描方式"))
-                    packages = self.get_local_packages(source)
-                else:
-                    # 尝试作为网络源处理
-                    self.message_queue.put(("log", f"[信息] 路径不存在，尝试作为网络源处理"))
-                    packages = self.get_network_packages(source)
+                if not ready:
+                    if not waiting_downloads:
+                        # 下载已全部结束，剩下的包依赖下载失败或安装失败
+                        set_install_status(pending & arrived, '依赖缺失')
+                        install_failed += len(pending & arrived)
+                        break
+                    continue
                 
-                # 不在这里过滤，保存完整的包数据
-                # 过滤操作将在 search_packages() 中进行
+                pending -= ready
+                if not installer_ok:
+                    set_install_status(ready, '安装失败')
+                    install_failed += len(ready)
+                    continue
                 
-                self.message_queue.put(("update_packages", packages))
-                self.message_queue.put(("log", f"[完成] 获取到 {len(packages)} 个包"))
-                self.message_queue.put(("status", "包列表刷新完成"))
-                # 刷新后自动执行搜索
-                self.message_queue.put(("auto_search",))
+                set_install_status(ready, '安装中')
+                self.log(f"[安装] 开始安装 {len(ready)} 个包")
+                try:
+                    installer.install([os.path.join(save_path, self.get_target_filename(packages[i]))
+                                       for i in sorted(ready)])
+                except RuntimeError as e:
+                    self.log(f"[错误] {str(e)}")
+                    installer_ok = False
                 
-            except Exception as e:
-                self.message_queue.put(("log", f"[错误] 获取包列表失败: {str(e)}"))
-            finally:
-                self.message_queue.put(("progress", "stop"))
+                # 一批中部分包失败时，按系统中的实际状态逐个判断
+                for i in sorted(ready):
+                    if installer_ok and PackageInstaller.is_installed(packages[i]):
+                        installed.add(i)
+                        install_ok += 1
+                        set_install_status([i], '已安装')
+                    else:
+                        install_failed += 1
+                        set_install_status([i], '安装失败')
+        finally:
+            installer.close()
+            download_thread.join()
         
-        threading.Thread(target=refresh_task, daemon=True).start()
+        success_count, error_count = download_result.get('counts', (0, len(packages)))
+        return success_count, error_count, install_ok, install_failed
     
-    def get_network_packages(self, url):
-        """从网络获取包列表"""
+    def download_network_package(self, pkg, save_path, source=''):
+        """下载网络包"""
         try:
-            self.log_message(f"[网络] 从URL获取包列表: {url}")
+            self.log(f"[下载] 开始下载网络包: {pkg['name']}")
             
-            # 尝试从网络URL获取包列表
-            packages = []
+            # 获取下载URL
+            download_url = pkg.get('url')
+            if not download_url:
+                # 如果没有URL，尝试构造
+                download_url = f"{source.rstrip('/')}/{pkg['name']}_{pkg.get('version', '1.0')}_{pkg['arch']}.deb"
             
-            # 首先尝试解析HTML页面获取包列表
+            # 生成文件名
+            filename = self.get_target_filename(pkg)
+            target_path = os.path.join(save_path, filename)
+            
+            # 使用urllib下载，先写入临时文件，避免中断后留下不完整的包
             try:
-                import requests
-                from bs4 import BeautifulSoup
-                
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
+                import urllib.request
+                partial_path = target_path + '.part'
                 
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 查找所有.deb文件的链接
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    if href.endswith('.deb'):
-                        # 构造完整的URL
-                        if href.startswith('http'):
-                            full_url = href
-                        elif href.startswith('/'):
-                            from urllib.parse import urljoin
-                            full_url = urljoin(url, href)
-                        else:
-                            full_url = url.rstrip('/') + '/' + href
-                        
-                        # 解析包信息
-                        pkg_info = self.parse_deb_filename(os.path.basename(href))
-                        if pkg_info:
-                            # 保存完整文件名作为显示名称
-                            full_filename = os.path.basename(href)
-                            packages.append({
-                                'name': pkg_info['name'],
-                                'arch': pkg_info['arch'],
-                                'version': pkg_info['version'],
-                                'full_filename': full_filename,  # 添加完整文件名
-                                'status': '未下载',
-                                'download_time': '',
-                                'selected': False,
-                                'url': full_url
-                            })
-                
-                self.log_message(f"[网络] 从HTML页面获取到 {len(packages)} 个包")
+                def fetch():
+                    import http.client
+                    with urllib.request.urlopen(download_url, timeout=60) as response, open(partial_path, 'wb') as f:
+                        content_length = response.headers.get('Content-Length')
+                        self.preallocate_file(f, pkg.get('size') or content_length)
+                        shutil.copyfileobj(response, f, 1024 * 1024)
+                        # 预分配的长度与实际不符时截断到实际写入的位置
+                        f.truncate()
+                        # 连接提前关闭时 read() 只返回空数据，按写入长度判断响应是否完整
+                        written = f.tell()
+                        if content_length and content_length.isdigit() and written < int(content_length):
+                            raise http.client.IncompleteRead(b'', int(content_length) - written)
                 
+                # 临时错误按主机策略重试，主机熔断时直接失败，不再逐个包等待超时
+                try:
+                    self.transfer_policy.call(download_url, fetch)
+                    os.replace(partial_path, target_path)
+                except BaseException:
+                    # 下载失败时删除不完整的临时文件
+                    try:
+                        os.remove(partial_path)
+                    except OSError:
+                        pass
+                    raise
+                self.log(f"[成功] 网络包下载完成: {filename}")
+                return True
+            
             except ImportError:
-                self.log_message("[警告] 未安装requests和beautifulsoup4，使用备用方法")
-                # 使用urllib备用方法
+                # 备用方法：使用requests
                 try:
-                    import urllib.request
-                    from html.parser import HTMLParser
-                    
-                    class LinkParser(HTMLParser):
-                        def __init__(self):
-                            super().__init__()
-                            self.links = []
-                        
-                        def handle_starttag(self, tag, attrs):
-                            if tag == 'a':
-                                for attr, value in attrs:
-                                    if attr == 'href' and value.endswith('.deb'):
-                                        self.links.append(value)
-                    
-                    parser = LinkParser()
-                    response = urllib.request.urlopen(url, timeout=10)
-                    html_content = response.read().decode('utf-8')
-                    parser.feed(html_content)
-                    
-                    for href in parser.links:
-                        if href.startswith('http'):
-                            full_url = href
-                        elif href.startswith('/'):
-                            from urllib.parse import urljoin
-                            full_url = urljoin(url, href)
-                        else:
-                            full_url = url.rstrip('/') + '/' + href
-                        
-                        pkg_info = self.parse_deb_filename(os.path.basename(href))
-                        if pkg_info:
-                            # 保存完整文件名作为显示名称
-                            full_filename = os.path.basename(href)
-                            packages.append({
-                                'name': pkg_info['name'],
-                                'arch': pkg_info['arch'],
-                                'version': pkg_info['version'],
-                                'full_filename': full_filename,  # 添加完整文件名
-                                'status': '未下载',
-                                'download_time': '',
-                                'selected': False,
-                                'url': full_url
-                            })
+                    import requests
+                    response = requests.get(download_url, timeout=30)
+                    response.raise_for_status()
                     
-                    self.log_message(f"[网络] 使用urllib获取到 {len(packages)} 个包")
+                    with open(target_path, 'wb') as f:
+                        f.write(response.content)
                     
+                    self.log(f"[成功] 网络包下载完成: {filename}")
+                    return True
+                
                 except Exception as e:
-                    self.log_message(f"[错误] 备用方法也失败: {str(e)}")
-                    # 最后使用模拟数据
-                    return self._get_mock_packages()
-            
-            # 如果没有获取到包，使用模拟数据
-            if not packages:
-                self.log_message("[信息] 未获取到网络包，使用模拟数据")
-                return self._get_mock_packages()
-            
-            return packages
-            
+                    self.log(f"[错误] requests下载失败: {str(e)}")
+                    # 最后使用模拟文件
+                    with open(target_path, 'w') as f:
+                        f.write(f"模拟的DEB包文件: {pkg['name']}\n原始URL: {download_url}")
+                    return True
+        
         except Exception as e:
-            self.log_message(f"[错误] 网络获取包列表失败: {str(e)}")
-            return self._get_mock_packages()
+            self.log(f"[错误] 下载网络包失败: {pkg['name']}, 错误: {str(e)}")
+            return False
     
-    def get_local_packages(self, path):
-        """从本地路径获取包列表（只扫描当前目录）"""
+    def copy_local_package(self, pkg, save_path):
+        """复制本地包"""
         try:
-            self.log_message(f"[本地] 从路径获取包列表: {path}")
-            
-            packages = []
-            if not os.path.exists(path):
-                self.log_message(f"[警告] 本地路径不存在: {path}")
-                return packages
-            
-            # 只扫描当前目录，不递归
-            self.message_queue.put(("status", "正在扫描本地DEB文件..."))
-            
-            try:
-                files = os.listdir(path)
-            except PermissionError:
-                self.log_message(f"[错误] 没有权限访问目录: {path}")
-                return packages
-            
-            # 过滤出.deb文件
-            deb_files = [file for file in files if file.endswith('.deb')]
-            total_files = len(deb_files)
-            
-            if total_files == 0:
-                self.log_message(f"[信息] 当前目录没有找到DEB文件")
-                return packages
+            source_path = pkg.get('source_path')
+            if not source_path or not os.path.exists(source_path):
+                self.log(f"[错误] 源文件不存在: {source_path}")
+                return False
             
-            self.log_message(f"[信息] 发现 {total_files} 个DEB文件，开始解析...")
+            filename = os.path.basename(source_path)
+            target_path = os.path.join(save_path, filename)
             
-            # 扫描并解析包信息
-            for i, file in enumerate(deb_files):
-                full_path = os.path.join(path, file)
-                
-                # 每扫描50个文件更新一次进度
-                if (i + 1) % 50 == 0:
-                    progress = ((i + 1) / total_files) * 100
-                    self.message_queue.put(("status", f"扫描进度: {i+1}/{total_files} ({progress:.1f}%)"))
-                
-                # 解析包名和架构
-                pkg_info = self.parse_deb_filename(file)
-                if pkg_info:
-                    # 检查是否已下载到保存目录
-                    save_path = self.save_path.get()
-                    target_path = os.path.join(save_path, file)
-                    status = '已下载' if os.path.exists(target_path) else '未下载'
-                    
-                    # 保存完整文件名作为显示名称
-                    full_filename = file
-                    packages.append({
-                        'name': pkg_info['name'],
-                        'arch': pkg_info['arch'],
-                        'version': pkg_info['version'],
-                        'full_filename': full_filename,  # 添加完整文件名
-                        'status': status,
-                        'download_time': '',
-                        'selected': False,
-                        'source_path': full_path
-                    })
-                else:
-                    self.log_message(f"[警告] 无法解析文件名: {file}")
+            self.log(f"[复制] 开始复制本地包: {pkg['name']}")
             
-            self.log_message(f"[完成] 成功解析 {len(packages)} 个DEB包")
-            return packages
+            # 使用多线程复制
+            shutil.copy2(source_path, target_path)
             
+            return True
+        
         except Exception as e:
-            self.log_message(f"[错误] 本地获取包列表失败: {str(e)}")
-            return []
+            self.log(f"[错误] 复制本地包失败: {pkg['name']}, 错误: {str(e)}")
+            return False
+
+
+class DebPackageSaver:
+    # 消息队列处理：每次处理的时间预算（秒）、空闲和繁忙时的轮询间隔（毫秒）
+    QUEUE_TIME_BUDGET = 0.03
+    QUEUE_POLL_INTERVAL = 100
+    QUEUE_BUSY_INTERVAL = 10
     
-    def parse_deb_filename(self, filename):
-        """解析.deb文件名，提取包名和架构"""
-        try:
-            # 移除.deb后缀
-            if not filename.endswith('.deb'):
-                return None
-            
-            name_part = filename[:-4]
-            
-            # 定义有效的架构列表，包括带下划线的架构
-            valid_archs = ['amd64', 'i386', 'arm64', 'armhf', 'armel', 'mips', 'mipsel', 'mips64el', 'ppc64el', 's390x', 'all', 'loongarch64', 'sw_64']
-            
-            # 首先尝试从后往前匹配已知的架构
-            for arch in sorted(valid_archs, key=len, reverse=True):  # 从最长的开始匹配
-                if name_part.endswith('_' + arch):
-                    # 找到架构，分割包名和版本
-                    arch_index = len(name_part) - len('_' + arch)
-                    package_and_version = name_part[:arch_index]
-                    
-                    # 查找版本号的开始位置（最后一个下划线）
-                    last_underscore = package_and_version.rfind('_')
-                    if last_underscore > 0:
-                        package_name = package_and_version[:last_underscore]
-                        version = package_and_version[last_underscore + 1:]
-                        
-                        return {
-                            'name': package_name,
-                            'version': version,
-                            'arch': arch
-                        }
-            
-            # 如果标准解析失败，尝试使用split方法
-            parts = name_part.split('_')
-            if len(parts) >= 3:
-                # 最后一个是架构
-                arch = parts[-1]
-                # 倒数第二个是版本
-                version = parts[-2]
-                # 剩下的都是包名
-                package_name = '_'.join(parts[:-2])
-                
-                # 验证架构是否有效
-                if arch in valid_archs:
-                    return {
-                        'name': package_name,
-                        'version': version,
-                        'arch': arch
-                    }
-            
-            # 如果都失败了，尝试使用文件名作为包名，架构设为unknown
-            self.log_message(f"[警告] 无法解析文件名架构: {filename}, 使用默认值")
-            return {
-                'name': name_part,
-                'version': 'unknown',
-                'arch': 'unknown'
-            }
-            
-        except Exception as e:
-            self.log_message(f"[警告] 解析文件名失败: {filename}, 错误: {str(e)}")
-            return None
+    # 全量刷新勾选列时每批更新的行数，其余行在后续空闲时更新
+    SELECTION_RENDER_CHUNK = 2000
     
-    def _get_mock_packages(self):
-        """获取模拟包数据"""
-        packages = []
-        all_archs = ['arm64', 'amd64', 'i386', 'loongarch64', 'mips64el', 'sw_64', 'all']
+    # 日志缓冲：内存中保留的行数，日志控件超出上限后按块裁剪
+    LOG_BUFFER_LINES = 5000
+    LOG_TRIM_CHUNK = 500
+    # 日志文件轮转：单个文件大小和保留的历史文件数
+    LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT = 3
+    
+    def __init__(self, root):
+        self.root = root
+        self.root.title("DEB包保存器")
+        self.root.geometry("1200x900")
+        self.root.minsize(1000, 800)
         
-        # 模拟包名
-        base_packages = [
-            'package1', 'package2', 'package3', 'package4', 'package5',
-            'libtest1', 'libtest2', 'app-example', 'tool-utils', 'service-daemon',
-            'deepin-terminal', 'deepin-file-manager', 'deepin-system-monitor',
-            'deepin-calculator', 'deepin-music', 'deepin-camera'
-        ]
+        # 设置主题样式
+        self.setup_styles()
         
-        for pkg_name in base_packages:
-            for arch in all_archs:
-                # 构造完整文件名
-                full_filename = f"{pkg_name}_{arch}.deb"
-                packages.append({
-                    'name': pkg_name,
-                    'arch': arch,
-                    'version': '1.0.0',
-                    'full_filename': full_filename,  # 添加完整文件名
-                    'status': '未下载',
-                    'download_time': '',
-                    'selected': False,
-                    'url': f"{self.source_url.get()}/{full_filename}"
-                })
-                
-                # 总是包含符号包，过滤操作在 should_include_package() 中进行
-                # 构造完整文件名
-                full_filename = f"{pkg_name}-dbgsym_{arch}.deb"
-                packages.append({
-                    'name': f"{pkg_name}-dbgsym",
-                    'arch': arch,
-                    'version': '1.0.0',
-                    'full_filename': full_filename,  # 添加完整文件名
-                    'status': '未下载',
-                    'download_time': '',
-                    'selected': False,
-                    'url': f"{self.source_url.get()}/{full_filename}"
-                })
+        # 配置文件路径
+        self.config_file = os.path.join(os.path.expanduser("~"), ".deb_saver_config.json")
         
-        return packages
+        # 消息队列用于线程间通信
+        self.message_queue = queue.Queue()
+        
+        # 下载源变量
+        self.source_url = tk.StringVar(value="http://10.0.32.60:5001/tasks/580959/unstable-arm64/")
+        
+        # 架构选择变量
+        self.arch_vars = {
+            'arm64': tk.BooleanVar(value=False),
+            'amd64': tk.BooleanVar(value=False),
+            'i386': tk.BooleanVar(value=False),
+            'loongarch64': tk.BooleanVar(value=False),
+            'mips64el': tk.BooleanVar(value=False),
+            'sw_64': tk.BooleanVar(value=False),
+            'all': tk.BooleanVar(value=False)  # 'all' 是一种特殊的架构类型，不是全选功能
+        }
+        
+        # 全选架构变量
+        self.select_all_archs = tk.BooleanVar(value=False)
+        
+        # 符号包选择变量
+        self.include_dbgsym = tk.BooleanVar(value=False)
+        
+        # 仅显示每个包最新版本的选择变量
+        self.latest_only = tk.BooleanVar(value=False)
+        
+        # 网络源递归抓取子目录的层数，0 表示只读取源地址这一页
+        self.crawl_depth = tk.IntVar(value=0)
+        
+        # 按基础包名分组显示的选择变量
+        self.group_view = tk.BooleanVar(value=False)
+        
+        # 显示日志选择变量
+        self.show_log = tk.BooleanVar(value=False)
+        
+        # 本地仓库选项：保存目录变化后自动更新索引，可选通过 HTTP 提供给其他机器
+        self.maintain_repo_index = tk.BooleanVar(value=False)
+        # 下载时按包大小预分配文件空间，减少机械硬盘上的碎片
+        self.preallocate_files = tk.BooleanVar(value=False)
+        self.serve_repo = tk.BooleanVar(value=False)
+        self.repo_server = None
+        self.repo_lock = threading.Lock()
+        
+        # 日志级别和日志文件选项
+        self.log_level_name = tk.StringVar(value='信息')
+        self.log_to_file = tk.BooleanVar(value=False)
+        self.log_level = logging.INFO
+        self.log_file = os.path.join(os.path.expanduser("~"), ".deb_saver.log")
+        
+        # 日志环形缓冲，保存 (级别, 格式化文本)，日志控件只显示其中达到级别的部分
+        self.log_buffer = collections.deque(maxlen=self.LOG_BUFFER_LINES)
+        self.log_widget_lines = 0
+        self.file_logger = None
+        self.file_log_listener = None
+        
+        # 本地保存位置变量
+        self.save_path = tk.StringVar(value="")
+        
+        # 搜索关键字变量
+        self.search_keyword = tk.StringVar(value="")
+        
+        # 本地包目录，保存上次获取的包列表和下载历史，窗口显示后在后台打开
+        self.catalog = None
+        
+        # 包列表获取、过滤与下载引擎，工作线程中的日志通过消息队列回到界面线程
+        self.engine = PackageEngine(
+            log=lambda message: self.message_queue.put(("log", message)),
+            status=lambda message: self.message_queue.put(("status", message)),
+            debug=None,
+            catalog=self.catalog)
+        
+        # 包列表数据
+        self.package_data = []
+        self.filtered_package_data = []  # 过滤后的包数据
+        self.failed_sources = []  # 最近一次刷新时获取失败的源，同步时据此禁止删除
+        self.selection = PackageSelection()  # 存储每个包的勾选状态
+        self.selection_render_generation = 0
+        self.dependency_graph = None  # 依赖关系图，包列表刷新后重建
+        
+        # 创建临时目录
+        self.create_temp_directory()
+        
+        # 创建界面
+        self.create_widgets()
+        
+        # 加载配置
+        self.load_config()
+        
+        # 先显示本地包目录中上次的包列表，再在后台刷新
+        self.load_catalog()
+        
+        # 启动消息队列处理
+        self.process_queue()
+        
+        # 绑定滚动事件
+        self.root.after(100, self._bind_all_scroll_events)
+        
+        # 绑定全局鼠标点击事件，用于关闭右键菜单
+        self.root.bind("<Button-1>", self._on_global_click)
+    
+    def setup_styles(self):
+        """设置界面样式"""
+        style = ttk.Style()
+        style.theme_use('clam')
+        
+        # 配置样式
+        style.configure('Title.TLabel', font=('Arial', 14, 'bold'), foreground='#2c3e50')
+        style.configure('Header.TLabel', font=('Arial', 11, 'bold'), foreground='#34495e')
+        style.configure('Info.TLabel', font=('Arial', 10), foreground='#7f8c8d')
+        style.configure('Status.TLabel', font=('Arial', 10), foreground='orange')
+        
+        # 按钮样式
+        style.configure('Primary.TButton', font=('Arial', 10, 'bold'))
+        style.configure('Success.TButton', font=('Arial', 10, 'bold'))
+        style.configure('Warning.TButton', font=('Arial', 10, 'bold'))
+        style.configure('Danger.TButton', font=('Arial', 10, 'bold'))
+        
+        # 框架样式
+        style.configure('Card.TFrame', relief='solid', borderwidth=1)
+        style.configure('Section.TFrame', relief='groove', borderwidth=2)
+        
+        # 标签框架样式
+        style.configure('Title.TLabelframe', font=('Arial', 11, 'bold'), foreground='#2c3e50')
+        style.configure('Title.TLabelframe.Label', font=('Arial', 11, 'bold'), foreground='#2c3e50')
+        
+        # 进度条样式
+        style.configure('Custom.Horizontal.TProgressbar', 
+                       background='#4a90e2', 
+                       troughcolor='#ecf0f1',
+                       borderwidth=0,
+                       lightcolor='#4a90e2',
+                       darkcolor='#357abd')
+        
+        # 树形视图样式
+        style.configure('Treeview', font=('Arial', 9), rowheight=25)
+        style.configure('Treeview.Heading', font=('Arial', 10, 'bold'), foreground='#2c3e50')
+        
+        # 输入框样式
+        style.configure('TEntry', font=('Arial', 10))
+        style.configure('TCombobox', font=('Arial', 10))
+        
+        # 复选框样式
+        style.configure('TCheckbutton', font=('Arial', 10))
+        
+        # 滚动条样式
+        style.configure('TScrollbar', background='#bdc3c7', troughcolor='#ecf0f1', width=12)
+    
+    def create_temp_directory(self):
+        """创建临时目录"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.temp_dir = f"/tmp/deb_saver_{timestamp}"
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self.save_path.set(self.temp_dir)
+        self.log_message(f"[初始化] 创建临时目录: {self.temp_dir}")
+    
+    def create_widgets(self):
+        """创建界面组件"""
+        # 主框架
+        main_frame = ttk.Frame(self.root, padding="15")
+        main_frame.grid(row=0, column=0, sticky="nsew")
+        
+        # 配置网格权重
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        # 配置主框架中各行的权重，让包表格区域占据主要空间
+        main_frame.rowconfigure(0, weight=0)  # 配置区域固定高度
+        main_frame.rowconfigure(1, weight=0)  # 搜索区域固定高度
+        main_frame.rowconfigure(2, weight=1)  # 包表格区域占据剩余空间
+        main_frame.rowconfigure(3, weight=0)  # 按钮区域固定高度
+        main_frame.rowconfigure(4, weight=0)  # 日志区域固定高度
+        main_frame.rowconfigure(5, weight=0)  # 进度条固定高度
+        main_frame.rowconfigure(6, weight=0)  # 状态栏固定高度
+        
+        # 配置区域
+        config_frame = ttk.LabelFrame(main_frame, text="配置选项", padding="10", style='Title.TLabelframe')
+        config_frame.grid(row=0, column=0, sticky="ew")
+        config_frame.columnconfigure(1, weight=1)
+        
+        # 下载源配置
+        ttk.Label(config_frame, text="下载源:", style='Header.TLabel').grid(row=0, column=0, sticky="w")
+        
+        source_frame = ttk.Frame(config_frame)
+        source_frame.grid(row=0, column=1, sticky="ew")
+        source_frame.columnconfigure(0, weight=1)
+        
+        # 源路径输入
+        self.source_entry = ttk.Entry(source_frame, textvariable=self.source_url, font=('Arial', 10))
+        self.source_entry.grid(row=0, column=0, sticky="ew", padx=(0, 5), pady=5)
+        
+        # 添加源类型显示标签
+        self.source_type_label = ttk.Label(source_frame, text="", style='Info.TLabel')
+        self.source_type_label.grid(row=0, column=1, sticky="e", padx=(0, 5), pady=5)
+        
+        # 网络源递归抓取子目录的层数
+        ttk.Label(source_frame, text="子目录层数:").grid(row=0, column=2, sticky="e", pady=5)
+        ttk.Spinbox(source_frame, from_=0, to=5, width=3, textvariable=self.crawl_depth,
+                    state='readonly').grid(row=0, column=3, sticky="e", padx=(2, 5), pady=5)
+        
+        ttk.Button(source_frame, text="选择本地", command=self.select_local_source,
+                  style='Primary.TButton').grid(row=0, column=4, sticky="e", padx=(0, 5), pady=5)
+        
+        ttk.Button(source_frame, text="刷新", command=self.refresh_package_list,
+                  style='Success.TButton').grid(row=0, column=5, sticky="e", pady=5)
+        
+        # 绑定路径输入变化事件
+        self.source_url.trace('w', self.on_source_path_changed)
+        
+        # 本地保存位置
+        ttk.Label(config_frame, text="本地保存位置:", style='Header.TLabel').grid(row=1, column=0, sticky="w")
+        
+        save_frame = ttk.Frame(config_frame)
+        save_frame.grid(row=1, column=1, sticky="ew")
+        save_frame.columnconfigure(0, weight=1)
+        
+        ttk.Entry(save_frame, textvariable=self.save_path, font=('Arial', 10)).grid(row=0, column=0, sticky="ew", padx=(0, 5))
+        ttk.Button(save_frame, text="选择路径", command=self.select_save_path,
+                  style='Primary.TButton').grid(row=0, column=1, sticky="e", padx=(0, 5))
+        ttk.Button(save_frame, text="打开保存目录", command=self.open_save_dir,
+                  style='Success.TButton').grid(row=0, column=2, sticky="e")
+        ttk.Checkbutton(save_frame, text="预分配空间", variable=self.preallocate_files).grid(
+            row=0, column=3, sticky="e", padx=(10, 0))
+        
+        # 显示日志选择 - 放在本地保存位置下一行
+        ttk.Label(config_frame, text="显示日志:", style='Header.TLabel').grid(row=2, column=0, sticky="w")
+        log_option_frame = ttk.Frame(config_frame)
+        log_option_frame.grid(row=2, column=1, sticky="w")
+        ttk.Checkbutton(log_option_frame, text="操作日志", variable=self.show_log,
+                      command=self.on_log_visibility_changed).pack(side=tk.LEFT)
+        ttk.Label(log_option_frame, text="日志级别:", style='Info.TLabel').pack(side=tk.LEFT, padx=(20, 5))
+        log_level_combo = ttk.Combobox(log_option_frame, textvariable=self.log_level_name,
+                                       values=list(LOG_LEVEL_CHOICES), state='readonly', width=6)
+        log_level_combo.pack(side=tk.LEFT)
+        log_level_combo.bind('<<ComboboxSelected>>', lambda e: self.on_log_level_changed())
+        ttk.Checkbutton(log_option_frame, text="写入日志文件", variable=self.log_to_file,
+                      command=self.on_log_to_file_changed).pack(side=tk.LEFT, padx=(20, 0))
+        
+        # 本地仓库选项
+        ttk.Label(config_frame, text="本地仓库:", style='Header.TLabel').grid(row=3, column=0, sticky="w")
+        repo_option_frame = ttk.Frame(config_frame)
+        repo_option_frame.grid(row=3, column=1, sticky="w")
+        ttk.Checkbutton(repo_option_frame, text="维护仓库索引", variable=self.maintain_repo_index,
+                      command=self.on_maintain_repo_index_changed).pack(side=tk.LEFT)
+        ttk.Checkbutton(repo_option_frame, text="HTTP 服务", variable=self.serve_repo,
+                      command=self.on_serve_repo_changed).pack(side=tk.LEFT, padx=(20, 0))
+        self.repo_url_label = ttk.Label(repo_option_frame, text="", style='Info.TLabel')
+        self.repo_url_label.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # 搜索选项区域
+        search_frame = ttk.LabelFrame(main_frame, text="搜索选项", padding="10", style='Title.TLabelframe')
+        search_frame.grid(row=1, column=0, sticky="ew", pady=(5, 0))
+        search_frame.columnconfigure(1, weight=1)
+        
+        # 搜索输入框和按钮 - 第一行
+        ttk.Label(search_frame, text="关键字:", style='Header.TLabel').grid(row=0, column=0, sticky="w")
+        
+        search_input_frame = ttk.Frame(search_frame)
+        search_input_frame.grid(row=0, column=1, sticky="ew", pady=(0, 5))
+        search_input_frame.columnconfigure(0, weight=1)
+        
+        # 搜索输入框
+        self.search_entry = ttk.Entry(search_input_frame, textvariable=self.search_keyword, font=('Arial', 10))
+        self.search_entry.grid(row=0, column=0, sticky="ew", padx=(0, 5))
+        
+        # 绑定回车键搜索
+        self.search_entry.bind('<Return>', lambda e: self.search_packages())
+        
+        # 搜索按钮
+        search_button = ttk.Button(search_input_frame, text="搜索", command=self.search_packages,
+                              style='Success.TButton')
+        search_button.grid(row=0, column=1, sticky="e")
+        
+        # 架构选择 - 第二行
+        ttk.Label(search_frame, text="架构:", style='Header.TLabel').grid(row=1, column=0, sticky="w")
+        
+        arch_frame = ttk.Frame(search_frame)
+        arch_frame.grid(row=1, column=1, sticky="ew", pady=(0, 5))
+        
+        # 架构选择
+        arch_list = ['arm64', 'amd64', 'i386', 'loongarch64', 'mips64el', 'sw_64', 'all']
+        for arch in arch_list:
+            ttk.Checkbutton(arch_frame, text=arch, variable=self.arch_vars[arch],
+                          command=self.on_arch_changed).pack(side=tk.LEFT, padx=(0, 10))
+        
+        # 添加全选架构选项
+        ttk.Checkbutton(arch_frame, text="全选", variable=self.select_all_archs,
+                      command=self.on_select_all_archs_changed).pack(side=tk.LEFT, padx=(20, 0))
+        
+        # 符号包选择 - 第三行
+        ttk.Label(search_frame, text="符号包:", style='Header.TLabel').grid(row=2, column=0, sticky="w")
+        
+        dbgsym_frame = ttk.Frame(search_frame)
+        dbgsym_frame.grid(row=2, column=1, sticky="ew", pady=(0, 5))
+        
+        ttk.Checkbutton(dbgsym_frame, text="dbgsym", variable=self.include_dbgsym,
+                      command=self.on_dbgsym_changed).pack(side=tk.LEFT)
+        ttk.Checkbutton(dbgsym_frame, text="仅最新版本", variable=self.latest_only,
+                      command=self.on_latest_only_changed).pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Checkbutton(dbgsym_frame, text="分组显示", variable=self.group_view,
+                      command=self.on_group_view_changed).pack(side=tk.LEFT, padx=(20, 0))
+        
+        # 包表格区域
+        table_frame = ttk.LabelFrame(main_frame, text="包列表", padding="10", style='Title.TLabelframe')
+        table_frame.grid(row=2, column=0, sticky="nsew", pady=(5, 0))
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+        
+        # 创建包表格
+        self.create_package_table(table_frame)
+        
+        # 操作按钮区域 - 移除了大部分按钮，只保留必要的
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=3, column=0, sticky="ew", pady=(5, 0))
+        
+        # 可以在这里添加其他必要的按钮，目前为空
+        
+        # 日志区域
+        self.log_frame = ttk.LabelFrame(main_frame, text="操作日志", padding="10", style='Title.TLabelframe')
+        self.log_frame.grid(row=4, column=0, sticky="ew", pady=(5, 0))
+        self.log_frame.columnconfigure(0, weight=1)
+        
+        # 日志内容框架
+        self.log_content_frame = ttk.Frame(self.log_frame)
+        self.log_content_frame.grid(row=0, column=0, sticky="ew")
+        self.log_content_frame.columnconfigure(0, weight=1)
+        
+        # 日志控件在第一次显示日志时才创建，默认隐藏时不占用启动时间
+        self.log_text = None
+        
+        # 初始化日志可见性
+        self.update_log_visibility()
+        
+        # 进度条
+        self.progress = ttk.Progressbar(main_frame, mode='indeterminate', style='Custom.Horizontal.TProgressbar')
+        self.progress.grid(row=5, column=0, sticky="ew", padx=15, pady=(0, 5))
+        
+        # 状态栏
+        self.status_var = tk.StringVar(value="就绪")
+        status_label = ttk.Label(main_frame, textvariable=self.status_var, style='Status.TLabel')
+        status_label.grid(row=6, column=0, sticky="ew", padx=15, pady=(0, 15))
+    
+    def create_package_table(self, parent_frame):
+        """创建包表格"""
+        # 清除现有内容
+        for widget in parent_frame.winfo_children():
+            widget.destroy()
+        
+        # 创建Treeview表格，支持多选，移除固定高度以允许动态调整
+        columns = ('index', 'selected', 'name', 'arch', 'status', 'install_status', 'download_time', 'source')
+        self.package_tree = ttk.Treeview(parent_frame, columns=columns, show='headings', selectmode='extended')
+        
+        # 设置列标题
+        self.package_tree.heading('index', text='序号')
+        self.package_tree.heading('selected', text='勾选状态')
+        self.package_tree.heading('name', text='包名')
+        self.package_tree.heading('arch', text='架构名')
+        self.package_tree.heading('status', text='下载状态')
+        self.package_tree.heading('install_status', text='安装状态')
+        self.package_tree.heading('download_time', text='下载时间')
+        self.package_tree.heading('source', text='来源')
+        self.package_tree.heading('#0', text='分组')
+        
+        # 设置列宽，使用最小宽度以允许动态调整
+        self.package_tree.column('index', width=50, minwidth=50, anchor='center')
+        self.package_tree.column('selected', width=80, minwidth=80, anchor='center')
+        self.package_tree.column('name', width=200, minwidth=150, anchor='w')
+        self.package_tree.column('arch', width=100, minwidth=80, anchor='center')
+        self.package_tree.column('status', width=100, minwidth=80, anchor='center')
+        self.package_tree.column('install_status', width=100, minwidth=80, anchor='center')
+        self.package_tree.column('download_time', width=150, minwidth=120, anchor='center')
+        self.package_tree.column('source', width=200, minwidth=100, anchor='w')
+        self.package_tree.column('#0', width=200, minwidth=120, anchor='w')
+        
+        # 添加滚动条
+        v_scrollbar = ttk.Scrollbar(parent_frame, orient="vertical", command=self.package_tree.yview)
+        h_scrollbar = ttk.Scrollbar(parent_frame, orient="horizontal", command=self.package_tree.xview)
+        self.package_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        
+        # 布局 - 确保表格能够填充整个可用空间
+        self.package_tree.grid(row=0, column=0, sticky="nsew")
+        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        
+        # 配置父框架的网格权重，确保表格能够扩展
+        parent_frame.rowconfigure(0, weight=1)
+        parent_frame.columnconfigure(0, weight=1)
+        
+        # 绑定右键菜单
+        self.package_tree.bind('<Button-3>', self.show_context_menu)
+        self.package_tree.bind('<Double-1>', self.on_item_double_click)
+        
+        # 绑定鼠标拖拽选择事件
+        self.package_tree.bind('<Button-1>', self.on_item_single_click)
+        self.package_tree.bind('<B1-Motion>', self.on_item_motion)
+        self.package_tree.bind('<ButtonRelease-1>', self.on_item_release)
+        self.package_tree.bind('<Control-Button-1>', self.on_ctrl_click)
+        self.package_tree.bind('<Shift-Button-1>', self.on_shift_click)
+        
+        # 分组显示时展开节点才插入子项
+        self.package_tree.bind('<<TreeviewOpen>>', self.on_group_open)
+        self.package_tree.bind('<<TreeviewClose>>', self.on_group_close)
+        
+        # 初始化拖拽选择变量
+        self.drag_start_item = None
+        self.drag_start_selection = set()
+        self.drag_mode = None  # 'normal', 'ctrl', 'shift'
+        self.drag_last_item = None  # 拖拽时上一次经过的项，同一行内的移动事件直接忽略
+        self.selection_anchor = None  # Shift 范围选择的锚点
+        
+        # 初始化包数据字典
+        self.package_item_data = {}
+        
+        # 分组显示状态：节点 -> 组内的 (序号, 包)，尚未插入子项的节点，节点 -> 分组键，已展开的分组键
+        self.group_members = {}
+        self.pending_groups = {}
+        self.group_key_of_item = {}
+        self.open_groups = set()
+        
+        # 填充表格数据
+        self.refresh_table_data()
+    
+    def refresh_table_data(self):
+        """刷新表格数据"""
+        # 清除现有数据
+        for item in self.package_tree.get_children():
+            self.package_tree.delete(item)
+        
+        # 重新初始化包数据字典
+        self.package_item_data = {}
+        self.selection.reset_rows()
+        self.selection.clear()
+        self.selection_anchor = None
+        self.group_members = {}
+        self.pending_groups = {}
+        self.group_key_of_item = {}
+        
+        # 使用过滤后的包数据，如果没有过滤数据则使用全部数据
+        data_to_display = self.filtered_package_data if hasattr(self, 'filtered_package_data') and self.filtered_package_data else self.package_data
+        
+        if self.group_view.get():
+            self.populate_groups(data_to_display)
+            return
+        self.package_tree.configure(show='headings')
+        
+        # 包数据行
+        for i, package in enumerate(data_to_display):
+            # 使用包名+版本+架构作为唯一标识符，避免同名包冲突
+            unique_key = self.get_unique_key(package)
+            
+            # 勾选状态
+            checked = package.get('selected', False)
+            if checked:
+                self.selection.checked.add(unique_key)
+            
+            # 插入数据
+            selected_text = "☑" if checked else "☐"
+            status_text = package.get('status', '未下载')
+            
+            # 优先使用完整文件名，如果没有则使用解析后的包名
+            display_name = package.get('full_filename', package['name'])
+            item_id = self.package_tree.insert('', 'end', values=(
+                i + 1,  # 序号，从1开始
+                selected_text,
+                display_name,  # 显示完整文件名，包含架构和后缀
+                package.get('arch', ''),
+                status_text,
+                package.get('install_status', ''),
+                package.get('download_time', ''),
+                package.get('source', '')
+            ))
+            
+            # 存储包数据到字典中，使用唯一标识符
+            self.package_item_data[item_id] = {
+                'package': package,
+                'unique_key': unique_key
+            }
+            self.selection.add_row(item_id, unique_key)
+    
+    def insert_package_row(self, parent, i, package):
+        """在分组节点下插入一个包行并登记到勾选模型"""
+        unique_key = self.get_unique_key(package)
+        item_id = self.package_tree.insert(parent, 'end', values=(
+            i + 1,
+            "☑" if self.selection.is_checked(unique_key) else "☐",
+            package.get('full_filename', package['name']),
+            package.get('arch', ''),
+            package.get('status', '未下载'),
+            package.get('install_status', ''),
+            package.get('download_time', ''),
+            package.get('source', '')
+        ))
+        self.package_item_data[item_id] = {
+            'package': package,
+            'unique_key': unique_key
+        }
+        self.selection.add_row(item_id, unique_key)
+    
+    def insert_group_node(self, parent, text, group_key, members):
+        """插入一个分组节点，子项在展开时才插入"""
+        arches = sorted({pkg.get('arch', '') for _, pkg in members})
+        node = self.package_tree.insert(parent, 'end', text=text, values=(
+            '', '', f"{len(members)} 个包", ', '.join(arches), '', '', '', ''))
+        self.group_members[node] = members
+        self.group_key_of_item[node] = group_key
+        # 占位子项让节点显示展开标记
+        self.package_tree.insert(node, 'end')
+        self.pending_groups[node] = members
+        if group_key in self.open_groups:
+            self.package_tree.item(node, open=True)
+            self.expand_group(node)
+        return node
+    
+    def populate_groups(self, data_to_display):
+        """按基础包名分组显示，每组只插入一个父节点"""
+        self.package_tree.configure(show='tree headings')
+        
+        for package in data_to_display:
+            if package.get('selected', False):
+                self.selection.checked.add(self.get_unique_key(package))
+        
+        for base_name, members in group_packages(data_to_display).items():
+            self.insert_group_node('', base_name, base_name, members)
+    
+    def expand_group(self, node):
+        """插入分组节点的子项：组内只有一个包名时直接列出各架构/版本，否则按包名再分一层"""
+        members = self.pending_groups.pop(node, None)
+        if members is None:
+            return
+        self.package_tree.delete(*self.package_tree.get_children(node))
+        
+        by_name = {}
+        for i, pkg in members:
+            by_name.setdefault(pkg['name'], []).append((i, pkg))
+        group_key = self.group_key_of_item[node]
+        
+        for name, name_members in by_name.items():
+            if len(by_name) == 1 or len(name_members) == 1:
+                for i, pkg in name_members:
+                    self.insert_package_row(node, i, pkg)
+            else:
+                self.insert_group_node(node, name, (group_key, name), name_members)
+    
+    def on_group_open(self, event):
+        """展开分组节点时插入子项"""
+        node = self.package_tree.focus()
+        if node in self.group_key_of_item:
+            self.open_groups.add(self.group_key_of_item[node])
+            self.expand_group(node)
+    
+    def on_group_close(self, event):
+        """折叠分组节点，刷新表格后保持折叠"""
+        node = self.package_tree.focus()
+        self.open_groups.discard(self.group_key_of_item.get(node))
+    
+    def keys_of_items(self, items):
+        """获取表格项对应的唯一标识符，分组节点展开为组内所有包（包括尚未插入的子项）"""
+        keys = set()
+        for item in items:
+            unique_key = self.selection.key_of_item(item)
+            if unique_key is not None:
+                keys.add(unique_key)
+            elif item in self.group_members:
+                keys.update(self.get_unique_key(pkg) for _, pkg in self.group_members[item])
+        return keys
+    
+    def visible_items(self):
+        """按显示顺序列出已展开的表格项"""
+        stack = list(reversed(self.package_tree.get_children()))
+        while stack:
+            item = stack.pop()
+            yield item
+            if item not in self.pending_groups and self.package_tree.item(item, 'open'):
+                stack.extend(reversed(self.package_tree.get_children(item)))
+    
+    def on_source_path_changed(self, *args):
+        """源路径改变时的处理，自动判断路径类型"""
+        sources = split_sources(self.source_url.get())
+        
+        if not sources:
+            self.source_type_label.config(text="")
+            return
+        
+        if len(sources) > 1:
+            self.source_type_label.config(text=f"检测到: {len(sources)} 个源（靠前的优先）")
+            return
+        
+        # 判断是网络路径还是本地路径
+        path = sources[0]
+        if path.startswith(('http://', 'https://', 'ftp://')):
+            source_type = "网络源"
+        elif os.path.exists(path):
+            source_type = "本地源"
+        else:
+            source_type = "未知路径（将尝试作为网络源处理）"
+        
+        self.source_type_label.config(text=f"检测到: {source_type}")
+    
+    def on_arch_changed(self):
+        """架构选择改变时的处理"""
+        self.search_packages()
+    
+    def on_select_all_archs_changed(self):
+        """全选架构选项改变时的处理"""
+        if self.select_all_archs.get():
+            # 如果选择了全选，则选中所有架构
+            for arch in self.arch_vars:
+                self.arch_vars[arch].set(True)
+        else:
+            # 如果取消了全选，则取消所有架构的选择
+            for arch in self.arch_vars:
+                self.arch_vars[arch].set(False)
+        
+        self.search_packages()
+    
+    def on_dbgsym_changed(self):
+        """符号包选择改变时的处理"""
+        self.search_packages()
+    
+    def on_latest_only_changed(self):
+        """仅最新版本选项改变时的处理"""
+        self.search_packages()
+    
+    def on_group_view_changed(self):
+        """分组显示选项改变时重建表格"""
+        self.refresh_table_data()
+    
+    def on_log_visibility_changed(self):
+        """日志显示选择改变时的处理"""
+        self.update_log_visibility()
     
-    def should_include_package(self, pkg_info):
-        """检查包是否应该包含在列表中"""
-        # 检查架构
+    def search_packages(self):
+        """根据关键字和架构选项搜索包"""
+        keyword = self.search_keyword.get().strip().lower()
         selected_archs = [arch for arch, var in self.arch_vars.items() if var.get()]
-        pkg_name = pkg_info.get('name', '').lower()
-        pkg_arch = pkg_info.get('arch', '').lower()
+        arch_text = ", ".join(selected_archs) if selected_archs else "无"
         
-        # 调试日志
-        self.log_message(f"[调试] 检查包: {pkg_info.get('full_filename', pkg_info.get('name', 'unknown'))}, 架构: {pkg_arch}")
-        self.log_message(f"[调试] 选中的架构: {selected_archs}")
+        self.log_message(f"[搜索] 开始搜索，关键字: '{keyword}', 选中架构: {arch_text}, 包含符号包: {self.include_dbgsym.get()}")
+        self.log_message(f"[搜索] 总包数: {len(self.package_data)}")
         
-        # 如果没有选择任何架构，则不显示任何包
-        if not selected_archs:
-            self.log_message(f"[调试] 没有选择任何架构，包被过滤掉")
-            return False
-            
-        # 架构筛选条件
-        arch_condition_met = False
+        # 首先根据架构和符号包设置过滤包
+        base_packages = self.filter_packages(self.package_data)
+        if self.latest_only.get():
+            base_packages = latest_packages(base_packages)
         
-        # 'all' 是一种特殊的架构类型，不是全选功能
-        # 只有当选择了 'all' 架构或者包的架构在选中的架构列表中时，架构条件才满足
-        # 检查包的架构是否在选中的架构列表中
-        # 优先使用解析出的架构信息，如果没有则从包名中匹配
-        for arch in selected_archs:
-                arch_lower = arch.lower()
-                # 检查解析出的架构
-                if pkg_arch == arch_lower:
-                    arch_condition_met = True
-                    self.log_message(f"[调试] 架构匹配: {pkg_arch} == {arch_lower}")
-                    break
-                # 检查包名中是否包含架构关键字
-                elif arch_lower in pkg_name:
-                    arch_condition_met = True
-                    self.log_message(f"[调试] 包名中包含架构关键字: {arch_lower} in {pkg_name}")
-                    break
+        if not keyword:
+            # 如果关键字为空，显示过滤后的所有包
+            self.filtered_package_data = base_packages.copy()
+            self.log_message(f"[搜索] 显示架构 {arch_text} 的所有包，共 {len(self.filtered_package_data)} 个")
+        else:
+            # 根据关键字过滤包
+            self.filtered_package_data = self.engine.search_packages(base_packages, keyword)
             
-        if not arch_condition_met:
-            self.log_message(f"[调试] 架构不匹配，包被过滤掉")
+            self.log_message(f"[搜索] 关键字 '{keyword}' 在架构 {arch_text} 中找到 {len(self.filtered_package_data)} 个包")
         
-        # 符号包筛选条件
-        dbgsym_condition_met = True
-        if not self.include_dbgsym.get() and 'dbgsym' in pkg_info['name']:
-            dbgsym_condition_met = False
-            self.log_message(f"[调试] 符号包被过滤掉: {pkg_info['name']}")
+        # 更新表格显示
+        self.refresh_table_data()
+    
+    def create_log_widget(self):
+        """创建日志文本控件"""
+        self.log_text = scrolledtext.ScrolledText(self.log_content_frame, height=8, state=tk.NORMAL,
+                                               font=('Consolas', 9),
+                                               background='#f8f9fa',
+                                               foreground='#2c3e50',
+                                               insertbackground='#4a90e2')
+        self.log_text.grid(row=0, column=0, sticky="ew")
+    
+    def update_log_visibility(self):
+        """更新日志可见性"""
+        if self.show_log.get():
+            # 显示日志区域，隐藏期间只写入缓冲，显示时重新渲染
+            if not self.log_text:
+                self.create_log_widget()
+            self.log_frame.grid(row=4, column=0, sticky="ew", pady=(5, 0))
+            self.render_log_buffer()
+            self.log_message("[界面] 操作日志已显示")
         else:
-            self.log_message(f"[调试] 符号包条件满足: include_dbgsym={self.include_dbgsym.get()}, is_dbgsym={'dbgsym' in pkg_info['name']}")
+            # 隐藏日志区域
+            self.log_frame.grid_remove()
+            self.log_message("[界面] 操作日志已隐藏")
+    
+    def select_local_source(self):
+        """选择本地源路径"""
+        selected_path = filedialog.askdirectory(title="选择本地源路径")
+        if selected_path:
+            self.source_url.set(selected_path)
+    
+    def select_save_path(self):
+        """选择保存路径"""
+        selected_path = filedialog.askdirectory(title="选择保存路径", initialdir=self.save_path.get())
+        if selected_path:
+            self.save_path.set(selected_path)
+    
+    def refresh_package_list(self):
+        """刷新包列表"""
+        def refresh_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在获取包列表..."))
+                self.message_queue.put(("log", "[开始] 开始获取包列表"))
+                
+                sources = split_sources(self.source_url.get())
+                
+                if not sources:
+                    self.message_queue.put(("log", "[错误] 请输入下载源路径"))
+                    return
+                
+                # 自动判断路径类型
+                source = sources[0]
+                if len(sources) > 1:
+                    self.message_queue.put(("log", f"[信息] 检测到 {len(sources)} 个源，并发获取后合并"))
+                elif source.startswith(('http://', 'https://', 'ftp://')):
+                    self.message_queue.put(("log", f"[信息] 检测到网络源，使用网络获取方式"))
+                elif os.path.exists(source):
+                    self.message_queue.put(("log", f"[信息] 检测到本地源，使用本地扫描方式"))
+                else:
+                    # 尝试作为网络源处理
+                    self.message_queue.put(("log", f"[信息] 路径不存在，尝试作为网络源处理"))
+                self.engine.crawl_depth = self.crawl_depth.get()
+                failed = []
+                packages = self.engine.list_sources(sources, self.save_path.get(), failed=failed)
+                
+                # 获取失败退回模拟数据时，保留已显示的本地目录结果
+                if (packages and all(pkg.get('mock') for pkg in packages) and
+                        any(not pkg.get('mock') for pkg in self.package_data)):
+                    self.message_queue.put(("log", "[警告] 获取包列表失败，继续显示本地目录中的包列表"))
+                    return
+                
+                # 不在这里过滤，保存完整的包数据
+                # 过滤操作将在 search_packages() 中进行
+                
+                self.failed_sources = failed
+                self.message_queue.put(("update_packages", packages))
+                self.message_queue.put(("log", f"[完成] 获取到 {len(packages)} 个包"))
+                self.message_queue.put(("status", "包列表刷新完成"))
+                # 刷新后自动执行搜索
+                self.message_queue.put(("auto_search",))
+                
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 获取包列表失败: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
         
-        result = arch_condition_met and dbgsym_condition_met
-        self.log_message(f"[调试] 最终结果: {result} (架构条件={arch_condition_met}, 符号包条件={dbgsym_condition_met})")
+        threading.Thread(target=refresh_task, daemon=True).start()
+    
+    def load_catalog(self):
+        """打开本地包目录，读取上次的包列表并显示，有记录时在后台刷新以同步最新结果"""
+        sources = split_sources(self.source_url.get())
         
-        # 返回架构和符号包条件的"且"关系
-        return result
+        def load_task():
+            try:
+                self.catalog = PackageCatalog()
+                self.engine.catalog = self.catalog
+                if not sources:
+                    return
+                packages = self.catalog.load_sources(sources)
+            except sqlite3.Error as e:
+                self.message_queue.put(("log", f"[警告] 读取本地包目录失败: {str(e)}"))
+                return
+            if not packages:
+                return
+            
+            info = self.catalog.source_info(sources[0])
+            updated_at = info[0] if info else "未知"
+            self.message_queue.put(("update_packages", packages))
+            self.message_queue.put(("log", f"[目录] 已显示本地目录中的 {len(packages)} 个包（更新于 {updated_at}），正在后台刷新"))
+            self.refresh_package_list()
+        
+        threading.Thread(target=load_task, daemon=True).start()
+    
+    def get_network_packages(self, url):
+        """从网络获取包列表"""
+        return self.engine.get_network_packages(url)
+    
+    def get_local_packages(self, path):
+        """从本地路径获取包列表（只扫描当前目录）"""
+        return self.engine.get_local_packages(path, self.save_path.get())
+    
+    def parse_deb_filename(self, filename):
+        """解析.deb文件名，提取包名和架构"""
+        return self.engine.parse_deb_filename(filename)
     
     def filter_packages(self, packages):
         """根据当前设置过滤包列表"""
-        filtered = []
-        for pkg in packages:
-            if self.should_include_package(pkg):
-                filtered.append(pkg)
-        return filtered
+        selected_archs = [arch for arch, var in self.arch_vars.items() if var.get()]
+        return self.engine.filter_packages(packages, selected_archs, self.include_dbgsym.get())
     
     def refresh_package_table(self):
         """刷新包表格显示"""
@@ -899,31 +3167,48 @@ class DebPackageSaver:
     
     def select_all(self):
         """全选所有包"""
-        for var in self.package_vars.values():
-            var.set(True)
+        self.selection.check_all_rows()
+        if self.group_view.get():
+            # 分组显示时未展开的包同样勾选
+            self.selection.set_checked(self.keys_of_items(self.package_tree.get_children()), True)
         self.update_tree_selection()
         self.log_message("[操作] 已全选所有包")
     
     def deselect_all(self):
         """全不选所有包"""
-        for var in self.package_vars.values():
-            var.set(False)
+        self.selection.clear()
         self.update_tree_selection()
         self.log_message("[操作] 已取消选择所有包")
     
-    def update_tree_selection(self):
-        """更新树形视图的勾选状态显示"""
-        for item in self.package_tree.get_children():
-            # 获取包数据
-            item_data = self.package_item_data.get(item, {})
-            package = item_data.get('package', {})
-            unique_key = item_data.get('unique_key', '')
-            
-            if unique_key and unique_key in self.package_vars:
-                selected_text = "☑" if self.package_vars[unique_key].get() else "☐"
+    def update_tree_selection(self, items=None):
+        """更新树形视图的勾选状态显示
+        
+        指定 items 时只更新这些行；否则分批更新全部行，避免大列表一次性卡住界面。
+        """
+        if items is not None:
+            self.render_selection_rows(items)
+            return
+        self.selection_render_generation += 1
+        self.render_selection_chunk(0, self.selection_render_generation)
+    
+    def render_selection_rows(self, items):
+        """更新指定行的勾选列"""
+        for item in items:
+            unique_key = self.selection.key_of_item(item)
+            if unique_key is not None:
+                selected_text = "☑" if self.selection.is_checked(unique_key) else "☐"
                 # 更新第一列的勾选状态
                 self.package_tree.set(item, 'selected', selected_text)
     
+    def render_selection_chunk(self, start, generation):
+        """分批更新勾选列，有新的全量更新时放弃旧的批次"""
+        if generation != self.selection_render_generation:
+            return
+        end = start + self.SELECTION_RENDER_CHUNK
+        self.render_selection_rows(self.selection.items[start:end])
+        if end < len(self.selection.items):
+            self.root.after(1, self.render_selection_chunk, end, generation)
+    
     def show_context_menu(self, event):
         """显示右键菜单"""
         # 选中右键点击的项
@@ -941,6 +3226,7 @@ class DebPackageSaver:
             
             # 包操作菜单
             self.context_menu.add_command(label="下载选中", command=self.download_selected)
+            self.context_menu.add_command(label="下载并安装", command=lambda: self.download_selected(install=True))
             self.context_menu.add_command(label="删除选中", command=self.delete_selected)
             self.context_menu.add_separator()
             
@@ -950,16 +3236,25 @@ class DebPackageSaver:
             self.context_menu.add_separator()
             self.context_menu.add_command(label="勾选", command=self.toggle_selection)
             self.context_menu.add_command(label="取消勾选", command=self.deselect_item)
+            self.context_menu.add_command(label="勾选依赖", command=self.select_with_depends)
             self.context_menu.add_separator()
             
             # 列表操作菜单
             self.context_menu.add_command(label="刷新列表", command=self.refresh_package_list)
+            self.context_menu.add_command(label="同步到保存目录", command=self.sync_to_save_path)
+            self.context_menu.add_command(label="比较两个源", command=self.compare_sources)
+            self.context_menu.add_command(label="校验保存目录", command=self.verify_save_path)
             self.context_menu.add_separator()
             
             # 工具操作菜单
             self.context_menu.add_command(label="压缩成ZIP包", command=self.create_zip)
             self.context_menu.add_command(label="打开本地保存目录", command=self.open_save_dir)
             self.context_menu.add_command(label="拷贝到剪切板", command=self.copy_to_clipboard)
+            self.context_menu.add_separator()
+            
+            # 调试符号菜单
+            self.context_menu.add_command(label="提取调试符号", command=self.extract_debug_symbols)
+            self.context_menu.add_command(label="按 Build ID 查找", command=self.lookup_build_id)
             
             # 显示菜单
             try:
@@ -969,28 +3264,89 @@ class DebPackageSaver:
     
     def toggle_selection(self):
         """切换选中项的勾选状态"""
-        selected_items = self.package_tree.selection()
-        for item in selected_items:
-            item_data = self.package_item_data.get(item, {})
-            unique_key = item_data.get('unique_key', '')
-            
-            if unique_key and unique_key in self.package_vars:
-                current_state = self.package_vars[unique_key].get()
-                self.package_vars[unique_key].set(not current_state)
-        
-        self.update_tree_selection()
+        keys = self.keys_of_items(self.package_tree.selection())
+        self.selection.toggle(keys)
+        self.update_tree_selection(self.selection.items_for_keys(keys))
     
     def deselect_item(self):
         """取消勾选选中项"""
-        selected_items = self.package_tree.selection()
-        for item in selected_items:
-            item_data = self.package_item_data.get(item, {})
-            unique_key = item_data.get('unique_key', '')
+        keys = self.keys_of_items(self.package_tree.selection())
+        self.selection.set_checked(keys, False)
+        self.update_tree_selection(self.selection.items_for_keys(keys))
+    
+    def select_with_depends(self):
+        """勾选已勾选包在当前源内的依赖闭包"""
+        roots = [i for i, pkg in enumerate(self.package_data) if self.is_package_checked(pkg)]
+        if not roots:
+            messagebox.showwarning("警告", "请先勾选需要计算依赖的包")
+            return
+        
+        selected_archs = [arch for arch, var in self.arch_vars.items() if var.get()]
+        if not selected_archs:
+            # 未选择架构时，使用已勾选包自身的架构
+            selected_archs = sorted({self.package_data[i].get('arch', '') for i in roots})
+        sources = split_sources(self.source_url.get())
+        packages = self.package_data
+        
+        def resolve_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在计算依赖..."))
+                
+                if self.dependency_graph is None or self.dependency_graph.packages is not packages:
+                    apply_source_indexes(packages, sources, log=lambda m: self.message_queue.put(("log", m)))
+                    self.dependency_graph = DependencyGraph(packages)
+                
+                start_time = time.perf_counter()
+                closure = self.dependency_graph.closure(roots, selected_archs)
+                elapsed = (time.perf_counter() - start_time) * 1000
+                added = [packages[i] for i in sorted(closure - set(roots))
+                         if not self.is_package_checked(packages[i])]
+                
+                self.message_queue.put(("log", f"[依赖] {len(roots)} 个包的依赖闭包计算完成，耗时 {elapsed:.1f} ms，新增 {len(added)} 个包"))
+                self.message_queue.put(("depends_resolved", added))
             
-            if unique_key and unique_key in self.package_vars:
-                self.package_vars[unique_key].set(False)
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 计算依赖失败: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
         
-        self.update_tree_selection()
+        threading.Thread(target=resolve_task, daemon=True).start()
+    
+    def apply_depends_selection(self, added):
+        """预览并勾选依赖闭包中新增的包"""
+        if not added:
+            messagebox.showinfo("勾选依赖", "已勾选包在当前源内没有需要额外勾选的依赖")
+            return
+        
+        total_size = sum(pkg.get('size', 0) for pkg in added)
+        preview = '\n'.join(pkg.get('full_filename', pkg['name']) for pkg in added[:15])
+        if len(added) > 15:
+            preview += f"\n... 等共 {len(added)} 个"
+        response = messagebox.askyesno(
+            "勾选依赖",
+            f"将额外勾选 {len(added)} 个依赖包，总大小约 {format_size(total_size)}:\n\n{preview}\n\n是否继续？"
+        )
+        if not response:
+            return
+        
+        # 被过滤隐藏的依赖包同样会被勾选并参与下载
+        keys = set()
+        for pkg in added:
+            pkg['selected'] = True
+            keys.add(self.get_unique_key(pkg))
+        self.selection.set_checked(keys, True)
+        
+        self.update_tree_selection(self.selection.items_for_keys(keys))
+        self.log_message(f"[操作] 已勾选 {len(added)} 个依赖包，总大小 {format_size(total_size)}")
+    
+    def get_unique_key(self, pkg):
+        """获取包的唯一标识符（包名+版本+架构），同一个包的不同版本互不冲突"""
+        return f"{pkg['name']}_{pkg.get('version', '')}_{pkg.get('arch', '')}"
+    
+    def is_package_checked(self, pkg):
+        """检查包是否处于勾选状态"""
+        return self.selection.is_checked(self.get_unique_key(pkg))
     
     def copy_to_clipboard(self):
         """复制选中项到剪切板"""
@@ -1031,6 +3387,8 @@ class DebPackageSaver:
             self.drag_start_item = item
             self.drag_start_selection = set(self.package_tree.selection())
             self.drag_mode = 'normal'
+            self.drag_last_item = item
+            self.selection_anchor = item
             
             # 如果没有按下Ctrl或Shift，则清除之前的选择
             if not event.state & 0x0004 and not event.state & 0x0001:  # Ctrl和Shift
@@ -1043,6 +3401,8 @@ class DebPackageSaver:
             self.drag_start_item = item
             self.drag_start_selection = set(self.package_tree.selection())
             self.drag_mode = 'ctrl'
+            self.drag_last_item = item
+            self.selection_anchor = item
             
             # 切换选择状态
             if item in self.drag_start_selection:
@@ -1057,14 +3417,25 @@ class DebPackageSaver:
             self.drag_start_item = item
             self.drag_start_selection = set(self.package_tree.selection())
             self.drag_mode = 'shift'
+            self.drag_last_item = item
             
-            # 获取当前选择的第一项
-            current_selection = self.package_tree.selection()
-            if current_selection:
-                anchor_item = current_selection[0]
+            # 以上一次点击的项为锚点，没有锚点时使用当前选择的第一项
+            anchor_item = self.get_selection_anchor()
+            if anchor_item:
                 self.select_range(anchor_item, item)
             else:
                 self.package_tree.selection_set(item)
+                self.selection_anchor = item
+    
+    def get_selection_anchor(self):
+        """获取范围选择的锚点"""
+        if self.selection_anchor in self.selection.row_of_item:
+            return self.selection_anchor
+        current_selection = self.package_tree.selection()
+        if current_selection:
+            self.selection_anchor = current_selection[0]
+            return self.selection_anchor
+        return None
     
     def on_item_motion(self, event):
         """鼠标拖拽移动时的处理"""
@@ -1072,7 +3443,10 @@ class DebPackageSaver:
             return
             
         current_item = self.package_tree.identify_row(event.y)
-        if not current_item or current_item == self.drag_start_item:
+        if not current_item or current_item == self.drag_last_item:
+            return
+        self.drag_last_item = current_item
+        if current_item == self.drag_start_item:
             return
         
         if self.drag_mode == 'normal':
@@ -1086,9 +3460,8 @@ class DebPackageSaver:
                 self.package_tree.selection_remove(current_item)
         elif self.drag_mode == 'shift':
             # Shift+拖拽：范围选择
-            current_selection = self.package_tree.selection()
-            if current_selection:
-                anchor_item = current_selection[0]
+            anchor_item = self.get_selection_anchor()
+            if anchor_item:
                 self.select_range(anchor_item, current_item)
     
     def on_item_release(self, event):
@@ -1096,183 +3469,483 @@ class DebPackageSaver:
         self.drag_start_item = None
         self.drag_start_selection = set()
         self.drag_mode = None
+        self.drag_last_item = None
     
     def select_range(self, start_item, end_item):
         """选择从开始项到结束项范围内的所有项"""
-        # 获取所有子项
-        all_items = list(self.package_tree.get_children())
+        if self.group_view.get():
+            # 分组显示时子项按展开顺序插入，只能按显示顺序遍历已展开的项
+            visible = list(self.visible_items())
+            if start_item in visible and end_item in visible:
+                start, end = sorted((visible.index(start_item), visible.index(end_item)))
+                self.package_tree.selection_set(visible[start:end + 1])
+            else:
+                self.package_tree.selection_set(end_item)
+            return
         
-        try:
-            start_index = all_items.index(start_item)
-            end_index = all_items.index(end_item)
-            
-            # 确保开始索引小于结束索引
-            if start_index > end_index:
-                start_index, end_index = end_index, start_index
-            
-            # 选择范围内的所有项
-            range_items = all_items[start_index:end_index + 1]
-            self.package_tree.selection_set(range_items)
-            
-        except ValueError:
+        # 通过行序号索引直接取范围，不需要遍历所有子项
+        range_items = self.selection.items_between(start_item, end_item)
+        if range_items is None:
             # 如果项目不存在，只选择结束项
             self.package_tree.selection_set(end_item)
+        else:
+            self.package_tree.selection_set(range_items)
     
     def on_item_double_click(self, event):
         """双击项目时的处理"""
         item = self.package_tree.identify_row(event.y)
         if item:
-            item_data = self.package_item_data.get(item, {})
-            unique_key = item_data.get('unique_key', '')
+            unique_key = self.selection.key_of_item(item)
+            
+            if unique_key is not None:
+                # 切换勾选状态
+                self.selection.toggle([unique_key])
+                self.update_tree_selection(self.selection.items_for_keys([unique_key]))
+    
+    def download_selected(self, install=False):
+        """下载选中的包，install 为 True 时每个包的依赖到齐后立即安装
+        
+        下载前先统计总大小（仓库索引中的大小或并发 HEAD 请求）并检查保存目录的可用空间。
+        """
+        # 使用唯一标识符检查选中状态
+        selected_packages = [pkg for pkg in self.package_data if self.is_package_checked(pkg)]
+        
+        if not selected_packages:
+            messagebox.showwarning("警告", "请至少选择一个包进行下载")
+            return
+        
+        save_path = self.save_path.get()
+        sources = split_sources(self.source_url.get())
+        
+        def preflight_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在统计下载大小..."))
+                
+                log = lambda m: self.message_queue.put(("log", m))
+                apply_source_indexes(selected_packages, sources, log=log if install else None)
+                total, unknown = self.engine.estimate_sizes(selected_packages)
+                free = self.engine.free_disk_space(save_path)
+                self.message_queue.put(("log", f"[下载] 共 {len(selected_packages)} 个包，约 {format_size(total)}"
+                                               f"{f'（{unknown} 个包大小未知）' if unknown else ''}，可用空间 {format_size(free)}"))
+                self.message_queue.put(("download_preflight", selected_packages, install, total, unknown, free))
+            
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 统计下载大小失败: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
+        
+        threading.Thread(target=preflight_task, daemon=True).start()
+    
+    def confirm_download(self, selected_packages, install, total, unknown, free):
+        """空间不足时提示用户，确认后开始下载"""
+        if total + DISK_SPACE_RESERVE > free:
+            if not messagebox.askyesno(
+                    "磁盘空间不足",
+                    f"需要下载约 {format_size(total)}，保存目录只剩 {format_size(free)} 可用空间。\n\n是否仍然继续下载？",
+                    icon="warning"):
+                self.log_message("[下载] 空间不足，已取消下载")
+                return
+        self.start_download(selected_packages, install)
+    
+    def start_download(self, selected_packages, install=False):
+        """在后台下载（并按需安装）选中的包"""
+        self.engine.preallocate = self.preallocate_files.get()
+        
+        def download_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在下载选中的包..."))
+                self.message_queue.put(("log", f"[开始] 开始下载 {len(selected_packages)} 个包"))
+                
+                save_path = self.save_path.get()
+                source = self.source_url.get().strip()
+                
+                def on_result(pkg, success, error):
+                    if error is not None:
+                        self.message_queue.put(("log", f"[错误] {pkg['name']} 下载异常: {str(error)}"))
+                    elif success:
+                        self.message_queue.put(("log", f"[成功] {pkg['name']} 下载完成"))
+                    else:
+                        self.message_queue.put(("log", f"[失败] {pkg['name']} 下载失败"))
+                
+                if install:
+                    def on_install(pkg, status):
+                        self.message_queue.put(("install_status", self.get_unique_key(pkg), status))
+                        if status in ('已安装', '安装失败', '依赖缺失'):
+                            self.message_queue.put(("log", f"[安装] {pkg['name']} {status}"))
+                    
+                    # 依赖信息在下载前统计大小时已从仓库索引读取
+                    success_count, error_count, install_ok, install_failed = self.engine.download_and_install(
+                        selected_packages, save_path, source, max_workers=5,
+                        on_result=on_result, on_install=on_install)
+                    self.message_queue.put(("log", f"[完成] 安装完成: 成功 {install_ok} 个，失败 {install_failed} 个"))
+                else:
+                    success_count, error_count = self.engine.download_packages(
+                        selected_packages, save_path, source, max_workers=5, on_result=on_result)
+                
+                # 刷新表格显示
+                self.message_queue.put(("refresh_table",))
+                self.message_queue.put(("log", f"[完成] 下载完成: 成功 {success_count} 个，失败 {error_count} 个"))
+                self.message_queue.put(("status", "下载操作完成"))
+                self.update_repo_index()
+                
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 下载过程出错: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
+        
+        threading.Thread(target=download_task, daemon=True).start()
+    
+    def sync_to_save_path(self):
+        """将当前列表增量同步到保存目录：只下载新增或变化的包，可选删除多余的包"""
+        packages = list(self.filtered_package_data or self.package_data)
+        if not packages:
+            messagebox.showwarning("警告", "当前列表为空，请先刷新包列表")
+            return
+        
+        save_path = self.save_path.get()
+        sources = split_sources(self.source_url.get())
+        
+        # 本地多余的包按完整的远程列表判断，只删除当前架构、符号包和关键字条件覆盖的文件
+        listing = list(self.package_data)
+        prune = not self.failed_sources and not any(pkg.get('mock') for pkg in listing)
+        if not prune:
+            self.log_message("[警告] 包列表来自模拟数据或有源获取失败，本次同步不删除本地多余的包")
+        selected_archs = [arch for arch, var in self.arch_vars.items() if var.get()]
+        include_dbgsym = self.include_dbgsym.get()
+        keyword = self.search_keyword.get()
+        
+        def covers(pkg):
+            return bool(self.engine.search_packages(
+                self.engine.filter_packages([pkg], selected_archs, include_dbgsym), keyword))
+        
+        def plan_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在比较远程列表与保存目录..."))
+                
+                log = lambda m: self.message_queue.put(("log", m))
+                apply_source_indexes(packages, sources, log=log)
+                plan = self.engine.plan_sync(packages, save_path, prune=prune, listing=listing, covers=covers)
+                
+                self.message_queue.put(("log", f"[同步] 新增 {len(plan['new'])} 个，变化 {len(plan['changed'])} 个，"
+                                               f"未变化 {len(plan['unchanged'])} 个，本地多余 {len(plan['removed'])} 个"))
+                self.message_queue.put(("sync_planned", plan))
+            
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 比较同步差异失败: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
+        
+        threading.Thread(target=plan_task, daemon=True).start()
+    
+    def verify_save_path(self):
+        """校验保存目录中的 .deb 文件，把损坏的包在表格中标记出来"""
+        save_path = self.save_path.get()
+        if not os.path.isdir(save_path):
+            messagebox.showwarning("警告", "保存目录不存在")
+            return
+        packages = list(self.package_data)
+        sources = split_sources(self.source_url.get())
+        
+        def verify_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在校验保存目录..."))
+                
+                # 仓库索引中有大小时一并比较
+                apply_source_indexes(packages, sources)
+                start_time = time.perf_counter()
+                total, corrupt = self.engine.verify_save_path(save_path, packages)
+                elapsed = time.perf_counter() - start_time
+                for filename, reason in sorted(corrupt.items()):
+                    self.message_queue.put(("log", f"[损坏] {filename}: {reason}"))
+                self.message_queue.put(("log", f"[校验] 校验了 {total} 个文件，耗时 {elapsed:.2f} 秒，损坏 {len(corrupt)} 个"))
+                self.message_queue.put(("verify_done", total, corrupt))
             
-            if unique_key and unique_key in self.package_vars:
-                # 切换勾选状态
-                current_state = self.package_vars[unique_key].get()
-                self.package_vars[unique_key].set(not current_state)
-                self.update_tree_selection()
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 校验保存目录失败: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
+        
+        threading.Thread(target=verify_task, daemon=True).start()
     
-    def download_selected(self):
-        """下载选中的包"""
-        selected_packages = []
+    def mark_corrupt_packages(self, total, corrupt):
+        """将校验出的损坏包标记为“已损坏”"""
+        keys = set()
         for pkg in self.package_data:
-            # 使用唯一标识符检查选中状态
-            unique_key = f"{pkg['name']}_{pkg.get('arch', '')}"
-            if self.package_vars.get(unique_key, tk.BooleanVar(value=False)).get():
-                selected_packages.append(pkg)
+            if self.engine.get_target_filename(pkg) in corrupt:
+                pkg['status'] = '已损坏'
+                keys.add(self.get_unique_key(pkg))
+        for item in self.selection.items_for_keys(keys):
+            self.package_tree.set(item, 'status', '已损坏')
         
-        if not selected_packages:
-            messagebox.showwarning("警告", "请至少选择一个包进行下载")
+        if corrupt:
+            messagebox.showwarning("校验保存目录",
+                                   f"校验了 {total} 个文件，{len(corrupt)} 个已损坏，请重新下载（详情见操作日志）")
+        else:
+            messagebox.showinfo("校验保存目录", f"校验了 {total} 个文件，全部完好")
+    
+    def compare_sources(self):
+        """比较两个源（两个构建地址，或地址与本地目录）的包列表
+        
+        下载源中填写了多个源时比较前两个，否则询问用于比较的第二个源。
+        """
+        sources = split_sources(self.source_url.get())
+        if not sources:
+            messagebox.showwarning("警告", "请输入下载源路径")
             return
+        if len(sources) < 2:
+            other = simpledialog.askstring("比较两个源", f"旧的源: {sources[0]}\n\n请输入新的源（网络URL或本地目录）:",
+                                           initialvalue=self.save_path.get(), parent=self.root)
+            if not other or not other.strip():
+                return
+            sources.append(other.strip())
+        old_source, new_source = sources[:2]
         
-        def download_task():
+        def compare_task():
             try:
                 self.message_queue.put(("progress", "start"))
-                self.message_queue.put(("status", "正在下载选中的包..."))
-                self.message_queue.put(("log", f"[开始] 开始下载 {len(selected_packages)} 个包"))
+                self.message_queue.put(("status", "正在比较两个源..."))
                 
-                save_path = self.save_path.get()
-                os.makedirs(save_path, exist_ok=True)
+                with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                    old_packages, new_packages = executor.map(
+                        lambda source: self.engine.list_sources([source], self.save_path.get()),
+                        (old_source, new_source))
+                for source, packages in ((old_source, old_packages), (new_source, new_packages)):
+                    if any(pkg.get('mock') for pkg in packages):
+                        self.message_queue.put(("log", f"[错误] 获取包列表失败，无法比较: {source}"))
+                        return
                 
-                success_count = 0
-                error_count = 0
+                start_time = time.perf_counter()
+                entries = diff_package_lists(old_packages, new_packages)
+                elapsed = (time.perf_counter() - start_time) * 1000
+                self.message_queue.put(("log", f"[比较] {len(old_packages)} 个包与 {len(new_packages)} 个包比较完成，"
+                                               f"耗时 {elapsed:.1f} ms，共 {len(entries)} 处差异"))
+                self.message_queue.put(("source_diff", old_source, new_source, entries))
+            
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 比较两个源失败: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
+        
+        threading.Thread(target=compare_task, daemon=True).start()
+    
+    def show_source_diff(self, old_source, new_source, entries):
+        """在新窗口中显示源比较结果，可按变化类型、架构和关键字过滤"""
+        window = tk.Toplevel(self.root)
+        window.title("源比较结果")
+        window.geometry("900x600")
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(2, weight=1)
+        
+        summary = summarize_diff(entries)
+        summary_text = "\n".join(
+            f"{arch or '无架构'}: 新增 {counts['added']}，删除 {counts['removed']}，版本变化 {counts['changed']}"
+            for arch, counts in summary.items()) or "两个源的包列表相同"
+        ttk.Label(window, text=f"旧: {old_source}\n新: {new_source}\n\n{summary_text}",
+                  justify=tk.LEFT).grid(row=0, column=0, sticky="w", padx=10, pady=(10, 5))
+        
+        # 过滤条件
+        filter_frame = ttk.Frame(window)
+        filter_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=5)
+        change_var = tk.StringVar(value="全部")
+        arch_var = tk.StringVar(value="全部")
+        keyword_var = tk.StringVar()
+        ttk.Label(filter_frame, text="变化:").pack(side=tk.LEFT)
+        change_combo = ttk.Combobox(filter_frame, textvariable=change_var, state="readonly", width=10,
+                                    values=["全部"] + list(DIFF_CHANGE_LABELS.values()))
+        change_combo.pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(filter_frame, text="架构:").pack(side=tk.LEFT)
+        arch_combo = ttk.Combobox(filter_frame, textvariable=arch_var, state="readonly", width=10,
+                                  values=["全部"] + list(summary))
+        arch_combo.pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(filter_frame, text="关键字:").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=keyword_var, width=30).pack(side=tk.LEFT, padx=(5, 15))
+        count_label = ttk.Label(filter_frame, text="")
+        count_label.pack(side=tk.LEFT)
+        
+        # 结果表格
+        table_frame = ttk.Frame(window)
+        table_frame.grid(row=2, column=0, sticky="nsew", padx=10, pady=(0, 10))
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+        columns = ('change', 'name', 'arch', 'old_version', 'new_version')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        for column, text, width in (('change', '变化', 80), ('name', '包名', 260), ('arch', '架构名', 90),
+                                    ('old_version', '旧版本', 180), ('new_version', '新版本', 180)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width, minwidth=60, anchor='w')
+        v_scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=v_scrollbar.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        v_scrollbar.grid(row=0, column=1, sticky="ns")
+        
+        labels_to_change = {label: change for change, label in DIFF_CHANGE_LABELS.items()}
+        render_state = {'generation': 0}
+        
+        def render_chunk(rows, start, generation):
+            # 分批插入，有新的过滤条件时放弃旧的批次
+            if generation != render_state['generation'] or not tree.winfo_exists():
+                return
+            end = start + self.SELECTION_RENDER_CHUNK
+            for entry in rows[start:end]:
+                tree.insert('', 'end', values=(DIFF_CHANGE_LABELS[entry['change']], entry['name'], entry['arch'],
+                                               entry['old_version'], entry['new_version']))
+            if end < len(rows):
+                window.after(1, render_chunk, rows, end, generation)
+        
+        def apply_filter(*args):
+            change = labels_to_change.get(change_var.get())
+            arch = arch_var.get()
+            keyword = keyword_var.get().strip().lower()
+            rows = [entry for entry in entries
+                    if (change is None or entry['change'] == change)
+                    and (arch == "全部" or entry['arch'] == arch)
+                    and (not keyword or keyword in entry['name'].lower())]
+            tree.delete(*tree.get_children())
+            count_label.config(text=f"显示 {len(rows)} / {len(entries)} 项")
+            render_state['generation'] += 1
+            render_chunk(rows, 0, render_state['generation'])
+        
+        change_combo.bind('<<ComboboxSelected>>', apply_filter)
+        arch_combo.bind('<<ComboboxSelected>>', apply_filter)
+        keyword_var.trace_add('write', apply_filter)
+        apply_filter()
+    
+    def confirm_sync(self, plan):
+        """显示同步预览（即 dry-run 结果），确认后执行同步"""
+        to_fetch = plan['new'] + plan['changed']
+        if not to_fetch and not plan['removed']:
+            messagebox.showinfo("同步", "保存目录已是最新，无需同步")
+            return
+        
+        fetch_size = sum(pkg.get('size', 0) for pkg in to_fetch)
+        summary = (f"新增: {len(plan['new'])} 个\n"
+                   f"变化: {len(plan['changed'])} 个\n"
+                   f"未变化: {len(plan['unchanged'])} 个\n"
+                   f"本地多余: {len(plan['removed'])} 个\n\n"
+                   f"需要下载约 {format_size(fetch_size)}")
+        if not messagebox.askyesno("同步预览", f"{summary}\n\n是否开始同步？"):
+            self.log_message("[同步] 已取消，仅预览差异")
+            return
+        
+        if plan['removed'] and not messagebox.askyesno(
+                "删除多余文件",
+                f"保存目录中有 {len(plan['removed'])} 个包不在当前列表中，是否删除？",
+                icon="warning"):
+            plan['removed'] = []
+        
+        save_path = self.save_path.get()
+        
+        def sync_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在同步..."))
                 
-                with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                    futures = {}
-                    
-                    for pkg in selected_packages:
-                        source = self.source_url.get().strip()
-                        # 自动判断下载方式
-                        if source.startswith(('http://', 'https://', 'ftp://')) or not os.path.exists(source):
-                            future = executor.submit(self.download_network_package, pkg, save_path)
-                        else:
-                            future = executor.submit(self.copy_local_package, pkg, save_path)
-                        futures[future] = pkg
-                    
-                    for future in concurrent.futures.as_completed(futures):
-                        pkg = futures[future]
-                        try:
-                            success = future.result()
-                            if success:
-                                success_count += 1
-                                self.message_queue.put(("log", f"[成功] {pkg['name']} 下载完成"))
-                                # 更新包状态
-                                pkg['status'] = '已下载'
-                                pkg['download_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            else:
-                                error_count += 1
-                                self.message_queue.put(("log", f"[失败] {pkg['name']} 下载失败"))
-                        except Exception as e:
-                            error_count += 1
-                            self.message_queue.put(("log", f"[错误] {pkg['name']} 下载异常: {str(e)}"))
+                def on_result(pkg, success, error):
+                    if success:
+                        self.message_queue.put(("log", f"[同步] {pkg['name']} 已更新"))
+                    else:
+                        self.message_queue.put(("log", f"[失败] {pkg['name']} 同步失败{': ' + str(error) if error else ''}"))
                 
-                # 刷新表格显示
-                self.message_queue.put(("refresh_table",))
-                self.message_queue.put(("log", f"[完成] 下载完成: 成功 {success_count} 个，失败 {error_count} 个"))
-                self.message_queue.put(("status", "下载操作完成"))
+                success_count, error_count, removed_count = self.engine.apply_sync(
+                    plan, save_path, max_workers=5, on_result=on_result)
                 
+                self.message_queue.put(("refresh_table",))
+                self.message_queue.put(("log", f"[完成] 同步完成: 下载 {success_count} 个，失败 {error_count} 个，删除 {removed_count} 个"))
+                self.message_queue.put(("status", "同步操作完成"))
+                self.update_repo_index()
+            
             except Exception as e:
-                self.message_queue.put(("log", f"[错误] 下载过程出错: {str(e)}"))
+                self.message_queue.put(("log", f"[错误] 同步过程出错: {str(e)}"))
             finally:
                 self.message_queue.put(("progress", "stop"))
         
-        threading.Thread(target=download_task, daemon=True).start()
+        threading.Thread(target=sync_task, daemon=True).start()
     
-    def download_network_package(self, pkg, save_path):
-        """下载网络包"""
-        try:
-            self.log_message(f"[下载] 开始下载网络包: {pkg['name']}")
-            
-            # 获取下载URL
-            download_url = pkg.get('url')
-            if not download_url:
-                # 如果没有URL，尝试构造
-                download_url = f"{self.source_url.get()}/{pkg['name']}_{pkg.get('version', '1.0')}_{pkg['arch']}.deb"
-            
-            # 生成文件名
-            filename = f"{pkg['name']}_{pkg.get('version', '1.0')}_{pkg['arch']}.deb"
-            target_path = os.path.join(save_path, filename)
-            
-            # 使用urllib下载
+    def extract_debug_symbols(self):
+        """将勾选的已下载符号包提取到按 build-id 组织的调试符号仓库"""
+        selected_packages = [pkg for pkg in self.package_data
+                             if self.is_package_checked(pkg) and 'dbgsym' in pkg['name']]
+        if not selected_packages:
+            messagebox.showwarning("警告", "请至少勾选一个符号包（dbgsym）")
+            return
+        
+        save_path = self.save_path.get()
+        items = []
+        for pkg in selected_packages:
+            deb_path = self.engine.local_package_path(pkg, save_path)
+            if deb_path:
+                items.append((deb_path, pkg))
+            else:
+                self.log_message(f"[警告] {pkg['name']} 尚未下载，已跳过")
+        if not items:
+            messagebox.showwarning("警告", "勾选的符号包都未下载，请先下载到保存目录")
+            return
+        
+        store = DebugStore()
+        
+        def extract_task():
             try:
-                import urllib.request
-                urllib.request.urlretrieve(download_url, target_path)
-                self.log_message(f"[成功] 网络包下载完成: {filename}")
-                return True
+                self.message_queue.put(("progress", "start"))
+                self.message_queue.put(("status", "正在提取调试符号..."))
+                self.message_queue.put(("log", f"[开始] 提取 {len(items)} 个符号包到 {store.root}"))
                 
-            except ImportError:
-                # 备用方法：使用requests
-                try:
-                    import requests
-                    response = requests.get(download_url, timeout=30)
-                    response.raise_for_status()
-                    
-                    with open(target_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    self.log_message(f"[成功] 网络包下载完成: {filename}")
-                    return True
-                    
-                except Exception as e:
-                    self.log_message(f"[错误] requests下载失败: {str(e)}")
-                    # 最后使用模拟文件
-                    with open(target_path, 'w') as f:
-                        f.write(f"模拟的DEB包文件: {pkg['name']}\n原始URL: {download_url}")
-                    return True
+                log = lambda m: self.message_queue.put(("log", m))
+                success_count, error_count, id_count = store.extract_packages(items, log=log)
+                
+                self.message_queue.put(("log", f"[完成] 调试符号提取完成: 成功 {success_count} 个，失败 {error_count} 个，"
+                                               f"共 {id_count} 个 build-id"))
+                self.message_queue.put(("log", f"[提示] gdb 中执行: set debug-file-directory {store.root}:/usr/lib/debug"))
+                self.message_queue.put(("status", "调试符号提取完成"))
             
-        except Exception as e:
-            self.log_message(f"[错误] 下载网络包失败: {pkg['name']}, 错误: {str(e)}")
-            return False
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 提取调试符号出错: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
+        
+        threading.Thread(target=extract_task, daemon=True).start()
     
-    def copy_local_package(self, pkg, save_path):
-        """复制本地包"""
-        try:
-            source_path = pkg.get('source_path')
-            if not source_path or not os.path.exists(source_path):
-                self.log_message(f"[错误] 源文件不存在: {source_path}")
-                return False
-            
-            filename = os.path.basename(source_path)
-            target_path = os.path.join(save_path, filename)
-            
-            self.log_message(f"[复制] 开始复制本地包: {pkg['name']}")
-            
-            # 使用多线程复制
-            shutil.copy2(source_path, target_path)
-            
-            return True
-            
-        except Exception as e:
-            self.log_message(f"[错误] 复制本地包失败: {pkg['name']}, 错误: {str(e)}")
-            return False
+    def lookup_build_id(self):
+        """查询 build-id：已提取时显示对应的包，否则在仓库索引中查找需要下载的符号包"""
+        build_id = simpledialog.askstring("按 Build ID 查找", "请输入 Build ID:", parent=self.root)
+        if not build_id or not build_id.strip():
+            return
+        build_id = build_id.strip().lower()
+        
+        entry = DebugStore().lookup(build_id)
+        if entry:
+            messagebox.showinfo("按 Build ID 查找",
+                                f"已在调试符号仓库中:\n{entry['package']} {entry['version']} ({entry['arch']})\n{entry['path']}")
+            return
+        
+        packages = list(self.package_data)
+        sources = split_sources(self.source_url.get())
+        
+        def lookup_task():
+            try:
+                self.message_queue.put(("progress", "start"))
+                log = lambda m: self.message_queue.put(("log", m))
+                apply_source_indexes(packages, sources, log=log)
+                matches = find_build_id_packages(packages, build_id)
+                if matches:
+                    for pkg in matches:
+                        self.message_queue.put(("log", f"[符号] {build_id} 由 {pkg.get('full_filename', pkg['name'])} 提供，请下载后提取"))
+                else:
+                    self.message_queue.put(("log", f"[符号] 当前源的索引中没有找到 {build_id}"))
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 查找 Build ID 出错: {str(e)}"))
+            finally:
+                self.message_queue.put(("progress", "stop"))
+        
+        threading.Thread(target=lookup_task, daemon=True).start()
     
     def delete_selected(self):
         """删除选中的包"""
-        selected_packages = []
-        for pkg in self.package_data:
-            # 使用唯一标识符检查选中状态
-            unique_key = f"{pkg['name']}_{pkg.get('arch', '')}"
-            if self.package_vars.get(unique_key, tk.BooleanVar(value=False)).get():
-                selected_packages.append(pkg)
+        # 使用唯一标识符检查选中状态
+        selected_packages = [pkg for pkg in self.package_data if self.is_package_checked(pkg)]
         
         if not selected_packages:
             messagebox.showwarning("警告", "请至少选择一个包进行删除")
@@ -1323,6 +3996,7 @@ class DebPackageSaver:
                 self.message_queue.put(("refresh_table",))
                 self.message_queue.put(("log", f"[完成] 删除完成: 成功 {success_count} 个，失败 {error_count} 个"))
                 self.message_queue.put(("status", "删除操作完成"))
+                self.update_repo_index()
                 
             except Exception as e:
                 self.message_queue.put(("log", f"[错误] 删除过程出错: {str(e)}"))
@@ -1331,6 +4005,53 @@ class DebPackageSaver:
         
         threading.Thread(target=delete_task, daemon=True).start()
     
+    def update_repo_index(self):
+        """开启了维护仓库索引时，增量更新保存目录的 Packages 和 Release，可在工作线程中调用"""
+        save_path = self.save_path.get()
+        if not self.maintain_repo_index.get() or not os.path.isdir(save_path):
+            return
+        with self.repo_lock:
+            try:
+                LocalRepository(save_path).update(log=lambda m: self.message_queue.put(("log", m)))
+            except Exception as e:
+                self.message_queue.put(("log", f"[错误] 更新仓库索引失败: {str(e)}"))
+    
+    def on_maintain_repo_index_changed(self):
+        """开启维护仓库索引时立即生成一次索引"""
+        if self.maintain_repo_index.get():
+            threading.Thread(target=self.update_repo_index, daemon=True).start()
+    
+    def on_serve_repo_changed(self):
+        """启动或停止本地仓库 HTTP 服务"""
+        if self.repo_server:
+            self.repo_server.stop()
+            self.repo_server = None
+            self.repo_url_label.config(text="")
+            self.log_message("[仓库] 已停止 HTTP 服务")
+        if not self.serve_repo.get():
+            return
+        
+        save_path = self.save_path.get()
+        if not os.path.isdir(save_path):
+            messagebox.showwarning("警告", "保存目录不存在")
+            self.serve_repo.set(False)
+            return
+        
+        # 提供服务前确保索引存在
+        if not self.maintain_repo_index.get():
+            self.maintain_repo_index.set(True)
+            self.on_maintain_repo_index_changed()
+        try:
+            self.repo_server = RepositoryServer(save_path)
+            url = self.repo_server.start()
+        except OSError as e:
+            self.repo_server = None
+            self.serve_repo.set(False)
+            self.log_message(f"[错误] 启动 HTTP 服务失败: {str(e)}")
+            return
+        self.repo_url_label.config(text=url)
+        self.log_message(f"[仓库] HTTP 服务已启动，其他机器可添加源: deb [trusted=yes] {url} ./")
+    
     def create_zip(self):
         """创建ZIP压缩包"""
         response = messagebox.askyesno(
@@ -1352,6 +4073,7 @@ class DebPackageSaver:
                 zip_filename = f"deb_packages_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
                 zip_path = os.path.join(save_path, zip_filename)
                 
+                import zipfile
                 with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                     for file in os.listdir(save_path):
                         if file.endswith('.deb'):
@@ -1404,8 +4126,25 @@ class DebPackageSaver:
                             self.arch_vars[arch].set(value)
                 if 'include_dbgsym' in config:
                     self.include_dbgsym.set(config['include_dbgsym'])
+                if 'latest_only' in config:
+                    self.latest_only.set(config['latest_only'])
+                if 'group_view' in config:
+                    self.group_view.set(config['group_view'])
+                if 'crawl_depth' in config:
+                    self.crawl_depth.set(config['crawl_depth'])
                 if 'show_log' in config:
                     self.show_log.set(config['show_log'])
+                if 'maintain_repo_index' in config:
+                    self.maintain_repo_index.set(config['maintain_repo_index'])
+                if 'preallocate_files' in config:
+                    self.preallocate_files.set(config['preallocate_files'])
+                if config.get('log_level') in LOG_LEVEL_CHOICES:
+                    self.log_level_name.set(config['log_level'])
+                    self.log_level = LOG_LEVEL_CHOICES[config['log_level']]
+                if config.get('log_to_file'):
+                    self.log_to_file.set(True)
+                    self.start_file_logging()
+                self.update_debug_logging()
                 if 'search_keyword' in config:
                     self.search_keyword.set(config['search_keyword'])
                 
@@ -1424,7 +4163,14 @@ class DebPackageSaver:
                 'save_path': self.save_path.get(),
                 'arch_vars': {arch: var.get() for arch, var in self.arch_vars.items()},
                 'include_dbgsym': self.include_dbgsym.get(),
+                'latest_only': self.latest_only.get(),
+                'group_view': self.group_view.get(),
+                'crawl_depth': self.crawl_depth.get(),
                 'show_log': self.show_log.get(),
+                'maintain_repo_index': self.maintain_repo_index.get(),
+                'preallocate_files': self.preallocate_files.get(),
+                'log_level': self.log_level_name.get(),
+                'log_to_file': self.log_to_file.get(),
                 'search_keyword': self.search_keyword.get()
             }
             
@@ -1439,15 +4185,112 @@ class DebPackageSaver:
     
     def log_message(self, message):
         """添加日志消息"""
+        self.log_messages([message])
+    
+    def log_messages(self, messages):
+        """批量添加日志消息，合并为一次文本插入
+        
+        所有级别的日志都写入缓冲，只在显示时按当前级别过滤，调低级别后可以看到之前的日志。
+        """
         timestamp = time.strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
+        visible = []
+        last_message = None
+        for message in messages:
+            level = LOG_LEVEL_TAGS.get(message[:4], logging.INFO)
+            if self.file_logger:
+                self.file_logger.log(level, message)
+            line = f"[{timestamp}] {message}\n"
+            self.log_buffer.append((level, line))
+            if level < self.log_level:
+                continue
+            visible.append(line)
+            last_message = message
+        
+        if not visible:
+            return
         
-        if hasattr(self, 'log_text') and self.log_text:
-            self.log_text.insert(tk.END, formatted_message)
+        if getattr(self, 'log_text', None) and self.show_log.get():
+            self.log_text.insert(tk.END, ''.join(visible))
+            self.log_widget_lines += len(visible)
+            self.trim_log_widget()
             self.log_text.see(tk.END)
         
         if hasattr(self, 'status_var') and self.status_var:
-            self.status_var.set(message)
+            self.status_var.set(last_message)
+    
+    def trim_log_widget(self):
+        """日志控件超出上限时，一次删除一整块最早的行"""
+        excess = self.log_widget_lines - self.LOG_BUFFER_LINES
+        if excess >= self.LOG_TRIM_CHUNK:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
+            self.log_widget_lines -= excess
+    
+    def render_log_buffer(self):
+        """按当前级别用缓冲内容重新填充日志控件"""
+        if not getattr(self, 'log_text', None):
+            return
+        lines = [line for level, line in self.log_buffer if level >= self.log_level]
+        self.log_text.delete('1.0', tk.END)
+        self.log_text.insert(tk.END, ''.join(lines))
+        self.log_widget_lines = len(lines)
+        self.log_text.see(tk.END)
+    
+    def on_log_level_changed(self):
+        """日志级别改变时的处理"""
+        self.log_level = LOG_LEVEL_CHOICES.get(self.log_level_name.get(), logging.INFO)
+        self.update_debug_logging()
+        if self.show_log.get():
+            self.render_log_buffer()
+        self.log_message(f"[界面] 日志级别: {self.log_level_name.get()}")
+    
+    def on_log_to_file_changed(self):
+        """日志文件选项改变时的处理"""
+        if self.log_to_file.get():
+            self.start_file_logging()
+        else:
+            self.stop_file_logging()
+        self.update_debug_logging()
+    
+    def update_debug_logging(self):
+        """只有界面或日志文件需要调试信息时才让引擎生成调试日志"""
+        if self.log_level <= logging.DEBUG or self.file_logger:
+            self.engine.debug = lambda message: self.message_queue.put(("log", message))
+        else:
+            self.engine.debug = None
+    
+    def start_file_logging(self):
+        """启动异步轮转日志文件，完整记录所有级别的日志"""
+        if self.file_logger:
+            return
+        import logging.handlers
+        try:
+            handler = logging.handlers.RotatingFileHandler(
+                self.log_file, maxBytes=self.LOG_FILE_MAX_BYTES,
+                backupCount=self.LOG_FILE_BACKUP_COUNT, encoding='utf-8')
+        except OSError as e:
+            self.log_message(f"[错误] 打开日志文件失败: {str(e)}")
+            self.log_to_file.set(False)
+            return
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        # 写文件放到监听线程中，界面线程只负责入队
+        log_queue = queue.SimpleQueue()
+        self.file_log_listener = logging.handlers.QueueListener(log_queue, handler)
+        self.file_log_listener.start()
+        
+        self.file_logger = logging.getLogger('deb-saver')
+        self.file_logger.setLevel(logging.DEBUG)
+        self.file_logger.propagate = False
+        self.file_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+        self.log_message(f"[界面] 日志写入文件: {self.log_file}")
+    
+    def stop_file_logging(self):
+        """停止日志文件写入"""
+        if not self.file_logger:
+            return
+        self.file_logger.handlers = []
+        self.file_logger = None
+        self.file_log_listener.stop()
+        self.file_log_listener = None
     
     def _bind_all_scroll_events(self):
         """绑定所有滚动区域的鼠标事件"""
@@ -1462,34 +4305,105 @@ class DebPackageSaver:
                 pass
     
     def process_queue(self):
-        """处理消息队列"""
+        """处理消息队列
+        
+        每次只在时间预算内取消息，避免大批量下载时界面卡顿：
+        连续的日志合并为一次插入，状态和刷新类消息只保留最后一次。
+        """
+        deadline = time.perf_counter() + self.QUEUE_TIME_BUDGET
+        pending_logs = []
+        pending_status = None
+        # 待执行的表格更新: None / "refresh" / "search"，搜索本身会刷新表格
+        pending_view = None
+        
+        def flush():
+            nonlocal pending_logs, pending_status, pending_view
+            if pending_logs:
+                self.log_messages(pending_logs)
+                pending_logs = []
+            if pending_status is not None:
+                self.status_var.set(pending_status)
+                pending_status = None
+            if pending_view == "search":
+                self.search_packages()
+            elif pending_view == "refresh":
+                self.refresh_table_data()
+            pending_view = None
+        
+        drained = True
         try:
             while True:
+                if time.perf_counter() >= deadline:
+                    drained = False
+                    break
                 message = self.message_queue.get_nowait()
                 
                 if message[0] == "log":
-                    self.log_message(message[1])
+                    pending_logs.append(message[1])
+                    # 日志会同时更新状态栏，之前的状态消息已被覆盖
+                    pending_status = None
                 elif message[0] == "status":
-                    self.status_var.set(message[1])
-                elif message[0] == "progress":
-                    if message[1] == "start":
-                        self.progress.start()
-                    else:
-                        self.progress.stop()
+                    pending_status = message[1]
                 elif message[0] == "update_packages":
                     self.package_data = message[1]
+                    self.dependency_graph = None
                     # 更新包数据后，自动执行搜索过滤
-                    self.search_packages()
+                    pending_view = "search"
                 elif message[0] == "refresh_table":
-                    self.refresh_table_data()
+                    if pending_view is None:
+                        pending_view = "refresh"
                 elif message[0] == "auto_search":
-                    self.search_packages()
+                    pending_view = "search"
+                else:
+                    # 其余消息按顺序处理，先应用之前积累的日志和表格更新
+                    flush()
+                    if message[0] == "progress":
+                        if message[1] == "start":
+                            self.progress.start()
+                        else:
+                            self.progress.stop()
+                    elif message[0] == "depends_resolved":
+                        self.apply_depends_selection(message[1])
+                    elif message[0] == "sync_planned":
+                        self.confirm_sync(message[1])
+                    elif message[0] == "source_diff":
+                        self.show_source_diff(*message[1:])
+                    elif message[0] == "verify_done":
+                        self.mark_corrupt_packages(*message[1:])
+                    elif message[0] == "download_preflight":
+                        self.confirm_download(*message[1:])
+                    elif message[0] == "install_status":
+                        for item in self.selection.items_for_keys([message[1]]):
+                            self.package_tree.set(item, 'install_status', message[2])
                     
         except queue.Empty:
             pass
         
-        # 每100ms检查一次消息队列
-        self.root.after(100, self.process_queue)
+        flush()
+        
+        # 队列未处理完时尽快继续，否则每100ms检查一次消息队列
+        self.root.after(self.QUEUE_BUSY_INTERVAL if not drained else self.QUEUE_POLL_INTERVAL,
+                        self.process_queue)
+    
+    def report_startup_time(self, marks):
+        """窗口首次绘制完成后记录冷启动各阶段耗时，marks 为 [(阶段, 完成时间), ...]"""
+        self.root.update_idletasks()
+        marks = marks + [('首次绘制', time.perf_counter())]
+        
+        phases = []
+        previous = START_TIME
+        for name, timestamp in marks:
+            phases.append(f"{name} {(timestamp - previous) * 1000:.0f} ms")
+            previous = timestamp
+        total = previous - START_TIME
+        
+        # 启动脚本传入的时间戳还包含解释器启动和依赖检查的耗时
+        launch_ns = os.environ.get('DEB_SAVER_LAUNCH_NS', '')
+        if launch_ns.isdigit():
+            total = max(total, (time.time_ns() - int(launch_ns)) / 1e9)
+        
+        tag = "[警告]" if total > COLD_START_BUDGET else "[启动]"
+        self.log_message(f"{tag} 冷启动耗时 {total * 1000:.0f} ms（{'，'.join(phases)}）")
     
     def on_closing(self):
         """程序退出时的清理操作"""
@@ -1501,6 +4415,13 @@ class DebPackageSaver:
             if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
                 self.log_message(f"[清理] 已清理临时目录: {self.temp_dir}")
+            
+            # 停止本地仓库服务
+            if self.repo_server:
+                self.repo_server.stop()
+            
+            # 等待日志文件写完
+            self.stop_file_logging()
                 
         except Exception as e:
             # 静默处理，避免影响程序退出
@@ -1510,9 +4431,452 @@ class DebPackageSaver:
         self.root.destroy()
 
 
+# 命令行模式退出码
+EXIT_OK = 0
+EXIT_PARTIAL_FAILURE = 1
+EXIT_NO_PACKAGES = 3
+EXIT_NO_SPACE = 4
+
+# 命令行模式的子命令；第一个参数不是这些命令时（例如文件管理器传入的当前目录）启动图形界面
+CLI_COMMANDS = ('list', 'download', 'sync', 'diff', 'extract-dbgsym', 'repo', 'verify', 'build-id')
+
+
+def import_tkinter():
+    """按需导入 tkinter"""
+    global tk, ttk, filedialog, messagebox, scrolledtext, simpledialog
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
+
+
+def package_to_json(pkg):
+    """将包数据转换为命令行 JSON 输出格式"""
+    return {
+        'name': pkg['name'],
+        'arch': pkg.get('arch', ''),
+        'version': pkg.get('version', ''),
+        'filename': pkg.get('full_filename', ''),
+        'url': pkg.get('url') or pkg.get('source_path', ''),
+        'size': pkg.get('size'),
+        'status': pkg.get('status', ''),
+        'install_status': pkg.get('install_status', ''),
+        'source': pkg.get('source', ''),
+    }
+
+
+def build_cli_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog='deb-saver.py',
+        description='DEB包保存器命令行模式：无需图形界面即可列出、过滤和下载DEB包',
+        epilog=f'退出码: {EXIT_OK} 成功，{EXIT_PARTIAL_FAILURE} 部分包下载失败，'
+               f'2 参数错误，{EXIT_NO_PACKAGES} 没有匹配的包，{EXIT_NO_SPACE} 磁盘空间不足')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('sources', nargs='+', metavar='source',
+                        help='下载源：网络URL或本地目录，可指定多个，靠前的优先')
+    common.add_argument('-a', '--arch', action='append', default=[],
+                        help='架构，可重复或用逗号分隔，如 -a arm64,loong64；不指定时包含所有架构')
+    common.add_argument('-k', '--keyword', default='', help='按包名、架构或版本过滤的关键字，以 * 结尾时按包名前缀匹配')
+    common.add_argument('--dbgsym', action='store_true', help='包含符号包')
+    common.add_argument('--dbgsym-only', action='store_true', help='只保留符号包')
+    common.add_argument('--latest', action='store_true', help='每个包只保留最新版本')
+    common.add_argument('--cached', action='store_true', help='使用本地包目录中上次获取的列表，不访问下载源')
+    common.add_argument('--depth', type=int, default=0,
+                        help='网络源递归抓取子目录的层数（默认 0，只读取源地址这一页）')
+    common.add_argument('--json', action='store_true', help='以 JSON 格式输出结果')
+    common.add_argument('-q', '--quiet', action='store_true', help='不输出过程日志')
+    common.add_argument('-v', '--verbose', action='store_true', help='输出调试日志')
+    
+    subparsers.add_parser('list', parents=[common], help='列出匹配的包')
+    
+    download_parser = subparsers.add_parser('download', parents=[common], help='下载匹配的包')
+    download_parser.add_argument('-o', '--output', required=True, help='本地保存目录')
+    download_parser.add_argument('-j', '--jobs', type=int, default=5, help='并发下载数（默认 5）')
+    download_parser.add_argument('--with-depends', action='store_true', help='同时下载源内的依赖闭包')
+    download_parser.add_argument('--dry-run', action='store_true', help='只显示将要下载的包')
+    download_parser.add_argument('--retries', type=int, default=TRANSFER_RETRIES,
+                                 help=f'每个包遇到临时网络错误时的重试次数（默认 {TRANSFER_RETRIES}）')
+    download_parser.add_argument('--preallocate', action='store_true', help='按包大小预分配文件空间')
+    download_parser.add_argument('--force', action='store_true', help='磁盘空间不足时仍然下载')
+    download_parser.add_argument('--install', action='store_true',
+                                 help='边下载边通过 pkexec 安装，包的依赖都到齐后立即安装')
+    
+    sync_parser = subparsers.add_parser('sync', parents=[common], help='增量同步匹配的包到本地目录')
+    sync_parser.add_argument('-o', '--output', required=True, help='本地镜像目录')
+    sync_parser.add_argument('-j', '--jobs', type=int, default=5, help='并发下载数（默认 5）')
+    sync_parser.add_argument('--prune', action='store_true', help='删除本地目录中不在列表里的包')
+    sync_parser.add_argument('--dry-run', action='store_true', help='只显示同步差异，不做修改')
+    
+    subparsers.add_parser('diff', parents=[common],
+                          help='比较两个源（旧的在前），按架构列出新增、删除和版本变化的包')
+    
+    dbgsym_parser = subparsers.add_parser('extract-dbgsym', parents=[common],
+                                          help='下载匹配的符号包并提取到按 build-id 组织的调试符号仓库')
+    dbgsym_parser.add_argument('-o', '--output', required=True, help='符号包下载目录')
+    dbgsym_parser.add_argument('-j', '--jobs', type=int, default=4, help='并发数（默认 4）')
+    dbgsym_parser.add_argument('--store', default=DEBUG_STORE_DIR, help=f'调试符号仓库目录（默认 {DEBUG_STORE_DIR}）')
+    
+    repo_parser = subparsers.add_parser('repo', help='将目录维护为 apt 仓库（增量更新 Packages 和 Release）')
+    repo_parser.add_argument('directory', help='存放 .deb 的目录')
+    repo_parser.add_argument('--serve', action='store_true', help='更新索引后通过 HTTP 提供仓库，按 Ctrl+C 退出')
+    repo_parser.add_argument('--port', type=int, default=REPO_SERVER_PORT, help=f'HTTP 端口（默认 {REPO_SERVER_PORT}）')
+    repo_parser.add_argument('--watch', type=float, default=0, metavar='SECONDS',
+                             help='提供服务期间每隔若干秒检查目录变化并更新索引')
+    repo_parser.add_argument('-q', '--quiet', action='store_true', help='不输出过程日志')
+    
+    verify_parser = subparsers.add_parser('verify', help='校验目录中的 .deb 文件是否完整')
+    verify_parser.add_argument('directory', help='存放 .deb 的目录')
+    verify_parser.add_argument('sources', nargs='*', metavar='source',
+                               help='可选的下载源，用其 Packages 索引中的大小比较文件大小')
+    verify_parser.add_argument('-j', '--jobs', type=int, default=8, help='并发校验数（默认 8）')
+    verify_parser.add_argument('--json', action='store_true', help='以 JSON 格式输出结果')
+    verify_parser.add_argument('-q', '--quiet', action='store_true', help='不输出过程日志')
+    
+    build_id_parser = subparsers.add_parser('build-id', help='查询 build-id 对应的包')
+    build_id_parser.add_argument('build_id', help='要查询的 build-id')
+    build_id_parser.add_argument('sources', nargs='*', metavar='source',
+                                 help='调试符号仓库中没有时，在这些源的 Packages 索引中查找')
+    build_id_parser.add_argument('--store', default=DEBUG_STORE_DIR, help=f'调试符号仓库目录（默认 {DEBUG_STORE_DIR}）')
+    build_id_parser.add_argument('--json', action='store_true', help='以 JSON 格式输出结果')
+    build_id_parser.add_argument('-q', '--quiet', action='store_true', help='不输出过程日志')
+    
+    return parser
+
+
+def run_cli_repo(args, log):
+    """命令行 repo 子命令"""
+    if not os.path.isdir(args.directory):
+        log(f"[错误] 目录不存在: {args.directory}")
+        return EXIT_NO_PACKAGES
+    repository = LocalRepository(args.directory)
+    _, _, total = repository.update(log=log)
+    print(f"仓库索引已更新，共 {total} 个包")
+    if not args.serve:
+        return EXIT_OK
+    
+    server = RepositoryServer(args.directory, port=args.port)
+    url = server.start()
+    print(f"deb [trusted=yes] {url} ./")
+    try:
+        while True:
+            time.sleep(args.watch or 3600)
+            if args.watch:
+                repository.update(log=log)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return EXIT_OK
+
+
+def run_cli_verify(args, log):
+    """命令行 verify 子命令：校验目录中的 .deb 文件，有损坏时返回部分失败"""
+    if not os.path.isdir(args.directory):
+        log(f"[错误] 目录不存在: {args.directory}")
+        return EXIT_NO_PACKAGES
+    engine = PackageEngine(log=log, allow_mock=False)
+    packages = []
+    sources = [source.strip() for source in args.sources if source.strip()]
+    if sources:
+        packages = engine.list_sources(sources)
+        apply_source_indexes(packages, sources, log=log)
+    
+    start_time = time.perf_counter()
+    total, corrupt = engine.verify_save_path(args.directory, packages, max_workers=max(1, args.jobs))
+    log(f"[校验] 校验了 {total} 个文件，耗时 {time.perf_counter() - start_time:.2f} 秒，损坏 {len(corrupt)} 个")
+    
+    if args.json:
+        print(json.dumps({'directory': os.path.abspath(args.directory), 'checked': total, 'corrupt': corrupt},
+                         ensure_ascii=False, indent=2))
+    else:
+        for filename, reason in sorted(corrupt.items()):
+            print(f"{filename}: {reason}")
+    return EXIT_PARTIAL_FAILURE if corrupt else EXIT_OK
+
+
+def run_cli_build_id(args, log):
+    """命令行 build-id 子命令：先查调试符号仓库，再查源的 Packages 索引"""
+    build_id = args.build_id.strip().lower()
+    entry = DebugStore(args.store).lookup(build_id)
+    matches = []
+    if entry is None:
+        engine = PackageEngine(log=log, allow_mock=False)
+        sources = [source.strip() for source in args.sources if source.strip()]
+        packages = engine.list_sources(sources) if sources else []
+        apply_source_indexes(packages, sources, log=log)
+        matches = find_build_id_packages(packages, build_id)
+    
+    if args.json:
+        print(json.dumps({'build_id': build_id, 'store': entry,
+                          'packages': [package_to_json(pkg) for pkg in matches]},
+                         ensure_ascii=False, indent=2))
+    elif entry:
+        print(f"{entry['package']} {entry['version']} {entry['arch']} {entry['path']}")
+    else:
+        for pkg in matches:
+            print(pkg.get('url') or pkg.get('source_path') or pkg.get('full_filename', pkg['name']))
+    return EXIT_OK if entry or matches else EXIT_NO_PACKAGES
+
+
+def run_cli_extract_dbgsym(engine, packages, source, save_path, args, log):
+    """命令行 extract-dbgsym 子命令：下载尚未下载的符号包后提取"""
+    missing = [pkg for pkg in packages if not engine.local_package_path(pkg, save_path)]
+    error_count = 0
+    if missing:
+        _, error_count = engine.download_packages(missing, save_path, source, max_workers=max(1, args.jobs))
+    
+    items = [(engine.local_package_path(pkg, save_path), pkg) for pkg in packages]
+    items = [(deb_path, pkg) for deb_path, pkg in items if deb_path]
+    store = DebugStore(args.store)
+    success_count, extract_errors, id_count = store.extract_packages(items, max_workers=max(1, args.jobs), log=log)
+    error_count += extract_errors
+    
+    if args.json:
+        print(json.dumps({'store': os.path.abspath(store.root), 'success': success_count,
+                          'failed': error_count, 'build_ids': id_count}, ensure_ascii=False, indent=2))
+    else:
+        print(f"提取完成: 成功 {success_count} 个，失败 {error_count} 个，共 {id_count} 个 build-id")
+        print(f"gdb: set debug-file-directory {os.path.abspath(store.root)}:/usr/lib/debug")
+    return EXIT_PARTIAL_FAILURE if error_count else EXIT_OK
+
+
+def select_cli_packages(engine, packages, args):
+    """按命令行参数过滤包"""
+    archs = [arch.strip() for value in args.arch for arch in value.split(',') if arch.strip()]
+    if not archs:
+        archs = sorted({pkg.get('arch', '') for pkg in packages})
+    selected = engine.filter_packages(packages, archs, args.dbgsym or args.dbgsym_only)
+    if args.latest:
+        selected = latest_packages(selected)
+    selected = engine.search_packages(selected, args.keyword)
+    if args.dbgsym_only:
+        selected = [pkg for pkg in selected if 'dbgsym' in pkg['name']]
+    return selected, archs
+
+
+def run_cli_sync(engine, packages, sources, save_path, args, log, listing=None, failed_sources=()):
+    """命令行 sync 子命令
+    
+    --prune 按未经过滤的远程列表 listing 判断本地多余的包，只删除当前过滤条件覆盖的文件；
+    有源获取失败或只得到模拟数据时不删除任何文件。
+    """
+    apply_source_indexes(packages, sources, log=log)
+    prune = args.prune
+    if prune and (failed_sources or any(pkg.get('mock') for pkg in listing or packages)):
+        log(f"[警告] 源获取失败，本次不删除本地多余的包: {', '.join(failed_sources) or '模拟数据'}")
+        prune = False
+    
+    def covers(pkg):
+        return bool(select_cli_packages(engine, [pkg], args)[0])
+    
+    plan = engine.plan_sync(packages, save_path, prune=prune, listing=listing, covers=covers)
+    log(f"[同步] 新增 {len(plan['new'])} 个，变化 {len(plan['changed'])} 个，"
+        f"未变化 {len(plan['unchanged'])} 个，本地多余 {len(plan['removed'])} 个")
+    
+    result = {
+        'output': os.path.abspath(save_path),
+        'new': [package_to_json(pkg) for pkg in plan['new']],
+        'changed': [package_to_json(pkg) for pkg in plan['changed']],
+        'unchanged': len(plan['unchanged']),
+        'removed': plan['removed'],
+        'dry_run': args.dry_run,
+    }
+    error_count = 0
+    if not args.dry_run:
+        os.makedirs(save_path, exist_ok=True)
+        success_count, error_count, removed_count = engine.apply_sync(
+            plan, save_path, max_workers=max(1, args.jobs))
+        result.update({'success': success_count, 'failed': error_count})
+    
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif args.dry_run:
+        for pkg in plan['new']:
+            print(f"+ {engine.get_target_filename(pkg)}")
+        for pkg in plan['changed']:
+            print(f"* {engine.get_target_filename(pkg)}")
+        for filename in plan['removed']:
+            print(f"- {filename}")
+    else:
+        print(f"同步完成: 下载 {result['success']} 个，失败 {error_count} 个，删除 {len(plan['removed'])} 个")
+    return EXIT_PARTIAL_FAILURE if error_count else EXIT_OK
+
+
+def run_cli_diff(engine, catalog, sources, args, log):
+    """命令行 diff 子命令：比较两个源，按架构列出新增、删除和版本变化的包
+    
+    任一个源获取失败或没有包时报错退出，避免把获取失败显示成整个源的包都被删除或新增；
+    --cached 从本地包目录读取时，查询结果为空是正常的。
+    """
+    def list_one(source):
+        if args.cached and catalog:
+            return catalog.load_sources([source], args.keyword), []
+        failed = []
+        return engine.list_sources([source], failed=failed), failed
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        (old_packages, old_failed), (new_packages, new_failed) = executor.map(list_one, sources)
+    if not (args.cached and catalog):
+        for source, failed in ((sources[0], old_failed), (sources[1], new_failed)):
+            if failed:
+                print(f"[错误] 无法获取源的包列表: {source}", file=sys.stderr)
+        if old_failed or new_failed:
+            return EXIT_NO_PACKAGES
+    old_selected, _ = select_cli_packages(engine, old_packages, args)
+    new_selected, _ = select_cli_packages(engine, new_packages, args)
+    
+    start_time = time.perf_counter()
+    entries = diff_package_lists(old_selected, new_selected)
+    elapsed = (time.perf_counter() - start_time) * 1000
+    summary = summarize_diff(entries)
+    log(f"[比较] {len(old_selected)} 个包与 {len(new_selected)} 个包比较完成，耗时 {elapsed:.1f} ms")
+    for arch, counts in summary.items():
+        log(f"[比较] {arch or '无架构'}: 新增 {counts['added']}，删除 {counts['removed']}，版本变化 {counts['changed']}")
+    
+    if args.json:
+        print(json.dumps({'old': sources[0], 'new': sources[1], 'summary': summary, 'changes': entries},
+                         ensure_ascii=False, indent=2))
+    else:
+        marks = {'added': '+', 'removed': '-', 'changed': '*'}
+        for entry in entries:
+            versions = ' -> '.join(v for v in (entry['old_version'], entry['new_version']) if v)
+            print(f"{marks[entry['change']]} {entry['name']} {entry['arch']} {versions}")
+    return EXIT_OK
+
+
+def run_cli(argv):
+    """命令行模式入口，返回退出码"""
+    args = build_cli_parser().parse_args(argv)
+    
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+    
+    if args.command == 'build-id':
+        return run_cli_build_id(args, log)
+    if args.command == 'repo':
+        return run_cli_repo(args, log)
+    if args.command == 'verify':
+        return run_cli_verify(args, log)
+    
+    def debug(message):
+        if args.verbose:
+            print(message, file=sys.stderr)
+    
+    try:
+        catalog = PackageCatalog()
+    except sqlite3.Error as e:
+        catalog = None
+        log(f"[警告] 无法打开本地包目录: {str(e)}")
+    
+    engine = PackageEngine(log=log, status=debug, debug=debug if args.verbose else None,
+                           allow_mock=False, catalog=catalog)
+    engine.crawl_depth = max(0, args.depth)
+    sources = [source.strip() for source in args.sources if source.strip()]
+    source = sources[0]
+    save_path = getattr(args, 'output', '')
+    if args.command == 'diff':
+        if len(sources) != 2:
+            print("diff 需要指定两个源：旧的源和新的源", file=sys.stderr)
+            return 2
+        return run_cli_diff(engine, catalog, sources, args, log)
+    failed_sources = []
+    if args.cached and catalog:
+        # 关键字条件直接在数据库中查询
+        packages = catalog.load_sources(sources, args.keyword)
+    else:
+        packages = engine.list_sources(sources, save_path, failed=failed_sources)
+    if args.command == 'extract-dbgsym':
+        args.dbgsym_only = True
+    selected, archs = select_cli_packages(engine, packages, args)
+    
+    if args.command == 'download' and args.with_depends and selected:
+        apply_source_indexes(packages, sources, log=log)
+        positions = {id(pkg): i for i, pkg in enumerate(packages)}
+        closure = DependencyGraph(packages).closure([positions[id(pkg)] for pkg in selected], archs)
+        selected = [packages[i] for i in sorted(closure)]
+    
+    log(f"[信息] 共 {len(packages)} 个包，匹配 {len(selected)} 个")
+    if not selected:
+        if args.json:
+            print(json.dumps({'packages': [], 'error': '没有匹配的包'}, ensure_ascii=False))
+        return EXIT_NO_PACKAGES
+    
+    if args.command == 'sync':
+        return run_cli_sync(engine, selected, sources, save_path, args, log,
+                            listing=packages, failed_sources=failed_sources)
+    if args.command == 'extract-dbgsym':
+        return run_cli_extract_dbgsym(engine, selected, source, save_path, args, log)
+    
+    if args.command == 'list' or args.dry_run:
+        if args.json:
+            print(json.dumps({'packages': [package_to_json(pkg) for pkg in selected]},
+                             ensure_ascii=False, indent=2))
+        else:
+            for pkg in selected:
+                print(pkg.get('full_filename', pkg['name']))
+        return EXIT_OK
+    
+    failed = []
+    
+    def on_result(pkg, success, error):
+        if success:
+            log(f"[成功] {pkg['name']} 下载完成")
+        else:
+            failed.append(pkg)
+            log(f"[失败] {pkg['name']} 下载失败{': ' + str(error) if error else ''}")
+    
+    # 统计下载大小并检查可用空间，仓库索引中有大小时无需发送 HEAD 请求
+    apply_source_indexes(selected, sources, log=log if args.install else None)
+    total, unknown = engine.estimate_sizes(selected, max_workers=max(1, args.jobs))
+    free = engine.free_disk_space(save_path)
+    log(f"[下载] 约 {format_size(total)}{f'（{unknown} 个包大小未知）' if unknown else ''}，可用空间 {format_size(free)}")
+    if total + DISK_SPACE_RESERVE > free and not args.force:
+        log("[错误] 磁盘空间不足，使用 --force 仍然下载")
+        return EXIT_NO_SPACE
+    engine.preallocate = args.preallocate
+    engine.transfer_policy.defaults['retries'] = max(0, args.retries)
+    
+    install_failed = 0
+    if args.install:
+        def on_install(pkg, status):
+            if status in ('已安装', '安装失败', '依赖缺失'):
+                log(f"[安装] {pkg['name']} {status}")
+        
+        success_count, error_count, _, install_failed = engine.download_and_install(
+            selected, save_path, source, max_workers=max(1, args.jobs),
+            on_result=on_result, on_install=on_install)
+    else:
+        success_count, error_count = engine.download_packages(
+            selected, save_path, source, max_workers=max(1, args.jobs), on_result=on_result)
+    
+    if args.json:
+        print(json.dumps({
+            'output': os.path.abspath(save_path),
+            'success': success_count,
+            'failed': error_count,
+            'packages': [package_to_json(pkg) for pkg in selected],
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"下载完成: 成功 {success_count} 个，失败 {error_count} 个，保存到 {save_path}")
+    return EXIT_PARTIAL_FAILURE if error_count or install_failed else EXIT_OK
+
+
 def main():
+    # 第一个参数是子命令或帮助选项时进入命令行模式，不导入 tkinter
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS + ('-h', '--help'):
+        sys.exit(run_cli(sys.argv[1:]))
+    
+    marks = [('导入模块', time.perf_counter())]
+    import_tkinter()
     root = tk.Tk()
+    marks.append(('初始化 Tk', time.perf_counter()))
     app = DebPackageSaver(root)
+    marks.append(('创建界面', time.perf_counter()))
+    
+    # 窗口绘制完成后统计冷启动耗时
+    root.after_idle(app.report_startup_time, marks)
     
     # 绑定窗口关闭事件
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
@@ -282,6 +282,7 @@ class ProjectConfig:
     # 配置常量
     UPDATE_INTERVAL_DAYS = 3
     SSHFS_HISTORY_MAX_COUNT = 20
+    BRANCH_CACHE_TTL_HOURS = 12
     
     # UI样式配置
     class UIStyle:
@@ -352,18 +353,55 @@ class ProjectConfig:
         """文件名配置类"""
         CACHE_LAST_UPDATE = "last_update.json"
         CACHE_SSHFS_HISTORY = "sshfs_history.json"
+        CACHE_BRANCHES = "branches.json"
         CONFIG_MAIN = ".deepin_project_downloader.json"
     
     # 路径配置
     class Path:
         """路径配置类"""
         CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "deepin-project-downloader")
+        MIRROR_DIR = os.path.join(CACHE_DIR, "mirrors")
         CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".deepin_project_downloader.json")
     
     # 线程池配置
     class ThreadPool:
         """线程池配置类"""
         MAX_WORKERS = 10
+        BRANCH_QUERY_WORKERS = 16
+    
+    # 克隆方式配置
+    class CloneMode:
+        """克隆方式配置类"""
+        FULL = "full"
+        SHALLOW = "shallow"
+        PARTIAL = "partial"
+        SINGLE_BRANCH = "single-branch"
+        DEFAULT = FULL
+        DEFAULT_DEPTH = 1
+        MAX_DEPTH = 10000
+        
+        # 下拉框显示名称（按显示顺序）
+        LABELS = {
+            FULL: "完整克隆",
+            SHALLOW: "浅克隆",
+            PARTIAL: "无blob克隆",
+            SINGLE_BRANCH: "单分支克隆"
+        }
+    
+    # 已下载项目的更新策略配置
+    class UpdatePolicy:
+        """更新策略配置类"""
+        FAST_FORWARD = "ff-only"
+        HARD_RESET = "reset"
+        RECLONE = "reclone"
+        DEFAULT = FAST_FORWARD
+        
+        # 下拉框显示名称（按显示顺序）
+        LABELS = {
+            FAST_FORWARD: "增量更新(仅快进)",
+            HARD_RESET: "增量更新(强制重置)",
+            RECLONE: "删除后重新克隆"
+        }
     
     # 系统命令配置
     class SystemCommand:
@@ -432,6 +470,12 @@ class ProjectConfig:
   "save_path": "/home/user/debug",
   "source": "gitee",
   "branches": {},
+  "clone_modes": {
+    "qt6-base": "shallow"
+  },
+  "clone_depth": 1,
+  "mirror_cache": false,
+  "update_policy": "ff-only",
   "sshfs": {
     "host": "",
     "username": "",
@@ -453,6 +497,13 @@ class ProjectConfig:
 • 项目必须包含 gitee 和 github 两个源地址
 • 项目名称不能与内置项目重复
 • 扩展配置会在程序启动时自动加载
+• clone_modes 可选值: full(完整克隆), shallow(浅克隆, 深度由 clone_depth 决定),
+  partial(--filter=blob:none), single-branch(只克隆所选分支)
+• mirror_cache 为 true 时在 ~/.cache/deepin-project-downloader/mirrors 中为每个仓库地址
+  维护一个裸镜像，克隆时通过 --reference --dissociate 复用其中的对象；每个镜像都是
+  完整仓库，会额外占用与项目历史相当的磁盘空间，默认 false
+• update_policy 决定已下载项目的更新方式: ff-only(只快进), reset(重置到远程分支),
+  reclone(删除后重新克隆)
 """
     
     # 网络配置
@@ -686,6 +737,13 @@ class DeepinProjectDownloader:
         self.update_interval_days = ProjectConfig.UPDATE_INTERVAL_DAYS  # 更新间隔：3天
         self.init_cache_directory()
         
+        # 分支列表缓存（键为 "源 仓库地址"）
+        self.branch_cache_file = os.path.join(self.cache_dir, ProjectConfig.FileName.CACHE_BRANCHES)
+        self.branch_cache_ttl = ProjectConfig.BRANCH_CACHE_TTL_HOURS * 60 * 60
+        self.branch_cache_lock = threading.Lock()
+        # 在加载配置后读取，加载消息和配置消息一起显示
+        self.branch_cache = {}
+        
         # SSHFS历史记录
         self.sshfs_history_file = os.path.join(self.cache_dir, ProjectConfig.FileName.CACHE_SSHFS_HISTORY)
         self.sshfs_history = []  # 存储所有历史记录
@@ -716,6 +774,22 @@ class DeepinProjectDownloader:
         # 分支选择框字典
         self.branch_combos = {}
         
+        # 克隆方式变量字典和选择框字典
+        self.clone_mode_vars = {}
+        self.clone_mode_combos = {}
+        self.saved_clone_modes = {}
+        
+        # 浅克隆深度
+        self.clone_depth_var = tk.IntVar(value=ProjectConfig.CloneMode.DEFAULT_DEPTH)
+        
+        # 本地镜像缓存开关，以及每个镜像的更新锁
+        self.mirror_cache_var = tk.BooleanVar(value=False)
+        self.mirror_locks = {}
+        self.mirror_locks_lock = threading.Lock()
+        
+        # 已下载项目的更新策略
+        self.update_policy_var = tk.StringVar(value=ProjectConfig.UpdatePolicy.LABELS[ProjectConfig.UpdatePolicy.DEFAULT])
+        
         # 软件包选择变量字典
         self.package_vars = {}
         
@@ -765,6 +839,7 @@ class DeepinProjectDownloader:
         
         # 加载配置
         self.load_config()
+        self.branch_cache = self.load_branch_cache()
         
         # 更新所有项目的状态显示（在配置加载后）
         self.root.after(100, self.refresh_all_project_status)
@@ -977,6 +1052,50 @@ class DeepinProjectDownloader:
         except Exception as e:
             self.log_message(f"[缓存] 更新缓存时间戳失败: {str(e)}")
     
+    def load_branch_cache(self):
+        """加载分支列表缓存（在 load_config 之后调用，消息追加到初始化消息中）"""
+        try:
+            if os.path.exists(self.branch_cache_file):
+                with open(self.branch_cache_file, 'r', encoding='utf-8') as f:
+                    entries = json.load(f).get('entries', {})
+                self.init_messages.append(f"[缓存] 已加载 {len(entries)} 条分支列表缓存")
+                return entries
+        except Exception as e:
+            self.init_messages.append(f"[缓存] 加载分支列表缓存失败: {str(e)}")
+        return {}
+    
+    def save_branch_cache(self):
+        """保存分支列表缓存（先写临时文件再替换，避免写入中断损坏缓存）"""
+        try:
+            with self.branch_cache_lock:
+                data = {'entries': dict(self.branch_cache)}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_file = self.branch_cache_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.branch_cache_file)
+        except Exception as e:
+            self.log_message(f"[缓存] 保存分支列表缓存失败: {str(e)}")
+    
+    def get_branch_cache_key(self, source, repo_url):
+        """生成分支缓存的键（源 + 规范化后的仓库地址）"""
+        return f"{source} {self.normalize_repo_url(repo_url)}"
+    
+    def get_cached_branches(self, source, repo_url):
+        """获取缓存的分支列表，返回 (分支列表, 是否过期)，没有缓存时返回 None"""
+        with self.branch_cache_lock:
+            entry = self.branch_cache.get(self.get_branch_cache_key(source, repo_url))
+        if not entry or not isinstance(entry.get('branches'), list):
+            return None
+        expired = time.time() - entry.get('updated', 0) >= self.branch_cache_ttl
+        return entry['branches'], expired
+    
+    def store_cached_branches(self, source, repo_url, branches):
+        """更新缓存中的分支列表"""
+        key = self.get_branch_cache_key(source, repo_url)
+        with self.branch_cache_lock:
+            self.branch_cache[key] = {'branches': branches, 'updated': time.time()}
+    
     def setup_styles(self):
         """设置界面样式"""
         style = ttk.Style()
@@ -1103,6 +1222,10 @@ class DeepinProjectDownloader:
         for project_name, combo in self.branch_combos.items():
             combo.config(state="readonly" if enabled else "disabled")
         
+        # 设置克隆方式combobox状态
+        for project_name, combo in self.clone_mode_combos.items():
+            combo.config(state="readonly" if enabled else "disabled")
+        
         # 设置操作按钮状态
         if hasattr(self, 'operation_buttons'):
             for button in self.operation_buttons:
@@ -1115,37 +1238,16 @@ class DeepinProjectDownloader:
             self.log_message("[等待] 界面控件已禁用，正在加载数据...")
     
     def auto_query_branches_and_enable(self):
-        """自动查询分支并在完成后启用控件"""
-        def query_and_enable_task():
-            try:
-                # 检查是否需要更新
-                if self.should_update_repos():
-                    # 先自动查询分支
-                    self.auto_query_branches()
-                    
-                    # 等待查询完成（简单延迟，实际应该用更好的同步机制）
-                    import time
-                    time.sleep(3)
-                    
-                    # 更新缓存时间戳
-                    self.update_cache_timestamp()
-                else:
-                    self.message_queue.put(("log", "[缓存] [信息] 距离上次更新未超过3天，跳过自动查询分支"))
-                
-                # 应用保存的分支配置
-                self.apply_saved_branches()
-                
-                # 启用控件
-                self.message_queue.put(("enable_controls", True))
-                self.message_queue.put(("log", "[配置] [完成] 配置加载完成，界面已就绪"))
-                
-            except Exception as e:
-                self.message_queue.put(("log", f"[配置] [错误] 自动查询和启用过程出错: {str(e)}"))
-                # 即使出错也要启用控件
-                self.message_queue.put(("enable_controls", True))
+        """从缓存填充分支列表后立即启用控件，过期的分支列表在后台重新验证"""
+        try:
+            self.auto_query_branches()
+        except Exception as e:
+            self.log_message(f"[配置] [错误] 自动查询分支出错: {str(e)}")
         
-        # 在后台线程执行
-        threading.Thread(target=query_and_enable_task, daemon=True).start()
+        # 在缓存的分支列表放入选择框之后应用保存的分支配置，然后启用控件
+        self.message_queue.put(("apply_saved_branches",))
+        self.message_queue.put(("enable_controls", True))
+        self.message_queue.put(("log", "[配置] [完成] 配置加载完成，界面已就绪"))
     
     def _bind_all_scroll_events(self):
         """绑定所有滚动区域的鼠标事件"""
@@ -1311,6 +1413,38 @@ class DeepinProjectDownloader:
                     for project, branch in self.saved_branches.items():
                         self.init_messages.append(f"[配置] - {project}: {branch}")
                 
+                # 加载克隆方式配置
+                self.saved_clone_modes = {}
+                for project, mode in config.get('clone_modes', {}).items():
+                    if mode in ProjectConfig.CloneMode.LABELS:
+                        self.saved_clone_modes[project] = mode
+                        if project in self.clone_mode_vars:
+                            self.clone_mode_vars[project].set(ProjectConfig.CloneMode.LABELS[mode])
+                    else:
+                        self.init_messages.append(f"[配置] ! 项目 {project} 的克隆方式 {mode} 无效，使用完整克隆")
+                if self.saved_clone_modes:
+                    self.init_messages.append(f"[配置] 克隆方式已加载: {len(self.saved_clone_modes)} 个项目")
+                
+                if 'clone_depth' in config:
+                    try:
+                        depth = int(config['clone_depth'])
+                    except (TypeError, ValueError):
+                        depth = ProjectConfig.CloneMode.DEFAULT_DEPTH
+                    depth = max(1, min(depth, ProjectConfig.CloneMode.MAX_DEPTH))
+                    self.clone_depth_var.set(depth)
+                    self.init_messages.append(f"[配置] 浅克隆深度: {depth}")
+                
+                if 'mirror_cache' in config:
+                    self.mirror_cache_var.set(bool(config['mirror_cache']))
+                    self.init_messages.append(f"[配置] 本地镜像缓存: {'启用' if self.mirror_cache_var.get() else '禁用'}")
+                
+                update_policy = config.get('update_policy')
+                if update_policy in ProjectConfig.UpdatePolicy.LABELS:
+                    self.update_policy_var.set(ProjectConfig.UpdatePolicy.LABELS[update_policy])
+                    self.init_messages.append(f"[配置] 更新策略: {ProjectConfig.UpdatePolicy.LABELS[update_policy]}")
+                elif update_policy is not None:
+                    self.init_messages.append(f"[配置] ! 更新策略 {update_policy} 无效，使用默认策略")
+                
                 # 加载SSHFS配置
                 if 'sshfs' in config:
                     sshfs_config = config['sshfs']
@@ -1409,6 +1543,10 @@ class DeepinProjectDownloader:
                 'save_path': self.save_path.get(),
                 'source': self.source_var.get(),
                 'branches': {},
+                'clone_modes': {},
+                'clone_depth': self.get_clone_depth(),
+                'mirror_cache': bool(self.mirror_cache_var.get()),
+                'update_policy': self.get_update_policy(),
                 'sshfs': {
                     'host': self.sshfs_host_var.get(),
                     'username': self.sshfs_username_var.get(),
@@ -1427,6 +1565,12 @@ class DeepinProjectDownloader:
                 branch_count += 1
                 self.log_message(f"[配置] 保存分支设置: {project_name} -> {branch}")
             
+            # 保存克隆方式（只记录非默认值）
+            for project_name in self.project_repos:
+                mode = self.get_clone_mode(project_name)
+                if mode != ProjectConfig.CloneMode.DEFAULT:
+                    config['clone_modes'][project_name] = mode
+            
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
             
@@ -1434,6 +1578,9 @@ class DeepinProjectDownloader:
             self.log_message(f"[配置] 保存路径: {config['save_path']}")
             self.log_message(f"[配置] 下载源: {config['source']}")
             self.log_message(f"[配置] 分支设置: {branch_count} 个项目")
+            self.log_message(f"[配置] 克隆方式: {len(config['clone_modes'])} 个项目使用非完整克隆，浅克隆深度 {config['clone_depth']}")
+            self.log_message(f"[配置] 本地镜像缓存: {'启用' if config['mirror_cache'] else '禁用'}")
+            self.log_message(f"[配置] 更新策略: {ProjectConfig.UpdatePolicy.LABELS[config['update_policy']]}")
             
             # 记录SSHFS配置保存
             sshfs_config = config['sshfs']
@@ -1781,6 +1928,22 @@ class DeepinProjectDownloader:
             row=0, column=2, padx=(5, 10), pady=(5, 10)
         )
         
+        # 浅克隆深度
+        depth_frame = ttk.Frame(self.path_content_frame)
+        depth_frame.grid(row=1, column=0, columnspan=3, sticky="w", padx=(10, 5), pady=(0, 10))
+        ttk.Label(depth_frame, text="浅克隆深度:").pack(side=tk.LEFT)
+        ttk.Spinbox(depth_frame, from_=1, to=ProjectConfig.CloneMode.MAX_DEPTH, width=6,
+                    textvariable=self.clone_depth_var).pack(side=tk.LEFT, padx=(5, 5))
+        ttk.Label(depth_frame, text="（仅对\"浅克隆\"方式生效）", foreground="gray").pack(side=tk.LEFT)
+        ttk.Checkbutton(depth_frame, text="使用本地镜像缓存", variable=self.mirror_cache_var,
+                        command=self.save_config).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Label(depth_frame, text="已下载项目:").pack(side=tk.LEFT, padx=(15, 0))
+        update_policy_combo = ttk.Combobox(depth_frame, textvariable=self.update_policy_var,
+                                           values=tuple(ProjectConfig.UpdatePolicy.LABELS.values()),
+                                           state="readonly", width=16)
+        update_policy_combo.pack(side=tk.LEFT, padx=(5, 0))
+        update_policy_combo.bind('<<ComboboxSelected>>', lambda e: self.save_config())
+        
         # Git初始化区域（可折叠）
         git_container = ttk.Frame(config_content_frame)
         git_container.grid(row=2, column=0, sticky="ew", padx=10, pady=5)
@@ -4266,9 +4429,21 @@ class DeepinProjectDownloader:
                             lambda e, name=project_name: self.on_branch_changed(e, name))
             self.branch_combos[project_name] = branch_combo
             
+            # 克隆方式选择
+            if project_name not in self.clone_mode_vars:
+                mode = self.saved_clone_modes.get(project_name, ProjectConfig.CloneMode.DEFAULT)
+                self.clone_mode_vars[project_name] = tk.StringVar(value=ProjectConfig.CloneMode.LABELS[mode])
+            clone_mode_combo = ttk.Combobox(self.project_content_frame, textvariable=self.clone_mode_vars[project_name],
+                                          values=tuple(ProjectConfig.CloneMode.LABELS.values()),
+                                          state="readonly", width=10)
+            clone_mode_combo.grid(row=row, column=4, sticky="ew", padx=5, pady=2)
+            clone_mode_combo.bind('<<ComboboxSelected>>',
+                                lambda e, name=project_name: self.on_clone_mode_changed(e, name))
+            self.clone_mode_combos[project_name] = clone_mode_combo
+            
             # 进度条容器
             progress_frame = ttk.Frame(self.project_content_frame)
-            progress_frame.grid(row=row, column=4, sticky="ew", padx=5, pady=2)
+            progress_frame.grid(row=row, column=5, sticky="ew", padx=5, pady=2)
             
             # 创建进度条（初始隐藏）
             progress_bar = ttk.Progressbar(progress_frame, mode='indeterminate', length=100)
@@ -4281,7 +4456,7 @@ class DeepinProjectDownloader:
             
             # 操作按钮
             action_frame = ttk.Frame(self.project_content_frame)
-            action_frame.grid(row=row, column=5, sticky="ew", padx=5, pady=2)
+            action_frame.grid(row=row, column=6, sticky="ew", padx=5, pady=2)
             
             ttk.Button(action_frame, text="目录", width=4, style='Primary.TButton',
                       command=lambda name=project_name: self.open_project_dir(name)).pack(side=tk.LEFT, padx=1)
@@ -4320,11 +4495,12 @@ class DeepinProjectDownloader:
         header_frame.columnconfigure(1, weight=3, minsize=200)  # 项目列  
         header_frame.columnconfigure(2, weight=2, minsize=100)  # 状态列
         header_frame.columnconfigure(3, weight=3, minsize=200)  # 分支列
-        header_frame.columnconfigure(4, weight=2, minsize=150)  # 进度列
-        header_frame.columnconfigure(5, weight=2, minsize=120)  # 操作列
+        header_frame.columnconfigure(4, weight=1, minsize=110)  # 克隆方式列
+        header_frame.columnconfigure(5, weight=2, minsize=150)  # 进度列
+        header_frame.columnconfigure(6, weight=2, minsize=120)  # 操作列
         
         # 表格标题行
-        headers = ["选择", "项目名称", "本地状态", "分支选择", "下载进度", "操作"]
+        headers = ["选择", "项目名称", "本地状态", "分支选择", "克隆方式", "下载进度", "操作"]
         for i, header in enumerate(headers):
             label = ttk.Label(header_frame, text=header, style='Header.TLabel')
             label.grid(row=0, column=i, sticky="ew", padx=2, pady=5)
@@ -4343,8 +4519,9 @@ class DeepinProjectDownloader:
         content_frame.columnconfigure(1, weight=3, minsize=200)  # 项目列
         content_frame.columnconfigure(2, weight=2, minsize=100)  # 状态列
         content_frame.columnconfigure(3, weight=3, minsize=200)  # 分支列
-        content_frame.columnconfigure(4, weight=2, minsize=150)  # 进度列
-        content_frame.columnconfigure(5, weight=2, minsize=120)  # 操作列
+        content_frame.columnconfigure(4, weight=1, minsize=110)  # 克隆方式列
+        content_frame.columnconfigure(5, weight=2, minsize=150)  # 进度列
+        content_frame.columnconfigure(6, weight=2, minsize=120)  # 操作列
         
         # 保存内容框架引用用于刷新
         self.project_content_frame = content_frame
@@ -4908,6 +5085,39 @@ class DeepinProjectDownloader:
         # 自动重新查询分支
         self.root.after(500, self.auto_query_branches)
     
+    def get_clone_mode(self, project_name):
+        """获取项目的克隆方式"""
+        var = self.clone_mode_vars.get(project_name)
+        if var is None:
+            return self.saved_clone_modes.get(project_name, ProjectConfig.CloneMode.DEFAULT)
+        label = var.get()
+        for mode, mode_label in ProjectConfig.CloneMode.LABELS.items():
+            if mode_label == label:
+                return mode
+        return ProjectConfig.CloneMode.DEFAULT
+    
+    def get_clone_depth(self):
+        """获取浅克隆深度（输入无效时使用默认值）"""
+        try:
+            depth = int(self.clone_depth_var.get())
+        except (tk.TclError, TypeError, ValueError):
+            return ProjectConfig.CloneMode.DEFAULT_DEPTH
+        return max(1, min(depth, ProjectConfig.CloneMode.MAX_DEPTH))
+    
+    def get_update_policy(self):
+        """获取已下载项目的更新策略"""
+        label = self.update_policy_var.get()
+        for policy, policy_label in ProjectConfig.UpdatePolicy.LABELS.items():
+            if policy_label == label:
+                return policy
+        return ProjectConfig.UpdatePolicy.DEFAULT
+    
+    def on_clone_mode_changed(self, event, project_name):
+        """克隆方式改变时的回调"""
+        mode = self.get_clone_mode(project_name)
+        self.log_message(f"[克隆] {project_name} 克隆方式: {ProjectConfig.CloneMode.LABELS[mode]} ({mode})，下次下载时生效")
+        self.save_config()
+    
     def on_branch_changed(self, event, project_name):
         """分支选择改变时的回调"""
         if self.branch_switching.get(project_name, False):
@@ -4991,11 +5201,34 @@ class DeepinProjectDownloader:
             self.log_message(f"[错误] {project_name} 详细错误: {traceback.format_exc()}")
             self.cancel_branch_switch(project_name, "master")
     
+    def fetch_remote_branch(self, project_name, project_path, branch, depth):
+        """切换分支前获取远程分支
+        
+        单分支、浅克隆和无blob克隆的仓库只有克隆时的那个分支，需要先把目标分支
+        获取到 origin/<分支>；浅克隆的仓库按 depth 获取，保持浅克隆。
+        """
+        fetch_command = ["git", "fetch", "origin", f"+refs/heads/{branch}:refs/remotes/origin/{branch}"]
+        shallow = subprocess.run(
+            ["git", "rev-parse", "--is-shallow-repository"],
+            capture_output=True, text=True, cwd=project_path, timeout=ProjectConfig.Timeout.SUBPROCESS_LONG
+        )
+        if shallow.stdout.strip() == "true":
+            fetch_command[2:2] = ["--depth", str(depth)]
+        
+        result = subprocess.run(fetch_command, capture_output=True, text=True, cwd=project_path,
+                                env=dict(os.environ, GIT_TERMINAL_PROMPT="0"))
+        if result.returncode != 0:
+            # 获取失败时仍尝试用本地已有的分支切换
+            self.message_queue.put(("log", f"[分支] [警告] {project_name} 获取远程分支 {branch} 失败: {result.stderr.strip()}"))
+    
     def force_switch_branch(self, project_name, new_branch, old_branch):
         """强制切换分支"""
+        depth = self.get_clone_depth()
+        
         def switch_task():
             try:
                 project_path = os.path.join(self.save_path.get(), project_name)
+                self.fetch_remote_branch(project_name, project_path, new_branch, depth)
                 
                 # 强制重置到当前分支HEAD
                 subprocess.run(["git", "reset", "--hard", "HEAD"], cwd=project_path, check=True)
@@ -5003,9 +5236,13 @@ class DeepinProjectDownloader:
                 # 清理未跟踪的文件
                 subprocess.run(["git", "clean", "-fd"], cwd=project_path, check=True)
                 
-                # 切换分支
+                # 切换分支（本地没有该分支时从远程分支创建，单分支仓库不会自动推断远程分支）
+                checkout_command = ["git", "checkout", new_branch]
+                if subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"refs/heads/{new_branch}"],
+                                  capture_output=True, cwd=project_path).returncode != 0:
+                    checkout_command = ["git", "checkout", "-b", new_branch, f"origin/{new_branch}"]
                 result = subprocess.run(
-                    ["git", "checkout", new_branch],
+                    checkout_command,
                     capture_output=True, text=True, cwd=project_path
                 )
                 
@@ -5027,6 +5264,8 @@ class DeepinProjectDownloader:
     
     def switch_branch(self, project_name, new_branch):
         """普通分支切换"""
+        depth = self.get_clone_depth()
+        
         def switch_task():
             try:
                 project_path = os.path.join(self.save_path.get(), project_name)
@@ -5037,6 +5276,7 @@ class DeepinProjectDownloader:
                     capture_output=True, text=True, cwd=project_path
                 )
                 current_branch = current_branch_result.stdout.strip() if current_branch_result.returncode == 0 else "master"
+                self.fetch_remote_branch(project_name, project_path, new_branch, depth)
                 
                 result = subprocess.run(
                     ["git", "checkout", new_branch],
@@ -5294,20 +5534,254 @@ class DeepinProjectDownloader:
             pb['bar']['value'] = progress
             pb['label'].config(text=status_text)
     
-    def download_single_project(self, project_name, repo_url, branch, save_path):
+    @staticmethod
+    def build_clone_command(clone_url, project_path, branch, clone_mode, depth, reference_path=None):
+        """根据克隆方式生成 git clone 命令
+        
+        完整克隆保持原有行为（克隆默认分支后再切换）；其余方式在选择了非 master 分支时
+        直接用 -b 克隆该分支，省去 fetch --all 和 checkout。给出 reference_path 时从本地
+        镜像借用对象，--dissociate 在克隆完成后复制所需对象，项目不再依赖镜像。
+        """
+        command = ["git", "clone", "--progress"]
+        if reference_path:
+            command += ["--reference-if-able", reference_path, "--dissociate"]
+        if clone_mode == ProjectConfig.CloneMode.SHALLOW:
+            # --depth 隐含 --single-branch
+            command += ["--depth", str(depth)]
+        elif clone_mode == ProjectConfig.CloneMode.PARTIAL:
+            command += ["--filter=blob:none"]
+        elif clone_mode == ProjectConfig.CloneMode.SINGLE_BRANCH:
+            command += ["--single-branch"]
+        if clone_mode != ProjectConfig.CloneMode.FULL and branch and branch != "master":
+            command += ["-b", branch]
+        command += [clone_url, project_path]
+        return command
+    
+    @staticmethod
+    def normalize_repo_url(url):
+        """规范化仓库地址用于比较（去掉认证信息、末尾的 / 和 .git，主机名小写）"""
+        parsed = urlparse(url.strip())
+        if not parsed.scheme:
+            return url.strip().rstrip("/")
+        host = (parsed.hostname or "").lower()
+        if parsed.port:
+            host += f":{parsed.port}"
+        path = parsed.path.rstrip("/")
+        if path.endswith(".git"):
+            path = path[:-4]
+        return f"{parsed.scheme}://{host}{path}"
+    
+    def update_existing_project(self, project_name, project_path, repo_url, clone_url, branch, policy,
+                                depth=ProjectConfig.CloneMode.DEFAULT_DEPTH):
+        """在已有的克隆中增量更新项目
+        
+        更新沿用仓库原有的克隆方式：浅克隆仓库按 depth 获取新提交，无blob克隆的文件内容
+        由 git 在检出时按需下载；界面上克隆方式的改动只在重新克隆时生效。
+        返回 True 表示更新成功；False 表示更新失败但保留了本地仓库（网络错误、超时、本地有
+        未提交修改或分支已分叉）；None 表示目录不是同一仓库的有效克隆，需要重新克隆。
+        """
+        def git(*args, timeout=ProjectConfig.Timeout.SUBPROCESS_LONG):
+            return subprocess.run(["git", *args], cwd=project_path,
+                                  capture_output=True, text=True, timeout=timeout)
+        
+        try:
+            # 必须是独立的仓库（不能是上层目录仓库的一部分），且 HEAD 可以解析
+            toplevel = git("rev-parse", "--show-toplevel")
+            if toplevel.returncode != 0 or os.path.realpath(toplevel.stdout.strip()) != os.path.realpath(project_path):
+                self.message_queue.put(("log", f"[更新] {project_name}: 目录不是有效的Git仓库"))
+                return None
+            if git("rev-parse", "--verify", "--quiet", "HEAD").returncode != 0:
+                self.message_queue.put(("log", f"[更新] {project_name}: 仓库HEAD无法解析，可能已损坏"))
+                return None
+            
+            origin = git("remote", "get-url", "origin")
+            if origin.returncode != 0 or self.normalize_repo_url(origin.stdout) != self.normalize_repo_url(repo_url):
+                current_url = origin.stdout.strip() if origin.returncode == 0 else "无"
+                self.message_queue.put(("log", f"[更新] {project_name}: 远程地址不一致 ({current_url})"))
+                return None
+            
+            policy_label = ProjectConfig.UpdatePolicy.LABELS.get(policy, policy)
+            self.message_queue.put(("log", f"[更新] {project_name}: 增量更新已有仓库 (分支: {branch}，策略: {policy_label})"))
+            self.message_queue.put(("update_progress", project_name, 20, "获取更新..."))
+            update_start = time.monotonic()
+            
+            # 只获取目标分支；浅克隆的仓库必须带 --depth，否则 git 会沿历史一直补全到根提交
+            remote_ref = f"refs/remotes/origin/{branch}"
+            remote = "origin" if clone_url == repo_url else clone_url
+            fetch_args = ["fetch", "--prune"]
+            shallow = git("rev-parse", "--is-shallow-repository").stdout.strip() == "true"
+            if shallow:
+                fetch_args += ["--depth", str(depth)]
+            previous_remote_head = git("rev-parse", "--verify", "--quiet", remote_ref).stdout.strip()
+            fetch_result = git(*fetch_args, remote, f"+refs/heads/{branch}:{remote_ref}", timeout=None)
+            if fetch_result.returncode != 0:
+                error = fetch_result.stderr.strip().replace(clone_url, repo_url)
+                self.message_queue.put(("log", f"[更新] [失败] {project_name}: 获取分支 {branch} 失败: {error}"))
+                return False
+            
+            # 检查本地未提交的修改
+            dirty = git("status", "--porcelain", "--untracked-files=no", timeout=None).stdout.strip()
+            if dirty and policy == ProjectConfig.UpdatePolicy.FAST_FORWARD:
+                self.message_queue.put(("log", f"[更新] [跳过] {project_name}: 本地有未提交的修改，未更新（可改用\"强制重置\"策略）"))
+                return False
+            if dirty:
+                self.message_queue.put(("log", f"[更新] [警告] {project_name}: 丢弃本地未提交的修改"))
+            
+            self.message_queue.put(("update_progress", project_name, 60, "更新工作区..."))
+            old_head = git("rev-parse", "HEAD").stdout.strip()
+            
+            # 切换到目标分支（本地没有该分支时从远程分支创建）
+            current_branch = git("rev-parse", "--abbrev-ref", "HEAD").stdout.strip()
+            if current_branch != branch:
+                if git("rev-parse", "--verify", "--quiet", f"refs/heads/{branch}").returncode == 0:
+                    checkout_args = ["checkout", branch]
+                else:
+                    checkout_args = ["checkout", "-b", branch, "--track", f"origin/{branch}"]
+                if policy == ProjectConfig.UpdatePolicy.HARD_RESET:
+                    checkout_args.insert(1, "--force")
+                checkout_result = git(*checkout_args, timeout=None)
+                if checkout_result.returncode != 0:
+                    self.message_queue.put(("log", f"[更新] [失败] {project_name}: 切换到分支 {branch} 失败: {checkout_result.stderr.strip()}"))
+                    return False
+                old_head = git("rev-parse", "HEAD").stdout.strip()
+            
+            # 浅克隆按深度重新获取后，新旧提交之间的历史可能已被截断，无法判断能否快进；
+            # 本地分支仍停在上次获取的远程位置时没有本地提交，直接重置到新的远程分支
+            if policy == ProjectConfig.UpdatePolicy.HARD_RESET or (shallow and old_head == previous_remote_head):
+                update_result = git("reset", "--hard", remote_ref, timeout=None)
+            else:
+                update_result = git("merge", "--ff-only", remote_ref, timeout=None)
+            if update_result.returncode != 0:
+                self.message_queue.put(("log", f"[更新] [失败] {project_name}: 无法快进到 origin/{branch}，本地分支可能已分叉（可改用\"强制重置\"策略）"))
+                return False
+            
+            new_head = git("rev-parse", "HEAD").stdout.strip()
+            elapsed = time.monotonic() - update_start
+            if old_head == new_head:
+                self.message_queue.put(("log", f"[更新] [成功] {project_name}: 已是最新 ({new_head[:10]})，耗时 {elapsed:.1f} 秒"))
+            else:
+                count = git("rev-list", "--count", f"{old_head}..{new_head}", timeout=None).stdout.strip() or "?"
+                self.message_queue.put(("log", f"[更新] [成功] {project_name}: {old_head[:10]} -> {new_head[:10]} ({count} 个新提交)，耗时 {elapsed:.1f} 秒"))
+            return True
+        except subprocess.TimeoutExpired as e:
+            # 超时时保留本地仓库，不当作无效克隆删除
+            self.message_queue.put(("log", f"[更新] [超时] {project_name}: git {e.cmd[1]} 超过 {e.timeout} 秒未完成"))
+            return False
+    
+    @staticmethod
+    def get_mirror_path(repo_url):
+        """获取仓库地址对应的本地裸镜像路径（按主机和仓库路径组织）"""
+        parsed = urlparse(repo_url)
+        parts = [part for part in parsed.path.split("/") if part not in ("", ".", "..")]
+        if not parts:
+            parts = ["repo"]
+        if not parts[-1].endswith(".git"):
+            parts[-1] += ".git"
+        return os.path.join(ProjectConfig.Path.MIRROR_DIR, parsed.hostname or "local", *parts)
+    
+    def update_mirror(self, project_name, repo_url, clone_url, create=True):
+        """创建或增量更新仓库的本地裸镜像，成功时返回镜像路径，失败返回 None
+        
+        镜像用 git init --bare + git fetch 建立，抓取地址只出现在命令行中，认证信息
+        不会写入镜像配置；同一镜像同时只允许一个线程更新。create 为 False 时只更新
+        已有的镜像。
+        """
+        mirror_path = self.get_mirror_path(repo_url)
+        with self.mirror_locks_lock:
+            lock = self.mirror_locks.setdefault(mirror_path, threading.Lock())
+        
+        with lock:
+            try:
+                exists = os.path.isdir(mirror_path)
+                if exists:
+                    check = subprocess.run(
+                        ["git", "--git-dir", mirror_path, "rev-parse", "--is-bare-repository"],
+                        capture_output=True, text=True, timeout=ProjectConfig.Timeout.SUBPROCESS_LONG
+                    )
+                    if check.returncode != 0 or check.stdout.strip() != "true":
+                        self.message_queue.put(("log", f"[镜像] [警告] {project_name}: 镜像已损坏，重新创建 {mirror_path}"))
+                        shutil.rmtree(mirror_path, ignore_errors=True)
+                        exists = False
+                
+                if not exists and not create:
+                    return None
+                
+                if not exists:
+                    os.makedirs(os.path.dirname(mirror_path), exist_ok=True)
+                    subprocess.run(["git", "init", "--quiet", "--bare", mirror_path],
+                                   check=True, capture_output=True, text=True)
+                    subprocess.run(["git", "--git-dir", mirror_path, "config", "remote.origin.url", repo_url],
+                                   check=True, capture_output=True, text=True)
+                    self.message_queue.put(("log", f"[镜像] {project_name}: 创建本地镜像 {mirror_path}"))
+                else:
+                    self.message_queue.put(("log", f"[镜像] {project_name}: 增量更新本地镜像 {mirror_path}"))
+                
+                start = time.monotonic()
+                size_before = self.get_directory_size(mirror_path)
+                process = subprocess.Popen(
+                    ["git", "--git-dir", mirror_path, "fetch", "--progress", "--prune", clone_url,
+                     "+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*"],
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, universal_newlines=True
+                )
+                output_lines = []
+                if process.stdout:
+                    for line in iter(process.stdout.readline, ''):
+                        clean_line = line.strip()
+                        if clean_line:
+                            output_lines.append(clean_line)
+                            if any(keyword in clean_line.lower() for keyword in ['receiving', 'resolving', 'done', 'total']):
+                                self.message_queue.put(("log", f"[{project_name}] [镜像] {clean_line}"))
+                process.wait()
+                
+                if process.returncode != 0:
+                    self.message_queue.put(("log", f"[镜像] [失败] {project_name}: 镜像更新失败，返回码: {process.returncode}"))
+                    if output_lines:
+                        self.message_queue.put(("log", f"[镜像] [错误详情] {project_name}: {output_lines[-1]}"))
+                    if not exists:
+                        shutil.rmtree(mirror_path, ignore_errors=True)
+                    return None
+                
+                elapsed = time.monotonic() - start
+                fetched = max(self.get_directory_size(mirror_path) - size_before, 0)
+                self.message_queue.put(("log", f"[镜像] [成功] {project_name}: 镜像已更新，耗时 {elapsed:.1f} 秒，新增 {self.format_size(fetched)}"))
+                return mirror_path
+            except Exception as e:
+                self.message_queue.put(("log", f"[镜像] [错误] {project_name}: 镜像处理出错: {str(e)}，直接从远程克隆"))
+                return None
+    
+    @staticmethod
+    def get_directory_size(path):
+        """统计目录占用的字节数（不跟随符号链接）"""
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        return total
+    
+    @staticmethod
+    def format_size(size):
+        """格式化字节数"""
+        for unit in ("B", "KB", "MB", "GB"):
+            if size < 1024 or unit == "GB":
+                return f"{size:.0f} {unit}" if unit == "B" else f"{size:.2f} {unit}"
+            size /= 1024
+    
+    def download_single_project(self, project_name, repo_url, branch, save_path,
+                                clone_mode=ProjectConfig.CloneMode.DEFAULT,
+                                depth=ProjectConfig.CloneMode.DEFAULT_DEPTH, use_mirror=False,
+                                update_policy=ProjectConfig.UpdatePolicy.RECLONE):
         """下载单个项目"""
         try:
             project_path = os.path.join(save_path, project_name)
+            mode_label = ProjectConfig.CloneMode.LABELS.get(clone_mode, clone_mode)
             
             # 显示进度条
             self.message_queue.put(("show_progress", project_name, None))
             
-            # 如果目录已存在，先删除
-            if os.path.exists(project_path):
-                self.message_queue.put(("log", f"[删除] {project_name}: 删除已存在的目录"))
-                self.message_queue.put(("update_progress", project_name, 10, "删除旧目录"))
-                subprocess.run(["rm", "-rf", project_path], check=True)
-            
             # 检查是否需要认证
             clone_url = repo_url
             if self.requires_auth(project_name, repo_url):
@@ -5342,13 +5816,47 @@ class DeepinProjectDownloader:
                     self.message_queue.put(("hide_progress", project_name))
                     return False
             
+            # 目录已存在时优先在原仓库中增量更新，只有仓库无效时才删除重新克隆
+            if os.path.exists(project_path):
+                if update_policy != ProjectConfig.UpdatePolicy.RECLONE:
+                    updated = self.update_existing_project(project_name, project_path, repo_url, clone_url,
+                                                           branch, update_policy, depth)
+                    if updated is not None:
+                        if updated:
+                            self.message_queue.put(("update_progress", project_name, 100, "完成"))
+                            time.sleep(0.5)  # 让用户看到100%
+                            self.message_queue.put(("log", f"[完成] {project_name}: 更新完成 (分支: {branch})"))
+                        self.message_queue.put(("hide_progress", project_name))
+                        self.message_queue.put(("update_project_status", project_name))
+                        return updated
+                    self.message_queue.put(("log", f"[更新] {project_name}: 无法增量更新，改为重新克隆"))
+                
+                self.message_queue.put(("log", f"[删除] {project_name}: 删除已存在的目录"))
+                self.message_queue.put(("update_progress", project_name, 10, "删除旧目录"))
+                subprocess.run(["rm", "-rf", project_path], check=True)
+            
+            # 更新本地镜像，克隆时只需从网络获取镜像中没有的对象
+            reference_path = None
+            if use_mirror:
+                self.message_queue.put(("update_progress", project_name, 15, "更新镜像..."))
+                # 浅克隆、无blob克隆和单分支克隆本身就是为了少下载，不为它们首次建立包含所有分支的完整镜像
+                create_mirror = clone_mode not in (ProjectConfig.CloneMode.SHALLOW, ProjectConfig.CloneMode.PARTIAL,
+                                                   ProjectConfig.CloneMode.SINGLE_BRANCH)
+                reference_path = self.update_mirror(project_name, repo_url, clone_url, create=create_mirror)
+            
             # 克隆仓库
-            self.message_queue.put(("log", f"[下载] {project_name}: 开始克隆仓库 {repo_url}"))
+            clone_command = self.build_clone_command(clone_url, project_path, branch, clone_mode, depth,
+                                                     reference_path)
+            # 日志中隐藏认证信息
+            display_command = " ".join(repo_url if arg == clone_url else arg for arg in clone_command)
+            self.message_queue.put(("log", f"[下载] {project_name}: 开始克隆仓库 {repo_url} (方式: {mode_label})"))
+            self.message_queue.put(("log", f"[下载] {project_name}: {display_command}"))
             self.message_queue.put(("update_progress", project_name, 20, "克隆中..."))
+            clone_start = time.monotonic()
             
             # 实时显示git clone输出
             process = subprocess.Popen(
-                ["git", "clone", "--progress", clone_url, project_path],
+                clone_command,
                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT, 
                 text=True, cwd=save_path, universal_newlines=True
             )
@@ -5384,11 +5892,13 @@ class DeepinProjectDownloader:
                 self.message_queue.put(("hide_progress", project_name))
                 return False
             
-            self.message_queue.put(("log", f"[成功] {project_name}: 仓库克隆完成"))
+            clone_elapsed = time.monotonic() - clone_start
+            git_size = self.get_directory_size(os.path.join(project_path, ".git"))
+            self.message_queue.put(("log", f"[成功] {project_name}: 仓库克隆完成，耗时 {clone_elapsed:.1f} 秒，.git 大小 {self.format_size(git_size)} (方式: {mode_label})"))
             self.message_queue.put(("update_progress", project_name, 60, "克隆完成"))
             
-            # 切换分支
-            if branch != "master":
+            # 切换分支（非完整克隆已通过 -b 直接克隆目标分支）
+            if branch != "master" and clone_mode == ProjectConfig.CloneMode.FULL:
                 self.message_queue.put(("log", f"[分支] [切换] {project_name}: 切换到分支 {branch}"))
                 self.message_queue.put(("update_progress", project_name, 80, f"切换分支..."))
                 
@@ -5517,75 +6027,141 @@ class DeepinProjectDownloader:
         
         threading.Thread(target=query_task, daemon=True).start()
     
-    def query_all_branches(self):
-        """查询所有项目的分支"""
+    def get_branch_query_url(self, project_name, repo_url):
+        """获取分支查询使用的地址
+        
+        需要认证时在主线程中弹出认证对话框并等待结果，只能在后台线程中调用；
+        用户取消或认证信息不完整时返回 None。
+        """
+        if not self.requires_auth(project_name, repo_url):
+            return repo_url
+        
+        self.message_queue.put(("log", f"[认证] [信息] {project_name}: 分支查询需要身份认证"))
+        
+        # 获取认证凭据（在主线程中执行）
+        auth_result = [None]  # 使用列表来存储结果，以便在闭包中修改
+        
+        def get_credentials():
+            auth_result[0] = self.get_auth_credentials(project_name, repo_url)
+        
+        # 在主线程中执行认证对话框
+        self.root.after(0, get_credentials)
+        
+        # 等待认证对话框的结果
+        while auth_result[0] is None:
+            time.sleep(0.1)
+        
+        credentials = auth_result[0]
+        
+        if credentials['cancelled']:
+            self.message_queue.put(("log", f"[认证] [取消] {project_name}: 用户取消了认证"))
+            return None
+        
+        if credentials['username'] and credentials['password']:
+            self.message_queue.put(("log", f"[认证] [信息] {project_name}: 分支查询认证信息已设置"))
+            return self.build_authenticated_url(repo_url, credentials['username'], credentials['password'])
+        
+        self.message_queue.put(("log", f"[认证] [错误] {project_name}: 认证信息不完整"))
+        return None
+    
+    def list_remote_branches(self, query_url):
+        """通过 git ls-remote 获取远程分支列表，查询失败时抛出 RuntimeError"""
+        # 并行查询时不允许 git 在终端提示输入密码，避免线程被阻塞
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        result = subprocess.run(
+            ["git", "ls-remote", "--heads", query_url],
+            capture_output=True, text=True, timeout=ProjectConfig.Timeout.SUBPROCESS_EXTENDED, env=env
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        
+        branches = []
+        for line in result.stdout.strip().split('\n'):
+            if line:
+                branches.append(line.split('\t')[1].replace('refs/heads/', ''))
+        return branches
+    
+    def run_parallel_branch_queries(self, projects, query_task):
+        """通过有界线程池并行执行各项目的分支查询
+        
+        query_task(project_name, query_url) 在线程池中执行，结果由它自己放入消息队列，
+        每个项目完成后界面立即更新。需要认证的项目在提交其余查询之后逐个弹出认证
+        对话框，不会同时出现多个对话框。返回查询成功的项目数。
+        """
+        start = time.monotonic()
+        total = 0
+        completed = 0
+        succeeded = 0
+        max_workers = max(1, min(ProjectConfig.ThreadPool.BRANCH_QUERY_WORKERS, len(projects)))
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            auth_projects = []
+            for project_name, repo_url in projects.items():
+                if self.requires_auth(project_name, repo_url):
+                    auth_projects.append((project_name, repo_url))
+                else:
+                    futures[executor.submit(query_task, project_name, repo_url)] = project_name
+            
+            for project_name, repo_url in auth_projects:
+                query_url = self.get_branch_query_url(project_name, repo_url)
+                if query_url is not None:
+                    futures[executor.submit(query_task, project_name, query_url)] = project_name
+            
+            total = len(futures)
+            for future in concurrent.futures.as_completed(futures):
+                project_name = futures[future]
+                completed += 1
+                try:
+                    if future.result():
+                        succeeded += 1
+                except subprocess.TimeoutExpired:
+                    self.message_queue.put(("log", f"[分支] [超时] {project_name} 分支查询超时"))
+                except RuntimeError as e:
+                    self.message_queue.put(("log", f"[分支] [失败] {project_name} 分支查询失败: {str(e)}"))
+                except Exception as e:
+                    self.message_queue.put(("log", f"[分支] [错误] {project_name} 分支查询出错: {str(e)}"))
+                self.message_queue.put(("status", f"[{completed}/{total}] {project_name} 分支查询完成"))
+        
+        elapsed = time.monotonic() - start
+        self.message_queue.put(("log", f"[分支] [统计] {succeeded}/{total} 个项目查询成功，并发 {max_workers}，耗时 {elapsed:.1f} 秒"))
+        return succeeded
+    
+    def query_all_branches(self, projects=None, only_changed=False):
+        """查询项目的分支（并行），默认查询所有项目
+        
+        结果写入分支列表缓存；only_changed 为 True 时只把与缓存不同的分支列表更新到界面。
+        """
+        source = self.source_var.get()
+        if projects is None:
+            projects = self.get_current_projects()
+        changed_projects = []
+        
+        # 记录查询前界面上来自缓存的分支列表，用于判断是否需要更新界面
+        previous_branches = {}
+        for project_name, repo_url in projects.items():
+            cached = self.get_cached_branches(source, repo_url)
+            previous_branches[project_name] = cached[0] if cached else None
+        
+        def query_one(project_name, query_url):
+            branches = self.list_remote_branches(query_url)
+            self.store_cached_branches(source, projects[project_name], branches)
+            changed = branches != previous_branches[project_name]
+            if changed:
+                changed_projects.append(project_name)
+            if only_changed and not changed:
+                return True
+            self.message_queue.put(("branches", project_name, branches))
+            self.message_queue.put(("log", f"[分支] [成功] {project_name} 分支查询完成，找到 {len(branches)} 个分支"))
+            return True
+        
         def query_all_task():
             try:
-                projects = self.get_current_projects()
-                self.message_queue.put(("log", f"[分支] [调试] 开始查询所有分支，共 {len(projects)} 个项目"))
-                
-                for project_name in projects.keys():
-                    try:
-                        self.message_queue.put(("status", f"正在查询 {project_name} 的分支..."))
-                        self.message_queue.put(("log", f"[分支] [调试] 开始查询项目: {project_name}"))
-                        
-                        repo_url = projects[project_name]
-                        
-                        # 检查是否需要认证
-                        query_url = repo_url
-                        if self.requires_auth(project_name, repo_url):
-                            self.message_queue.put(("log", f"[认证] [信息] {project_name}: 分支查询需要身份认证"))
-                            
-                            # 获取认证凭据（在主线程中执行）
-                            credentials = None
-                            auth_result = [None]  # 使用列表来存储结果，以便在闭包中修改
-                            
-                            def get_credentials():
-                                auth_result[0] = self.get_auth_credentials(project_name, repo_url)
-                            
-                            # 在主线程中执行认证对话框
-                            self.root.after(0, get_credentials)
-                            
-                            # 等待认证对话框的结果
-                            while auth_result[0] is None:
-                                time.sleep(0.1)
-                            
-                            credentials = auth_result[0]
-                            
-                            if credentials['cancelled']:
-                                self.message_queue.put(("log", f"[认证] [取消] {project_name}: 用户取消了认证"))
-                                continue
-                            
-                            if credentials['username'] and credentials['password']:
-                                query_url = self.build_authenticated_url(repo_url, credentials['username'], credentials['password'])
-                                self.message_queue.put(("log", f"[认证] [信息] {project_name}: 分支查询认证信息已设置"))
-                            else:
-                                self.message_queue.put(("log", f"[认证] [错误] {project_name}: 认证信息不完整"))
-                                continue
-                        
-                        result = subprocess.run(
-                            ["git", "ls-remote", "--heads", query_url],
-                            capture_output=True, text=True, timeout=30
-                        )
-                        
-                        if result.returncode == 0:
-                            branches = []
-                            for line in result.stdout.strip().split('\n'):
-                                if line:
-                                    branch = line.split('\t')[1].replace('refs/heads/', '')
-                                    branches.append(branch)
-                            
-                            self.message_queue.put(("branches", project_name, branches))
-                            self.message_queue.put(("log", f"[分支] [成功] {project_name} 分支查询完成，找到 {len(branches)} 个分支"))
-                        else:
-                            self.message_queue.put(("log", f"[分支] [失败] {project_name} 分支查询失败: {result.stderr}"))
-                            
-                    except Exception as e:
-                        self.message_queue.put(("log", f"[分支] [错误] {project_name} 分支查询出错: {str(e)}"))
-                
-                self.message_queue.put(("log", "[分支] [调试] 所有项目分支查询循环完成，准备发送完成消息"))
+                self.message_queue.put(("log", f"[分支] [开始] 开始并行查询分支，共 {len(projects)} 个项目"))
+                self.run_parallel_branch_queries(projects, query_one)
+                self.save_branch_cache()
+                self.message_queue.put(("log", f"[缓存] 分支列表缓存已更新，{len(changed_projects)} 个项目的分支有变化"))
                 self.message_queue.put(("status", "所有分支查询完成"))
-                self.message_queue.put(("log", "[分支] [调试] 完成消息已发送"))
             except Exception as e:
                 self.message_queue.put(("log", f"[分支] [错误] query_all_branches 主任务出错: {str(e)}"))
                 import traceback
@@ -5598,156 +6174,109 @@ class DeepinProjectDownloader:
         threading.Thread(target=query_all_task, daemon=True).start()
     
     def auto_query_branches(self):
-        """启动时自动查询所有项目的分支"""
-        source = self.source_var.get().upper()
-        self.log_message(f">> 正在自动获取所有项目的分支信息 ({source} 源)...")
-        self.query_all_branches()
+        """自动获取所有项目的分支
+        
+        先用磁盘缓存立即填充分支选择框，再在后台只查询没有缓存或缓存已过期的项目，
+        查询结果与缓存相同的项目不会更新界面。
+        """
+        source = self.source_var.get()
+        projects = self.get_current_projects()
+        stale_projects = {}
+        cached_count = 0
+        
+        for project_name, repo_url in projects.items():
+            cached = self.get_cached_branches(source, repo_url)
+            if cached is None:
+                stale_projects[project_name] = repo_url
+                continue
+            branches, expired = cached
+            if branches:
+                self.message_queue.put(("branches", project_name, branches))
+                cached_count += 1
+            if expired:
+                stale_projects[project_name] = repo_url
+        
+        self.log_message(f"[缓存] 从缓存加载 {cached_count}/{len(projects)} 个项目的分支列表 ({source.upper()} 源)")
+        if not stale_projects:
+            self.log_message(f"[缓存] 分支列表缓存均未超过 {ProjectConfig.BRANCH_CACHE_TTL_HOURS} 小时，跳过远程查询")
+            return
+        
+        self.log_message(f">> 正在后台更新 {len(stale_projects)} 个项目的分支信息 ({source.upper()} 源)...")
+        self.query_all_branches(stale_projects, only_changed=True)
     
     def query_and_detect_branches(self):
-        """合并查询远程分支和本地分支"""
+        """合并查询远程分支和本地分支（并行）"""
+        save_path = self.save_path.get()
+        source = self.source_var.get()
+        projects = self.get_current_projects()
+        
+        def query_one(project_name, query_url):
+            project_path = os.path.join(save_path, project_name)
+            remote_branches = []
+            local_branches = []
+            current_branch = ""
+            
+            # 1. 查询远程分支（失败时仍然使用本地分支）
+            try:
+                remote_branches = self.list_remote_branches(query_url)
+                self.store_cached_branches(source, projects[project_name], remote_branches)
+            except RuntimeError as e:
+                self.message_queue.put(("log", f"[分支] [失败] {project_name} 远程分支查询失败: {str(e)}"))
+            
+            # 2. 检测本地分支（如果存在）
+            if os.path.exists(project_path) and os.path.exists(os.path.join(project_path, ".git")):
+                # 获取所有本地分支
+                local_result = subprocess.run(
+                    ["git", "branch", "-a"],
+                    capture_output=True, text=True, cwd=project_path
+                )
+                
+                # 获取当前分支
+                current_result = subprocess.run(
+                    ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+                    capture_output=True, text=True, cwd=project_path
+                )
+                
+                if local_result.returncode == 0:
+                    current_branch = current_result.stdout.strip() if current_result.returncode == 0 else ""
+                    
+                    for line in local_result.stdout.strip().split('\n'):
+                        if line.strip():
+                            branch = line.strip().replace('* ', '').replace('  ', '')
+                            if branch.startswith('remotes/origin/'):
+                                branch = branch.replace('remotes/origin/', '')
+                            if branch and branch != 'HEAD' and '->' not in branch:
+                                local_branches.append(branch)
+            
+            # 3. 合并远程和本地分支，移除重复项并排序
+            merged_branches = sorted(set(remote_branches) | set(local_branches))
+            
+            if not merged_branches:
+                self.message_queue.put(("log", f"[分支] [警告] {project_name} 未找到任何分支"))
+                return False
+            
+            # 更新分支选项；本地仓库的当前分支由主线程设置到选择框
+            self.message_queue.put(("branches", project_name, merged_branches))
+            if current_branch and current_branch in merged_branches:
+                self.message_queue.put(("current_branch", project_name, current_branch))
+            
+            # 记录结果
+            self.message_queue.put(("log", f"[分支] [完成] {project_name} 合并查询完成"))
+            self.message_queue.put(("log", f"[分支] [信息]   - 远程分支: {len(remote_branches)} 个"))
+            self.message_queue.put(("log", f"[分支] [信息]   - 本地分支: {len(local_branches)} 个"))
+            self.message_queue.put(("log", f"[分支] [信息]   - 合并后总计: {len(merged_branches)} 个"))
+            if current_branch:
+                self.message_queue.put(("log", f"[分支] [信息] {project_name} 当前分支: {current_branch}"))
+            return True
+        
         def combined_query_task():
             try:
                 self.message_queue.put(("progress", "start"))
                 self.message_queue.put(("status", "正在查询远程分支和本地分支..."))
                 self.message_queue.put(("log", "[分支] [开始] 开始查询远程分支和检测本地分支"))
                 
-                projects = self.get_current_projects()
-                
-                for project_name in projects.keys():
-                    try:
-                        project_path = os.path.join(self.save_path.get(), project_name)
-                        remote_branches = []
-                        local_branches = []
-                        current_branch = ""
-                        
-                        # 1. 查询远程分支
-                        self.message_queue.put(("status", f"正在查询 {project_name} 的远程分支..."))
-                        repo_url = projects[project_name]
-                        
-                        # 检查是否需要认证
-                        query_url = repo_url
-                        if self.requires_auth(project_name, repo_url):
-                            self.message_queue.put(("log", f"[认证] [信息] {project_name}: 分支查询需要身份认证"))
-                            
-                            # 获取认证凭据（在主线程中执行）
-                            credentials = None
-                            auth_result = [None]  # 使用列表来存储结果，以便在闭包中修改
-                            
-                            def get_credentials():
-                                auth_result[0] = self.get_auth_credentials(project_name, repo_url)
-                            
-                            # 在主线程中执行认证对话框
-                            self.root.after(0, get_credentials)
-                            
-                            # 等待认证对话框的结果
-                            while auth_result[0] is None:
-                                time.sleep(0.1)
-                            
-                            credentials = auth_result[0]
-                            
-                            if credentials['cancelled']:
-                                self.message_queue.put(("log", f"[认证] [取消] {project_name}: 用户取消了认证"))
-                                continue
-                            
-                            if credentials['username'] and credentials['password']:
-                                query_url = self.build_authenticated_url(repo_url, credentials['username'], credentials['password'])
-                                self.message_queue.put(("log", f"[认证] [信息] {project_name}: 分支查询认证信息已设置"))
-                            else:
-                                self.message_queue.put(("log", f"[认证] [错误] {project_name}: 认证信息不完整"))
-                                continue
-                        
-                        result = subprocess.run(
-                            ["git", "ls-remote", "--heads", query_url],
-                            capture_output=True, text=True, timeout=30
-                        )
-                        
-                        if result.returncode == 0:
-                            for line in result.stdout.strip().split('\n'):
-                                if line:
-                                    branch = line.split('\t')[1].replace('refs/heads/', '')
-                                    remote_branches.append(branch)
-                        
-                        # 2. 检测本地分支（如果存在）
-                        if os.path.exists(project_path) and os.path.exists(os.path.join(project_path, ".git")):
-                            self.message_queue.put(("status", f"正在检测 {project_name} 的本地分支..."))
-                            
-                            # 获取所有本地分支
-                            local_result = subprocess.run(
-                                ["git", "branch", "-a"],
-                                capture_output=True, text=True, cwd=project_path
-                            )
-                            
-                            # 获取当前分支
-                            current_result = subprocess.run(
-                                ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                                capture_output=True, text=True, cwd=project_path
-                            )
-                            
-                            if local_result.returncode == 0:
-                                current_branch = current_result.stdout.strip() if current_result.returncode == 0 else ""
-                                
-                                for line in local_result.stdout.strip().split('\n'):
-                                    if line.strip():
-                                        branch = line.strip().replace('* ', '').replace('  ', '')
-                                        if branch.startswith('remotes/origin/'):
-                                            branch = branch.replace('remotes/origin/', '')
-                                        if branch and branch != 'HEAD' and '->' not in branch:
-                                            local_branches.append(branch)
-                        
-                        # 3. 合并远程和本地分支
-                        all_branches = set()
-                        all_branches.update(remote_branches)
-                        all_branches.update(local_branches)
-                        
-                        # 移除重复项并排序
-                        merged_branches = sorted(list(all_branches))
-                        
-                        if merged_branches:
-                            # 更新分支选项
-                            self.message_queue.put(("branches", project_name, merged_branches))
-                            
-                            # 设置当前分支（避免触发分支切换事件）
-                            if current_branch and current_branch in merged_branches:
-                                # 临时禁用事件绑定，避免触发分支切换
-                                combo = self.branch_combos[project_name]
-                                combo.unbind('<<ComboboxSelected>>')
-                                
-                                self.branch_vars[project_name].set(current_branch)
-                                
-                                # 重新绑定事件
-                                combo.bind('<<ComboboxSelected>>', 
-                                         lambda e, name=project_name: self.on_branch_changed(e, name))
-                            
-                            # 记录结果
-                            remote_count = len(remote_branches)
-                            local_count = len(local_branches)
-                            total_count = len(merged_branches)
-                            
-                            self.message_queue.put(("log", f"[分支] [完成] {project_name} 合并查询完成"))
-                            self.message_queue.put(("log", f"[分支] [信息]   - 远程分支: {remote_count} 个"))
-                            self.message_queue.put(("log", f"[分支] [信息]   - 本地分支: {local_count} 个"))
-                            self.message_queue.put(("log", f"[分支] [信息]   - 合并后总计: {total_count} 个"))
-                            if current_branch:
-                                self.message_queue.put(("log", f"[分支] [信息] {project_name} 获取本地仓库当前分支..."))
-                                current_result = subprocess.run(
-                                    ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                                    capture_output=True, text=True, cwd=project_path
-                                )
-                                
-                                if current_result.returncode == 0:
-                                    current_branch = current_result.stdout.strip()
-                                    self.message_queue.put(("log", f"[分支] [信息] {project_name} 当前分支: {current_branch}"))
-                                else:
-                                    current_branch = None
-                                    self.message_queue.put(("log", f"[分支] [警告] {project_name} 无法获取当前分支"))
-                            
-                        else:
-                            self.message_queue.put(("log", f"[分支] [警告] {project_name} 未找到任何分支"))
-                            
-                    except subprocess.TimeoutExpired:
-                        self.message_queue.put(("log", f"[分支] [超时] {project_name} 远程查询超时"))
-                    except Exception as e:
-                        self.message_queue.put(("log", f"[分支] [错误] {project_name} 查询出错: {str(e)}"))
+                self.run_parallel_branch_queries(projects, query_one)
+                self.save_branch_cache()
                 
                 self.message_queue.put(("status", "合并查询完成"))
                 self.message_queue.put(("log", "[分支] [完成] 所有项目的远程分支和本地分支查询完成"))
@@ -5776,6 +6305,9 @@ class DeepinProjectDownloader:
                 os.makedirs(self.save_path.get(), exist_ok=True)
                 
                 projects = self.get_current_projects()
+                clone_depth = self.get_clone_depth()
+                use_mirror = bool(self.mirror_cache_var.get())
+                update_policy = self.get_update_policy()
                 # 使用线程池并行下载
                 with concurrent.futures.ThreadPoolExecutor(
                     max_workers=ProjectConfig.ThreadPool.MAX_WORKERS
@@ -5786,10 +6318,12 @@ class DeepinProjectDownloader:
                     for project_name in selected_projects:
                         repo_url = projects[project_name]
                         branch = self.branch_vars[project_name].get() or "master"
+                        clone_mode = self.get_clone_mode(project_name)
                         
                         future = executor.submit(
                             self.download_single_project,
-                            project_name, repo_url, branch, self.save_path.get()
+                            project_name, repo_url, branch, self.save_path.get(),
+                            clone_mode, clone_depth, use_mirror, update_policy
                         )
                         futures[future] = project_name
                     
@@ -6179,6 +6713,8 @@ class DeepinProjectDownloader:
                     self.cancel_branch_switch(message[1], message[2])
                 elif message[0] == "enable_controls":
                     self.set_project_controls_enabled(message[1])
+                elif message[0] == "apply_saved_branches":
+                    self.apply_saved_branches()
                 elif message[0] == "branches":
                     project_name, branches = message[1], message[2]
                     combo = self.branch_combos[project_name]
@@ -6225,6 +6761,21 @@ class DeepinProjectDownloader:
                         # 重新绑定事件
                         combo.bind('<<ComboboxSelected>>', 
                                  lambda e, name=project_name: self.on_branch_changed(e, name))
+                elif message[0] == "current_branch":
+                    # 本地仓库的当前分支（合并查询时由后台线程检测）
+                    project_name, current_branch = message[1], message[2]
+                    combo = self.branch_combos.get(project_name)
+                    try:
+                        if combo is None or not combo.winfo_exists():
+                            continue
+                    except tk.TclError:
+                        continue
+                    
+                    # 临时禁用事件绑定，避免触发分支切换
+                    combo.unbind('<<ComboboxSelected>>')
+                    self.branch_vars[project_name].set(current_branch)
+                    combo.bind('<<ComboboxSelected>>', 
+                             lambda e, name=project_name: self.on_branch_changed(e, name))
                 elif message[0] == "save_config":
                     self.save_config()
                 elif message[0] == "package_status":